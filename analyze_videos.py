@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Headless batch analysis of recorded sessions.
+
+Streams each video through PoseEngine and ActivityTracker as fast as decoding
+and inference allow, driving the tracker from the video's own timestamps, and
+writes a per-session summary plus per-frame metrics for every file.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Optional
+
+import cv2
+
+FRAME_FIELDS = ["frame", "time_s", "status", "steps_count", "speed", "cadence",
+                "stride_length", "vertical_oscillation", "total_distance", "calories_burned"]
+
+_pose_engine = None
+
+
+def _init_worker(backend: Optional[str], imgsz: int, threads: int):
+    """Load the model once per worker process and reuse it for every file"""
+    global _pose_engine
+    # Keep each worker's intra-op thread pool from oversubscribing the cores
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    cv2.setNumThreads(threads)
+
+    from core.pose_engine import PoseEngine
+
+    _pose_engine = PoseEngine(backend=backend, imgsz=imgsz)
+
+
+def analyze_video(path: str, output_dir: str, write_frames: bool = True) -> Dict:
+    """
+    Analyze one recorded session.
+
+    Args:
+        path: Video file to analyze
+        output_dir: Directory for the <name>_summary.json and <name>_frames.csv outputs
+        write_frames: Also write per-frame metrics
+
+    Returns:
+        dict: The session summary written to disk
+    """
+    from core.activity_tracker import ActivityTracker
+    from core.clock import ManualClock
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video {path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    name = os.path.splitext(os.path.basename(path))[0]
+    tracker = ActivityTracker(clock=ManualClock())
+    tracker.start_session(0.0)
+
+    frames_file = None
+    writer = None
+    if write_frames:
+        frames_file = open(os.path.join(output_dir, f"{name}_frames.csv"), 'w', newline='')
+        writer = csv.DictWriter(frames_file, fieldnames=FRAME_FIELDS)
+        writer.writeheader()
+
+    wall_start = time.perf_counter()
+    frame_index = 0
+    video_time = 0.0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            # Prefer the container's timestamp; fall back to the nominal frame rate
+            position_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            video_time = max(video_time, position_ms / 1000.0 if position_ms > 0 else frame_index / fps)
+            tracker.clock.set(video_time)
+
+            kpts, mask = _pose_engine.detect(frame)
+            positions = _pose_engine.keypoints_to_positions(kpts, mask)
+            feedback = tracker.update_metrics(positions, frame.shape)
+
+            if writer is not None:
+                session = tracker.current_session
+                metrics = tracker.latest_metrics
+                writer.writerow({
+                    "frame": frame_index,
+                    "time_s": round(video_time, 4),
+                    "status": feedback.get("status", ""),
+                    "steps_count": session["steps_count"],
+                    "speed": metrics.get("speed", 0.0),
+                    "cadence": metrics.get("cadence", 0.0),
+                    "stride_length": metrics.get("stride_length", 0.0),
+                    "vertical_oscillation": metrics.get("vertical_oscillation", 0.0),
+                    "total_distance": session["total_distance"],
+                    "calories_burned": session["calories_burned"],
+                })
+            frame_index += 1
+    finally:
+        cap.release()
+        if frames_file is not None:
+            frames_file.close()
+
+    processing_time = time.perf_counter() - wall_start
+    summary = tracker.end_session()
+    summary.update({
+        "video": os.path.abspath(path),
+        "frames": frame_index,
+        "video_fps": fps,
+        "processing_time": processing_time,
+        "realtime_factor": video_time / processing_time if processing_time > 0 else 0.0,
+    })
+
+    with open(os.path.join(output_dir, f"{name}_summary.json"), 'w') as f:
+        json.dump(summary, f, indent=2, default=float)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze recorded treadmill sessions without the GUI")
+    parser.add_argument('videos', nargs='+', help="Video files to analyze")
+    parser.add_argument('--output-dir', default='analysis', help="Directory for summaries and per-frame metrics")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Number of files analyzed in parallel")
+    parser.add_argument('--threads-per-worker', type=int, default=2)
+    parser.add_argument('--backend', default=None, help="Inference backend (see core/inference_backends.py)")
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--no-frames', action='store_true', help="Only write session summaries")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    workers = max(1, min(args.workers, len(args.videos)))
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(args.backend, args.imgsz, args.threads_per_worker)) as pool:
+        futures = {pool.submit(analyze_video, path, args.output_dir, not args.no_frames): path
+                   for path in args.videos}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summary = future.result()
+                print(f"{path}: {summary['frames']} frames, {summary['steps_count']} steps, "
+                      f"{summary['total_distance']:.1f} m, {summary['realtime_factor']:.1f}x realtime")
+            except Exception as e:
+                failures += 1
+                print(f"{path}: failed: {e}", file=sys.stderr)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Measure cohort analytics throughput in members per second.
+
+Builds a synthetic gym of members with a few months of sessions each, then
+times performance levels, 30-day progress metrics and workout plans for all
+of them. It compares the vectorized CohortAnalytics with a loop of the
+single-user AnalyticsService and RecommendationService over a sample.
+
+    python benchmarks/cohort_benchmark.py --members 20000 --sessions 60
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.analytics_service import AnalyticsService
+from services.cohort_analytics import LEVELS, CohortAnalytics, SessionBatch
+from services.recommendation_service import RecommendationService
+
+
+def synthetic_cohort(members: int, sessions: int, now: datetime, seed: int = 0) -> SessionBatch:
+    """Members with 0..2*sessions sessions each over the last 120 days"""
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, 2 * sessions + 1, size=members)
+    user_index = np.repeat(np.arange(members), counts)
+    total = len(user_index)
+    return SessionBatch(
+        [f"member-{i}" for i in range(members)],
+        user_index,
+        now.timestamp() - rng.uniform(0, 120 * 86400, size=total),
+        rng.uniform(1.5, 4.0, size=total),
+        rng.uniform(130, 190, size=total),
+        rng.uniform(1000, 10000, size=total),
+        rng.uniform(600, 3600, size=total),
+    )
+
+
+def run_vectorized(cohort: CohortAnalytics, batch: SessionBatch, now: datetime):
+    levels = cohort.performance_levels(batch)
+    cohort.progress_metrics(batch, days=30, now=now)
+    cohort.workout_plans(levels, available_time=1800)
+
+
+def run_per_member(batch: SessionBatch, members: int, now: datetime):
+    recommendations = RecommendationService()
+    for i in range(members):
+        user_id = batch.user_ids[i]
+        service = AnalyticsService(user_id=user_id)
+        for row in range(batch.offsets[i], batch.offsets[i + 1]):
+            service.index.add(user_id, {
+                "duration": batch.duration[row],
+                "total_distance": batch.distance[row],
+                "average_metrics": {"avg_speed": batch.speed[row], "avg_cadence": batch.cadence[row]},
+            }, datetime.fromtimestamp(batch.timestamps[row]))
+        level = service.get_performance_level()
+        service.get_progress_metrics(days=30, now=now)
+        recommendations.generate_workout_plan(level, 1800)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--members', type=int, default=20000)
+    parser.add_argument('--sessions', type=int, default=60, help="Average sessions per member")
+    parser.add_argument('--loop-sample', type=int, default=1000,
+                        help="Members timed through the single-user services")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    batch = synthetic_cohort(args.members, args.sessions, now)
+    cohort = CohortAnalytics()
+    print(f"{args.members} members, {len(batch.timestamps)} sessions")
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        run_vectorized(cohort, batch, now)
+        best = min(best, time.perf_counter() - start)
+    print(f"{'vectorized cohort':<28}{args.members / best:>14,.0f} members/s")
+
+    sample = min(args.loop_sample, args.members)
+    start = time.perf_counter()
+    run_per_member(batch, sample, now)
+    elapsed = time.perf_counter() - start
+    print(f"{'per-member services':<28}{sample / elapsed:>14,.0f} members/s (incl. index build)")
+
+    levels = cohort.performance_levels(batch)
+    counts = np.bincount(levels, minlength=len(LEVELS))
+    print("levels: " + ", ".join(f"{name} {count}" for name, count in zip(LEVELS, counts)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Measure pose engine cold start, from a fresh interpreter to the first detect() result.
+
+Each run starts a new Python process, so imports, model load and the first
+inference are all paid again, the way they are when tracking starts. The
+first run with --clear-cache also shows the cost of building the model cache.
+
+    python benchmarks/cold_start_benchmark.py --runs 3 --backend torch
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys
+from utils.startup import get_startup_profile
+profile = get_startup_profile()
+import numpy as np
+with profile.phase("engine_import"):
+    from core.pose_engine import PoseEngine
+engine = PoseEngine(backend=sys.argv[1], warm_up=sys.argv[2] == "1")
+frame = np.zeros((480, 640, 3), dtype=np.uint8)
+with profile.phase("first_detect"):
+    engine.detect(frame)
+profile.mark("first_result")
+print(json.dumps(profile.report()))
+"""
+
+
+def run_once(backend: str, warm_up: bool) -> dict:
+    output = subprocess.run([sys.executable, "-c", CHILD, backend, "1" if warm_up else "0"],
+                            cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backend', default='torch')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--no-warm-up', action='store_true', help="Skip the warm-up inference")
+    parser.add_argument('--clear-cache', action='store_true', help="Delete the model cache first")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from core.inference_backends import create_backend
+    if args.clear_cache:
+        backend = create_backend(args.backend)
+        path = backend.model_path()
+        if path != backend.weights and os.path.exists(path):
+            shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+
+    for run in range(args.runs):
+        report = run_once(args.backend, not args.no_warm_up)
+        phases = ", ".join(f"{phase['name']} {phase['duration_s']:.2f}s" for phase in report["phases"])
+        print(f"run {run + 1}: first result after {report['marks']['first_result']:.2f}s ({phases})")
+
+
+if __name__ == '__main__':
+    main()
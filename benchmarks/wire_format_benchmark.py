@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Compare the JSON and binary wire formats for streamed pose updates.
+
+Encodes a synthetic running sequence in both formats and reports encode and
+decode CPU time and bytes per frame.
+
+    python benchmarks/wire_format_benchmark.py --frames 3000
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.keypoints import NUM_KEYPOINTS
+from services.broadcaster import encode_json
+from services.wire_format import BinaryDecoder, BinaryEncoder
+
+
+def synthetic_updates(num_frames: int, fps: float = 30.0, seed: int = 0):
+    """Updates shaped like PoseService's, for a runner whose limbs swing and whose head stays still"""
+    rng = np.random.default_rng(seed)
+    base = np.stack([np.linspace(300, 340, NUM_KEYPOINTS), np.linspace(80, 420, NUM_KEYPOINTS)], axis=1)
+    swing = np.zeros(NUM_KEYPOINTS)
+    swing[7:11] = 25.0   # Arms
+    swing[13:17] = 40.0  # Legs
+    updates = []
+    for i in range(num_frames):
+        phase = 2 * math.pi * 1.4 * i / fps
+        kpts = np.empty((NUM_KEYPOINTS, 3), dtype=np.float32)
+        kpts[:, 0] = base[:, 0] + swing * math.sin(phase) + rng.normal(0, 0.2, NUM_KEYPOINTS)
+        kpts[:, 1] = base[:, 1] + 0.3 * swing * abs(math.cos(phase))
+        kpts[:, 2] = 0.9
+        updates.append({
+            "seq": i + 1,
+            "keypoints": np.round(kpts, 1),
+            "metrics": {"speed": 2.8, "stride_length": 1.1, "cadence": 168.0,
+                        "vertical_oscillation": 0.07, "arm_movement": 1.2, "leg_movement": 2.1},
+            "feedback": {},
+            "steps_count": i // 11,
+            "total_distance": i * 0.093,
+            "movement_type": "running",
+            "stability": 0.82,
+        })
+    return updates
+
+
+def measure(encode, decode, updates):
+    start = time.process_time()
+    payloads = [encode(update) for update in updates]
+    encode_s = time.process_time() - start
+    start = time.process_time()
+    for payload in payloads:
+        decode(payload)
+    decode_s = time.process_time() - start
+    sizes = [len(p.encode("utf-8") if isinstance(p, str) else p) for p in payloads]
+    return encode_s, decode_s, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=3000)
+    parser.add_argument('--keyframe-interval', type=int, default=30)
+    args = parser.parse_args()
+
+    updates = synthetic_updates(args.frames)
+    formats = {
+        "json": (encode_json, json.loads),
+        "binary": (BinaryEncoder(args.keyframe_interval), BinaryDecoder().decode),
+        "binary (no deltas)": (BinaryEncoder(keyframe_interval=1), BinaryDecoder().decode),
+    }
+
+    print(f"{'format':<20}{'encode us/frame':>16}{'decode us/frame':>16}{'bytes/frame':>13}{'max bytes':>11}")
+    for name, (encode, decode) in formats.items():
+        encode_s, decode_s, sizes = measure(encode, decode, updates)
+        print(f"{name:<20}{encode_s / len(updates) * 1e6:>16.1f}{decode_s / len(updates) * 1e6:>16.1f}"
+              f"{np.mean(sizes):>13.1f}{max(sizes):>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,35 +1,50 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional, Any, Tuple
 import numpy as np
-import math
 from collections import deque
 from models.user import UserProfile
+from core.clock import Clock, SystemClock
+from core.keypoint_history import KeypointHistory
+from core.keypoints import KEYPOINT_INDEX
+from core.rolling_stats import RunningStats
+from core.step_detector import StepDetector
+
+# Keypoints the speed, step and oscillation estimates are computed from
+TRACKED_KEYPOINTS = ("left_wrist", "right_wrist", "left_ankle", "right_ankle",
+                     "left_knee", "right_knee", "left_hip", "right_hip")
+
+# Per-frame metrics summarized over the whole session
+SESSION_METRICS = ("speed", "stride_length", "cadence", "vertical_oscillation")
 
 class ActivityTracker:
-    def __init__(self):
+    def __init__(self, clock: Optional[Clock] = None, history_window: int = 30):
+        """
+        Args:
+            clock: Time source for frames without an explicit timestamp;
+                defaults to the live system clock
+            history_window: Number of recent frames of keypoints kept
+        """
+        self.clock = clock or SystemClock()
         self.current_session = None
-        self.keypoints_history = {
-            "left_wrist": deque(maxlen=30),
-            "right_wrist": deque(maxlen=30),
-            "left_ankle": deque(maxlen=30),
-            "right_ankle": deque(maxlen=30),
-            "left_knee": deque(maxlen=30),
-            "right_knee": deque(maxlen=30),
-            "left_hip": deque(maxlen=30),
-            "right_hip": deque(maxlen=30)
-        }
+        self.history = KeypointHistory(window=history_window)
 
         self.last_positions = {}
-        self.last_timestamp = datetime.now()
-        self.step_timestamps = []
-        self.step_detection_cooldown = 0
+        self.last_timestamp = self.clock.now()
+        self.current_time = self.last_timestamp
+        self.session_start = self.last_timestamp
+        # Frames further apart than this (seconds) restart timing instead of producing metrics
+        self.max_time_delta = 1.0
+        self.step_timestamps = deque()
+        self.cadence_window = 10.0  # Seconds of steps cadence is measured over
+        self.step_detector = StepDetector()
         self.target_metrics = {
             "speed": 2.5,
             "stride_length": 0.7,
             "cadence": 160
         }
 
-        self.running_metrics = []
+        self.metric_stats = {key: RunningStats() for key in SESSION_METRICS}
+        self.latest_metrics = {}
         self.pixel_to_meter_ratio = 0.01
         self.user_profile = UserProfile()
         self.vertical_oscillation_buffer = deque(maxlen=60)
@@ -45,7 +60,16 @@ class ActivityTracker:
         person_height_meters = self.user_profile.height / 100.0  # convert cm to meters
         self.pixel_to_meter_ratio = person_height_meters / person_height_pixels
 
-    def start_session(self) -> None:
+    def start_session(self, start_time: Optional[float] = None) -> None:
+        """
+        Start a new session.
+
+        Args:
+            start_time: Session start in the tracker's monotonic timeline,
+                e.g. a video timestamp; defaults to the clock's current time
+        """
+        start_time = start_time if start_time is not None else self.clock.now()
+        self.session_start = start_time
         self.current_session = {
             "start_time": datetime.now(),
             "metrics": [],
@@ -54,37 +78,56 @@ class ActivityTracker:
             "steps_count": 0,
             "max_speed": 0
         }
-        for key in self.keypoints_history:
-            self.keypoints_history[key].clear()
+        self.history.clear()
+        self.step_detector.reset()
 
         self.last_positions = {}
-        self.last_timestamp = datetime.now()
-        self.step_timestamps = []
-        self.running_metrics = []
+        self.last_timestamp = start_time
+        self.current_time = start_time
+        self.step_timestamps.clear()
+        for stats in self.metric_stats.values():
+            stats.reset()
+        self.latest_metrics = {}
         self.vertical_oscillation_buffer.clear()
 
-    def end_session(self) -> Dict:
+    def end_session(self, end_time: Optional[float] = None) -> Dict:
+        """
+        End the current session and return its summary.
+
+        Args:
+            end_time: Session end in the tracker's monotonic timeline;
+                defaults to the clock's current time
+        """
         if not self.current_session:
             return {}
 
         avg_metrics = self._calculate_average_metrics()
+        end_time = end_time if end_time is not None else self.clock.now()
 
         session_data = {
-            "duration": (datetime.now() - self.current_session["start_time"]).total_seconds(),
+            "duration": end_time - self.session_start,
             "total_distance": self.current_session["total_distance"],
             "calories_burned": self.current_session["calories_burned"],
             "steps_count": self.current_session["steps_count"],
             "max_speed": self.current_session["max_speed"],
-            "average_metrics": avg_metrics
+            "average_metrics": avg_metrics,
+            "metric_stats": {key: stats.as_dict() for key, stats in self.metric_stats.items()}
         }
 
         self.current_session = None
         return session_data
 
-    def update_metrics(self, keypoint_positions: Dict, frame_size) -> Dict:
+    def update_metrics(self, keypoint_positions: Dict, frame_size,
+                       timestamp: Optional[float] = None) -> Dict:
         """
         Update metrics based on detected keypoints.
         Only calculates metrics when a valid person is detected in frame.
+
+        Args:
+            keypoint_positions: Mapping of keypoint name to (x, y)
+            frame_size: Shape of the frame the keypoints came from
+            timestamp: Monotonic capture time of the frame in seconds, e.g. a
+                video timestamp; defaults to the clock's current time
         """
         if not self.current_session:
             return {}
@@ -104,25 +147,28 @@ class ActivityTracker:
 
         if not has_required_parts:
             return {"status": "Person detected but key body parts not visible"}
-        if sum(1 for part in keypoint_positions if part in self.keypoints_history) < 2:
+        if sum(1 for part in keypoint_positions if part in TRACKED_KEYPOINTS) < 2:
             return {"status": "Insufficient keypoints for tracking"}
 
         if frame_size and len(frame_size) >= 2:
             self.set_pixel_to_meter_ratio(frame_size[1])
 
-        now = datetime.now()
-        time_delta = (now - self.last_timestamp).total_seconds()
+        now = timestamp if timestamp is not None else self.clock.now()
+        self.current_time = now
+        time_delta = now - self.last_timestamp
         self.last_timestamp = now
 
-        if time_delta <= 0 or time_delta > 1.0:  # Skip if time delta is invalid or too large
+        if time_delta <= 0 or time_delta > self.max_time_delta:  # Skip if time delta is invalid or too large
             return {"status": "Calibrating timing..."}
-        for key, position in keypoint_positions.items():
-            if key in self.keypoints_history:
-                self.keypoints_history[key].append(position)
+        self.history.append(keypoint_positions, now)
+        self._detect_step()
         metrics = self._calculate_full_body_metrics(time_delta)
 
         if metrics and metrics.get("speed", 0) > 0:
-            self.running_metrics.append(metrics)
+            self.latest_metrics = metrics
+            for key, stats in self.metric_stats.items():
+                if key in metrics:
+                    stats.update(metrics[key])
             self._update_session_stats(metrics, time_delta)
 
             return self._generate_feedback(metrics)
@@ -132,16 +178,10 @@ class ActivityTracker:
     def _calculate_full_body_metrics(self, time_delta: float) -> Dict[str, float]:
         """Calculate metrics using full body keypoints"""
         required_points = ["left_ankle", "right_ankle"]
-        if not all(len(self.keypoints_history.get(point, [])) >= 3 for point in required_points):
-            if len(self.keypoints_history["left_wrist"]) >= 3 or len(self.keypoints_history["right_wrist"]) >= 3:
+        if not all(self.history.count(point) >= 3 for point in required_points):
+            if self.history.count("left_wrist") >= 3 or self.history.count("right_wrist") >= 3:
                 return self._calculate_metrics_from_arms(time_delta)
             return {}
-        steps = self._detect_steps_from_ankles()
-        if steps == 0 and (len(self.keypoints_history["left_knee"]) >= 3 or len(self.keypoints_history["right_knee"]) >= 3):
-            steps = self._detect_steps_from_knees()
-        if steps == 0 and (len(self.keypoints_history["left_wrist"]) >= 3 or len(self.keypoints_history["right_wrist"]) >= 3):
-            steps = self._detect_steps_from_arms()
-
         cadence = self._calculate_cadence()
         vertical_oscillation = self._calculate_vertical_oscillation()
         ankle_speed = self._calculate_leg_speed(time_delta)
@@ -162,10 +202,9 @@ class ActivityTracker:
 
     def _calculate_metrics_from_arms(self, time_delta: float) -> Dict[str, float]:
         """Legacy method for arm-only metrics calculation"""
-        left_speed = self._calculate_keypoint_speed(self.keypoints_history["left_wrist"], time_delta)
-        right_speed = self._calculate_keypoint_speed(self.keypoints_history["right_wrist"], time_delta)
+        left_speed = self._calculate_keypoint_speed("left_wrist", time_delta)
+        right_speed = self._calculate_keypoint_speed("right_wrist", time_delta)
 
-        steps = self._detect_steps_from_arms()
         cadence = self._calculate_cadence()
         arm_speed = max(left_speed, right_speed)
         estimated_speed = arm_speed * 2.5
@@ -187,156 +226,68 @@ class ActivityTracker:
 
     def _calculate_arm_speed(self, time_delta: float) -> float:
         """Calculate speed based on arm movements"""
-        left_speed = self._calculate_keypoint_speed(self.keypoints_history["left_wrist"], time_delta)
-        right_speed = self._calculate_keypoint_speed(self.keypoints_history["right_wrist"], time_delta)
+        left_speed = self._calculate_keypoint_speed("left_wrist", time_delta)
+        right_speed = self._calculate_keypoint_speed("right_wrist", time_delta)
         return max(left_speed, right_speed) * 0.8
 
     def _calculate_leg_speed(self, time_delta: float) -> float:
         """Calculate speed based on leg movements"""
-        left_speed = self._calculate_keypoint_speed(self.keypoints_history["left_ankle"], time_delta)
-        right_speed = self._calculate_keypoint_speed(self.keypoints_history["right_ankle"], time_delta)
+        left_speed = self._calculate_keypoint_speed("left_ankle", time_delta)
+        right_speed = self._calculate_keypoint_speed("right_ankle", time_delta)
         return max(left_speed, right_speed) * 1.2
 
-    def _calculate_keypoint_speed(self, history, time_delta: float) -> float:
+    def _calculate_keypoint_speed(self, name: str, time_delta: float) -> float:
         """Calculate speed of any keypoint based on its movement history"""
-        if len(history) < 2 or time_delta <= 0:
+        if time_delta <= 0:
+            return 0.0
+        positions = self.history.recent(name, 5)
+        if len(positions) < 2:
             return 0.0
 
-        positions_to_use = min(5, len(history))
-
-        if positions_to_use >= 2:
-            current = history[-1]
-            previous = history[-2]
-
-            dx = current[0] - previous[0]
-            dy = current[1] - previous[1]
-            if abs(dx) < 2.0 and abs(dy) < 2.0:
-                return 0.0
-
-            distance_pixels = math.sqrt(dx*dx + dy*dy)
-            if distance_pixels > 100:
-                return 0.0
-
-            distance_meters = distance_pixels * self.pixel_to_meter_ratio
-            immediate_speed = distance_meters / time_delta
-            immediate_speed = min(8.0, immediate_speed)
-
-            if positions_to_use > 2:
-                valid_movements = 0
-                total_distance = 0
-
-                for i in range(1, positions_to_use):
-                    p1 = history[-i]
-                    p2 = history[-(i+1)]
-                    dx = p1[0] - p2[0]
-                    dy = p1[1] - p2[1]
-                    if abs(dx) < 2.0 and abs(dy) < 2.0:
-                        continue
-
-                    movement = math.sqrt(dx*dx + dy*dy)
-                    if movement > 100:
-                        continue
-
-                    total_distance += movement * self.pixel_to_meter_ratio
-                    valid_movements += 1
-
-                if valid_movements > 0:
-                    avg_speed = total_distance / (time_delta * valid_movements)
-                    speed = immediate_speed * 0.3 + avg_speed * 0.7
-                else:
-                    speed = immediate_speed
-            else:
-                speed = immediate_speed
-            return min(6.0, max(0.0, speed))
-
-        return 0.0
-
-    def _detect_steps_from_ankles(self) -> int:
-        """Detect steps by analyzing ankle vertical movement patterns"""
-        steps = 0
-
-        if self.step_detection_cooldown <= 0:
-            if len(self.keypoints_history["left_ankle"]) >= 5 or len(self.keypoints_history["right_ankle"]) >= 5:
-                left_detected = self._detect_step_pattern(self.keypoints_history["left_ankle"])
-                right_detected = self._detect_step_pattern(self.keypoints_history["right_ankle"])
-
-                if left_detected or right_detected:
-                    self.step_timestamps.append(datetime.now())
-                    self.current_session["steps_count"] += 1
-                    self.step_detection_cooldown = 10  # Higher cooldown for more accurate counts
-                    steps = 1
-                    print(f"Step detected from ankle! Total: {self.current_session['steps_count']}")
-        else:
-            self.step_detection_cooldown -= 1
-
-        return steps
-
-    def _detect_steps_from_knees(self) -> int:
-        """Backup step detection using knee movement"""
-        steps = 0
-
-        if self.step_detection_cooldown <= 0:
-            if len(self.keypoints_history["left_knee"]) >= 5 or len(self.keypoints_history["right_knee"]) >= 5:
-                left_detected = self._detect_step_pattern(self.keypoints_history["left_knee"])
-                right_detected = self._detect_step_pattern(self.keypoints_history["right_knee"])
-
-                if left_detected or right_detected:
-                    self.step_timestamps.append(datetime.now())
-                    self.current_session["steps_count"] += 1
-                    self.step_detection_cooldown = 9
-                    steps = 1
-                    print(f"Step detected from knee! Total: {self.current_session['steps_count']}")
-        else:
-            self.step_detection_cooldown -= 1
-
-        return steps
-
-    def _detect_steps_from_arms(self) -> int:
-        """Legacy step detection from arm movements as fallback"""
-        steps = 0
-
-        if self.step_detection_cooldown <= 0:
-            left_detected = self._detect_step_pattern(self.keypoints_history["left_wrist"])
-            right_detected = self._detect_step_pattern(self.keypoints_history["right_wrist"])
+        # Frame-to-frame movements, newest last
+        deltas = np.diff(positions.astype(np.float64), axis=0)
+        distances = np.hypot(deltas[:, 0], deltas[:, 1])
+        jitter = (np.abs(deltas[:, 0]) < 2.0) & (np.abs(deltas[:, 1]) < 2.0)
 
-            if left_detected or right_detected:
-                self.step_timestamps.append(datetime.now())
-                self.current_session["steps_count"] += 1
-                self.step_detection_cooldown = 8
-                steps = 1
-                print(f"Step detected from arm! Total: {self.current_session['steps_count']}")
-        else:
-            self.step_detection_cooldown -= 1
-
-        return steps
+        if jitter[-1] or distances[-1] > 100:
+            return 0.0
 
-    def _detect_step_pattern(self, history) -> bool:
-        """Generic pattern detection for steps from any keypoint's vertical movement"""
-        if len(history) < 5:
+        immediate_speed = distances[-1] * self.pixel_to_meter_ratio / time_delta
+        immediate_speed = min(8.0, immediate_speed)
+
+        speed = immediate_speed
+        if len(distances) > 1:
+            valid = ~jitter & (distances <= 100)
+            valid_movements = np.count_nonzero(valid)
+            if valid_movements > 0:
+                total_distance = distances[valid].sum() * self.pixel_to_meter_ratio
+                avg_speed = total_distance / (time_delta * valid_movements)
+                speed = immediate_speed * 0.3 + avg_speed * 0.7
+        return float(min(6.0, max(0.0, speed)))
+
+    def _detect_step(self) -> bool:
+        """Feed the newest frame to the streaming step detector and count a completed step"""
+        positions, valid, _ = self.history.recent_frames(1)
+        step = self.step_detector.update(positions[0], valid[0], self.current_time)
+        if step is None:
             return False
-        y_vals = [pos[1] for pos in list(history)[-5:]]
-        pattern_1 = (y_vals[1] > y_vals[0] and
-                    y_vals[2] > y_vals[1] and
-                    abs(y_vals[2] - y_vals[0]) > 5)
-        pattern_2 = (y_vals[1] < y_vals[0] and
-                    y_vals[2] < y_vals[1] and
-                    abs(y_vals[2] - y_vals[0]) > 5)
-        direction_changes = sum(1 for i in range(len(y_vals)-2)
-                              if (y_vals[i] < y_vals[i+1] and y_vals[i+1] > y_vals[i+2]) or
-                                 (y_vals[i] > y_vals[i+1] and y_vals[i+1] < y_vals[i+2]))
-        detected = pattern_1 or pattern_2 or direction_changes >= 2
-
-        return detected
+
+        step_time, source = step
+        self.step_timestamps.append(step_time)
+        self.current_session["steps_count"] += 1
+        print(f"Step detected from {source}! Total: {self.current_session['steps_count']}")
+        return True
 
     def _calculate_cadence(self) -> float:
         """Calculate cadence (steps per minute) from recent step timestamps"""
-        cutoff_time = datetime.now() - timedelta(seconds=10)
-        self.step_timestamps = [ts for ts in self.step_timestamps if ts > cutoff_time]
+        cutoff_time = self.current_time - self.cadence_window
+        while self.step_timestamps and self.step_timestamps[0] <= cutoff_time:
+            self.step_timestamps.popleft()
 
         if len(self.step_timestamps) < 4:
             return 0.0
 
-        time_span = (self.step_timestamps[-1] - self.step_timestamps[0]).total_seconds()
+        time_span = self.step_timestamps[-1] - self.step_timestamps[0]
         if time_span <= 0:
             return 0.0
 
@@ -348,13 +299,14 @@ class ActivityTracker:
 
     def _calculate_vertical_oscillation(self) -> float:
         """Calculate vertical oscillation using hip position variance"""
-        if len(self.keypoints_history["left_hip"]) > 5 and len(self.keypoints_history["right_hip"]) > 5:
-            left_y = [pos[1] for pos in list(self.keypoints_history["left_hip"])[-10:]]
-            right_y = [pos[1] for pos in list(self.keypoints_history["right_hip"])[-10:]]
-            avg_y = [(left_y[i] + right_y[i])/2 for i in range(min(len(left_y), len(right_y)))]
-
-            if avg_y:
-                oscillation = np.std(avg_y) * self.pixel_to_meter_ratio
+        if self.history.count("left_hip") > 5 and self.history.count("right_hip") > 5:
+            positions, valid, _ = self.history.recent_frames(10)
+            hips = [KEYPOINT_INDEX["left_hip"], KEYPOINT_INDEX["right_hip"]]
+            both_visible = valid[:, hips].all(axis=1)
+            avg_y = positions[both_visible][:, hips, 1].mean(axis=1)
+
+            if len(avg_y):
+                oscillation = float(np.std(avg_y)) * self.pixel_to_meter_ratio
                 self.vertical_oscillation_buffer.append(oscillation)
                 return oscillation
         if len(self.vertical_oscillation_buffer) > 0:
@@ -407,20 +359,9 @@ class ActivityTracker:
 
     def _calculate_average_metrics(self) -> Dict[str, float]:
         """Calculate average metrics across the session"""
-        if not self.running_metrics:
+        if self.metric_stats["speed"].count == 0:
             return {}
-
-        metrics_keys = ["speed", "stride_length", "cadence", "vertical_oscillation"]
-        avg_metrics = {}
-
-        for key in metrics_keys:
-            values = [m.get(key, 0) for m in self.running_metrics if key in m]
-            if values:
-                avg_metrics[f"avg_{key}"] = np.mean(values)
-            else:
-                avg_metrics[f"avg_{key}"] = 0
-
-        return avg_metrics
+        return {f"avg_{key}": stats.mean for key, stats in self.metric_stats.items()}
 
     def _calculate_calories(self, speed: float, time_delta: float) -> float:
         """Calculate calories burned based on speed, user weight and MET values"""
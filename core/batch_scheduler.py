@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.pose_engine import PoseEngine
+from utils.video_capture import VideoCapture
+
+
+class BatchScheduler:
+    """
+    Collects frames from several VideoCapture sources and runs them through
+    PoseEngine.detect_batch in a single model call.
+
+    Each stream gets its own results queue, so consumers read back only the
+    keypoints computed for their own camera.
+    """
+
+    def __init__(self, pose_engine: PoseEngine, sources: List[VideoCapture],
+                 batch_size: int = 4, max_wait: float = 0.01, render: bool = True,
+                 callback: Optional[Callable[[int, np.ndarray, Dict], None]] = None):
+        """
+        Args:
+            pose_engine: Engine used for the batched inference calls
+            sources: Started VideoCapture instances, one per stream
+            batch_size: Maximum number of frames per model call
+            max_wait: Seconds to wait for a batch to fill before running it
+            render: Annotate frames with the skeleton; headless consumers can
+                set this to False to get the raw frames and keypoints only
+            callback: Optional function called as callback(stream_id, frame, keypoints)
+                for every processed frame
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+
+        self.pose_engine = pose_engine
+        self.sources = list(sources)
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.render = render
+        self.callback = callback
+        self.result_queues = [queue.Queue(maxsize=2) for _ in self.sources]
+        self.stopped = True
+        self.error = None
+        self._next_source = 0
+        self._thread = None
+        # Set by every source when it publishes a frame, so an idle scheduler sleeps until one arrives
+        self._frame_ready = threading.Event()
+        for source in self.sources:
+            source.add_frame_listener(self._frame_ready)
+        self.frames_processed = 0
+        self.batches_processed = 0
+
+    def start(self):
+        self.stopped = False
+        self.error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopped = True
+        self._frame_ready.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def read(self, stream_id: int) -> Optional[Tuple[np.ndarray, Dict]]:
+        """Return the latest (processed_frame, keypoint_positions) for a stream, if any"""
+        try:
+            return self.result_queues[stream_id].get(block=False)
+        except queue.Empty:
+            return None
+
+    def _collect_batch(self, idle_timeout: float = 0.1) -> List[Tuple[int, np.ndarray]]:
+        """
+        Take frames from the sources round-robin until the batch is full, or
+        max_wait after its first frame. Waits up to `idle_timeout` seconds for
+        that first frame.
+        """
+        batch = []
+        deadline = time.perf_counter() + idle_timeout
+        num_sources = len(self.sources)
+
+        while not self.stopped and len(batch) < self.batch_size:
+            # Cleared before looking, so a frame published meanwhile still wakes the wait below
+            self._frame_ready.clear()
+            for offset in range(num_sources):
+                stream_id = (self._next_source + offset) % num_sources
+                # A copy, not a borrowed slot: the frame is rendered on and
+                # handed to the stream's reader after inference
+                frame = self.sources[stream_id].read()
+                if frame is None:
+                    continue
+                if not batch:
+                    deadline = time.perf_counter() + self.max_wait
+                batch.append((stream_id, frame))
+                if len(batch) >= self.batch_size:
+                    # Start the next batch after the last stream served so
+                    # every camera gets a fair share when batch_size < num_sources
+                    self._next_source = (stream_id + 1) % num_sources
+                    break
+
+            remaining = deadline - time.perf_counter()
+            if len(batch) >= self.batch_size or remaining <= 0:
+                break
+            self._frame_ready.wait(remaining)
+
+        return batch
+
+    def _run(self):
+        while not self.stopped:
+            if not self.sources:
+                break
+
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            try:
+                batch_kpts = self.pose_engine.detect_batch([frame for _, frame in batch])
+            except Exception as e:
+                self.error = f"Batch inference failed: {e}"
+                break
+
+            for (stream_id, frame), (kpts, mask) in zip(batch, batch_kpts):
+                if self.render:
+                    # Frames read from VideoCapture are not shared, so annotate in place
+                    self.pose_engine.render(frame, kpts, in_place=True)
+                self._publish(stream_id, frame, self.pose_engine.keypoints_to_positions(kpts, mask))
+
+            self.frames_processed += len(batch)
+            self.batches_processed += 1
+
+    def _publish(self, stream_id: int, processed_frame: np.ndarray, keypoint_positions: Dict):
+        result_queue = self.result_queues[stream_id]
+        if result_queue.full():
+            # Drop the stale result so consumers always see the freshest frame
+            try:
+                result_queue.get(block=False)
+            except queue.Empty:
+                pass
+        result_queue.put((processed_frame, keypoint_positions))
+
+        if self.callback is not None:
+            self.callback(stream_id, processed_frame, keypoint_positions)
@@ -0,0 +1,39 @@
+import time
+
+
+class Clock:
+    """Source of monotonic time, in seconds, for ActivityTracker"""
+
+    def now(self) -> float:
+        raise NotImplementedError
+
+
+class SystemClock(Clock):
+    """Live wall time from time.monotonic()"""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+
+class ManualClock(Clock):
+    """
+    Clock that only moves when told to.
+
+    Used to replay recorded keypoint streams at CPU speed: the caller sets
+    or advances the clock to each frame's timestamp, so results depend only
+    on the recording and are reproducible run to run.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+
+    def now(self) -> float:
+        return self._now
+
+    def set(self, timestamp: float):
+        if timestamp < self._now:
+            raise ValueError("ManualClock cannot move backwards")
+        self._now = timestamp
+
+    def advance(self, seconds: float):
+        self.set(self._now + seconds)
@@ -0,0 +1,194 @@
+import importlib.util
+import os
+import shutil
+from typing import Dict, Optional, Type
+
+DEFAULT_WEIGHTS = 'yolov8n-pose.pt'
+DEFAULT_IMGSZ = 640
+
+
+def get_model_cache_dir() -> str:
+    """Directory holding exported models, overridable with CVFIT_MODEL_CACHE"""
+    cache_dir = os.environ.get('CVFIT_MODEL_CACHE')
+    if not cache_dir:
+        cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+class InferenceBackend:
+    """
+    Base class for the runtimes PoseEngine can run the pose model on.
+
+    Every backend hands back an ultralytics ``YOLO`` object, so letterboxing,
+    NMS and keypoint decoding are shared and PoseEngine does not care which
+    runtime executes the forward pass. Backends convert the weights once (an
+    export, or a fused PyTorch checkpoint) and reuse the result from the cache
+    directory.
+    """
+
+    name = "base"
+    export_format: Optional[str] = None
+    required_module: Optional[str] = None
+
+    def __init__(self, weights: str = DEFAULT_WEIGHTS, cache_dir: Optional[str] = None,
+                 imgsz: int = DEFAULT_IMGSZ):
+        self.weights = weights
+        self.cache_dir = cache_dir or get_model_cache_dir()
+        self.imgsz = imgsz
+
+    def is_available(self) -> bool:
+        return self.required_module is None or importlib.util.find_spec(self.required_module) is not None
+
+    def model_path(self) -> str:
+        """Location of the model file this backend loads"""
+        return self.weights
+
+    def is_cached(self) -> bool:
+        path = self.model_path()
+        if not os.path.exists(path):
+            return False
+        # Re-export when the source weights are newer than the cached conversion
+        if os.path.exists(self.weights) and os.path.getmtime(self.weights) > os.path.getmtime(path):
+            return False
+        return True
+
+    def prepare(self, force: bool = False) -> str:
+        """Make sure the model for this backend exists on disk and return its path"""
+        return self.model_path()
+
+    def load(self):
+        if not self.is_available():
+            raise ImportError(f"The '{self.name}' backend requires the '{self.required_module}' package")
+
+        from ultralytics import YOLO
+
+        return YOLO(self.prepare(), task='pose')
+
+
+class TorchBackend(InferenceBackend):
+    """
+    Runs the PyTorch weights, with Conv+BatchNorm layers fused ahead of time.
+
+    ultralytics fuses the layers on every load; the fused checkpoint is saved
+    in the cache directory once so later loads skip that step.
+    """
+
+    name = "torch"
+
+    def model_path(self) -> str:
+        stem = os.path.splitext(os.path.basename(self.weights))[0]
+        return os.path.join(self.cache_dir, f"{stem}-fused.pt")
+
+    def prepare(self, force: bool = False) -> str:
+        path = self.model_path()
+        if not force and self.is_cached():
+            return path
+
+        from ultralytics import YOLO
+
+        # Written under a per-process name and renamed, as every pipeline worker may get here at once
+        partial = f"{path}.{os.getpid()}.tmp"
+        try:
+            model = YOLO(self.weights, task='pose')
+            model.fuse()
+            model.save(partial)
+            os.replace(partial, path)
+        except Exception:
+            # ultralytics versions without YOLO.save, or weights it cannot fuse: fuse at load time instead
+            if os.path.exists(partial):
+                os.remove(partial)
+            return self.weights
+        return path
+
+
+class ExportedBackend(InferenceBackend):
+    """Backend that runs a converted copy of the PyTorch weights"""
+
+    export_kwargs: Dict = {}
+    model_suffix = ""
+
+    def model_path(self) -> str:
+        stem = os.path.splitext(os.path.basename(self.weights))[0]
+        return os.path.join(self.cache_dir, f"{stem}-{self.imgsz}{self.model_suffix}")
+
+    def prepare(self, force: bool = False) -> str:
+        path = self.model_path()
+        if not force and self.is_cached():
+            return path
+
+        from ultralytics import YOLO
+
+        exported = YOLO(self.weights).export(format=self.export_format, imgsz=self.imgsz,
+                                             **self.export_kwargs)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+        shutil.move(str(exported), path)
+        return path
+
+
+class OnnxBackend(ExportedBackend):
+    name = "onnx"
+    export_format = "onnx"
+    required_module = "onnxruntime"
+    # Dynamic axes keep batched inference (process_batch) working on the exported graph
+    export_kwargs = {"dynamic": True, "simplify": True}
+    model_suffix = ".onnx"
+
+
+class OnnxInt8Backend(OnnxBackend):
+    """
+    Statically quantized INT8 ONNX model.
+
+    Calibration needs recorded frames, so this backend never builds the model
+    itself; run ``quantize_model.py`` once to produce it in the cache.
+    """
+
+    name = "onnx-int8"
+    model_suffix = "-int8.onnx"
+
+    def fp32_backend(self) -> OnnxBackend:
+        return OnnxBackend(weights=self.weights, cache_dir=self.cache_dir, imgsz=self.imgsz)
+
+    def prepare(self, force: bool = False) -> str:
+        path = self.model_path()
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No INT8 model at {path}; run quantize_model.py to calibrate one")
+        return path
+
+
+class OpenVINOBackend(ExportedBackend):
+    name = "openvino"
+    export_format = "openvino"
+    required_module = "openvino"
+    export_kwargs = {"dynamic": True}
+    # ultralytics recognises OpenVINO IR directories by this suffix
+    model_suffix = "_openvino_model"
+
+
+BACKENDS: Dict[str, Type[InferenceBackend]] = {
+    "torch": TorchBackend,
+    "onnx": OnnxBackend,
+    "onnx-int8": OnnxInt8Backend,
+    "openvino": OpenVINOBackend,
+}
+
+
+def create_backend(name: Optional[str] = None, **kwargs) -> InferenceBackend:
+    """
+    Create an inference backend by name.
+
+    Args:
+        name: One of BACKENDS; defaults to the CVFIT_BACKEND environment
+            variable, or "torch" when that is unset
+        **kwargs: Passed through to the backend constructor
+
+    Returns:
+        InferenceBackend: The configured backend
+    """
+    name = (name or os.environ.get('CVFIT_BACKEND') or "torch").lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
@@ -0,0 +1,96 @@
+from collections.abc import Mapping
+from typing import Tuple
+
+import numpy as np
+
+from core.keypoints import KEYPOINT_INDEX, NUM_KEYPOINTS, KeypointView
+
+
+class KeypointHistory:
+    """
+    Preallocated ring buffer of recent keypoint positions.
+
+    Stores every frame as one row of a (window, 17, 2) float32 array with a
+    matching (window, 17) validity mask and a timestamp column, so appending
+    a frame allocates nothing and reads are NumPy views and masked gathers
+    rather than per-element Python loops.
+    """
+
+    def __init__(self, window: int = 120):
+        self.window = window
+        self.positions = np.zeros((window, NUM_KEYPOINTS, 2), dtype=np.float32)
+        self.valid = np.zeros((window, NUM_KEYPOINTS), dtype=bool)
+        self.timestamps = np.zeros(window, dtype=np.float64)
+        self.valid_counts = np.zeros(NUM_KEYPOINTS, dtype=np.int64)
+        self.head = 0  # Row the next frame is written to
+        self.size = 0
+        self._bits = np.arange(NUM_KEYPOINTS)
+
+    def clear(self):
+        self.valid[:] = False
+        self.valid_counts[:] = 0
+        self.head = 0
+        self.size = 0
+
+    def append(self, keypoint_positions: Mapping, timestamp: float):
+        """Add one frame's keypoints, given as a KeypointView or a name -> (x, y) mapping"""
+        row = self.head
+        if self.size == self.window:
+            # The oldest frame is about to be overwritten
+            self.valid_counts -= self.valid[row]
+
+        if isinstance(keypoint_positions, KeypointView):
+            self.positions[row] = keypoint_positions.array[:, :2]
+            self.valid[row] = (keypoint_positions.mask >> self._bits) & 1
+        else:
+            self.valid[row] = False
+            for name, position in keypoint_positions.items():
+                idx = KEYPOINT_INDEX.get(name)
+                if idx is not None:
+                    self.positions[row, idx] = position[:2]
+                    self.valid[row, idx] = True
+
+        self.timestamps[row] = timestamp
+        self.valid_counts += self.valid[row]
+        self.head = (row + 1) % self.window
+        self.size = min(self.size + 1, self.window)
+
+    def count(self, name: str) -> int:
+        """Number of frames in the window where the keypoint was visible"""
+        return int(self.valid_counts[KEYPOINT_INDEX[name]])
+
+    def _recent_rows(self, n: int) -> np.ndarray:
+        """Row indices of the last ``n`` frames, oldest first"""
+        n = min(n, self.size)
+        return (self.head - n + np.arange(n)) % self.window
+
+    def recent(self, name: str, n: int) -> np.ndarray:
+        """
+        The last ``n`` visible positions of a keypoint, oldest first.
+
+        Returns:
+            np.ndarray: (<=n, 2) array of (x, y)
+        """
+        idx = KEYPOINT_INDEX[name]
+        # Look back a few times further than needed first, so a long window
+        # only gets scanned in full when the keypoint is mostly missing
+        rows = self._recent_rows(4 * n)
+        rows = rows[self.valid[rows, idx]]
+        if len(rows) < n and self.size > 4 * n:
+            rows = self._recent_rows(self.size)
+            rows = rows[self.valid[rows, idx]]
+        return self.positions[rows[-n:], idx]
+
+    def recent_y(self, name: str, n: int) -> np.ndarray:
+        """The last ``n`` visible vertical positions of a keypoint, oldest first"""
+        return self.recent(name, n)[:, 1]
+
+    def recent_frames(self, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        The last ``n`` frames, oldest first.
+
+        Returns:
+            tuple: ((n, 17, 2) positions, (n, 17) validity, (n,) timestamps)
+        """
+        rows = self._recent_rows(n)
+        return self.positions[rows], self.valid[rows], self.timestamps[rows]
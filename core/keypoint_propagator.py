@@ -0,0 +1,126 @@
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core.keypoints import empty_keypoints, validity_mask
+
+if TYPE_CHECKING:
+    from core.pose_engine import PoseEngine
+
+
+class KeyframePoseEstimator:
+    """
+    Runs full pose inference only on keyframes and propagates the keypoints
+    to the frames in between with sparse Lucas-Kanade optical flow.
+
+    Every frame still gets keypoints, so ActivityTracker histories stay
+    continuous, while the model runs once every ``keyframe_interval`` frames.
+    Propagation re-anchors on a fresh inference early when too many keypoints
+    are lost or the forward-backward flow error shows they are drifting.
+
+    Flow is only meaningful between consecutive frames. Pass each frame's
+    sequence number to detect() and a gap (frames dropped upstream, or
+    handed to another worker of a multi-worker Pipeline) forces a keyframe.
+    With several workers each one mostly sees every n-th frame, so it mostly
+    runs full inference whatever the keyframe interval.
+    """
+
+    def __init__(self, pose_engine: "PoseEngine", keyframe_interval: int = 3,
+                 min_tracked_ratio: float = 0.6, max_drift_px: float = 2.0,
+                 confidence_decay: float = 0.97):
+        """
+        Args:
+            pose_engine: Engine used on keyframes
+            keyframe_interval: Run inference every this many frames (1 = every frame)
+            min_tracked_ratio: Re-anchor when fewer of the keyframe's keypoints survive
+            max_drift_px: Forward-backward error above which a keypoint is dropped
+            confidence_decay: Per-frame factor applied to propagated confidences
+        """
+        self.pose_engine = pose_engine
+        self.keyframe_interval = keyframe_interval
+        self.min_tracked_ratio = min_tracked_ratio
+        self.max_drift_px = max_drift_px
+        self.confidence_decay = confidence_decay
+        self.lk_params = dict(winSize=(21, 21), maxLevel=3,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+        self.inference_count = 0
+        self.propagated_count = 0
+        self.reset()
+
+    def reset(self):
+        self._prev_gray: Optional[np.ndarray] = None
+        self._prev_kpts = empty_keypoints()
+        self._keyframe_valid = 0
+        self._frames_since_keyframe = 0
+        self._prev_seq: Optional[int] = None
+
+    def detect(self, frame: np.ndarray, seq: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """
+        Same contract as PoseEngine.detect: (17, 3) keypoints and validity bitmask.
+
+        Args:
+            frame: The input video frame
+            seq: The frame's capture sequence number; when it does not follow
+                the previous frame's, this frame is a keyframe
+        """
+        if frame is None:
+            return empty_keypoints(), 0
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        consecutive = seq is None or self._prev_seq is None or seq == self._prev_seq + 1
+        self._prev_seq = seq
+
+        if (self._prev_gray is None or self.keyframe_interval <= 1 or not consecutive or
+                self._keyframe_valid == 0 or
+                self._frames_since_keyframe + 1 >= self.keyframe_interval):
+            return self._keyframe(frame, gray)
+
+        propagated = self._propagate(gray)
+        if propagated is None:
+            return self._keyframe(frame, gray)
+
+        kpts, mask = propagated
+        self._prev_gray = gray
+        self._prev_kpts = kpts
+        self._frames_since_keyframe += 1
+        self.propagated_count += 1
+        return kpts, mask
+
+    def _keyframe(self, frame: np.ndarray, gray: np.ndarray) -> Tuple[np.ndarray, int]:
+        kpts, mask = self.pose_engine.detect(frame)
+        self._prev_gray = gray
+        self._prev_kpts = kpts
+        self._keyframe_valid = bin(mask).count("1")
+        self._frames_since_keyframe = 0
+        self.inference_count += 1
+        return kpts, mask
+
+    def _propagate(self, gray: np.ndarray) -> Optional[Tuple[np.ndarray, int]]:
+        """Track the previous keypoints into ``gray``; None means re-anchor now"""
+        threshold = self.pose_engine.confidence_threshold
+        tracked = np.flatnonzero(self._prev_kpts[:, 2] > threshold)
+        if len(tracked) == 0:
+            return None
+
+        prev_pts = self._prev_kpts[tracked, :2].reshape(-1, 1, 2).astype(np.float32)
+        next_pts, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, prev_pts, None,
+                                                       **self.lk_params)
+        back_pts, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev_gray, next_pts, None,
+                                                            **self.lk_params)
+
+        fb_error = np.linalg.norm(back_pts - prev_pts, axis=2).ravel()
+        ok = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_drift_px)
+        if np.count_nonzero(ok) < self.min_tracked_ratio * self._keyframe_valid:
+            return None
+
+        kpts = empty_keypoints()
+        kept = tracked[ok]
+        kpts[kept, :2] = next_pts.reshape(-1, 2)[ok]
+        kpts[kept, 2] = self._prev_kpts[kept, 2] * self.confidence_decay
+
+        mask = validity_mask(kpts, threshold)
+        if bin(mask).count("1") < self.min_tracked_ratio * self._keyframe_valid:
+            return None
+        return kpts, mask
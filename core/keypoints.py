@@ -0,0 +1,98 @@
+from collections.abc import Mapping
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+NUM_KEYPOINTS = 17
+
+KEYPOINT_NAMES = (
+    "nose", "left_eye", "right_eye", "left_ear", "right_ear",
+    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
+    "left_wrist", "right_wrist", "left_hip", "right_hip",
+    "left_knee", "right_knee", "left_ankle", "right_ankle"
+)
+
+KEYPOINT_INDEX: Dict[str, int] = {name: idx for idx, name in enumerate(KEYPOINT_NAMES)}
+
+_BIT_WEIGHTS = np.left_shift(1, np.arange(NUM_KEYPOINTS, dtype=np.int64))
+
+
+def empty_keypoints() -> np.ndarray:
+    """Return the (17, 3) keypoint array used when nobody is detected"""
+    return np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
+
+
+def validity_mask(kpts: np.ndarray, confidence_threshold: float) -> int:
+    """Pack the keypoints whose confidence exceeds the threshold into a bitmask (bit i = keypoint i)"""
+    return int(_BIT_WEIGHTS[kpts[:NUM_KEYPOINTS, 2] > confidence_threshold].sum())
+
+
+def best_person_index(kpt_data: np.ndarray) -> int:
+    """Index of the person with the highest mean confidence over their detected keypoints"""
+    if len(kpt_data) <= 1:
+        return 0
+
+    # Mean over the detected (confidence > 0) keypoints of every person at once
+    conf = kpt_data[:, :, 2]
+    detected = conf > 0
+    counts = detected.sum(axis=1)
+    sums = np.where(detected, conf, 0.0).sum(axis=1)
+    avg_confidences = np.divide(sums, counts, out=np.full(len(kpt_data), -np.inf),
+                                where=counts > 0)
+    return int(np.argmax(avg_confidences))
+
+
+def select_best_person(kpt_data: np.ndarray, confidence_threshold: float) -> Tuple[np.ndarray, int]:
+    """
+    Pick the person with the highest mean keypoint confidence.
+
+    Args:
+        kpt_data: (people, 17, 3) array of (x, y, confidence) from the model
+        confidence_threshold: Minimum confidence for a keypoint to count as valid
+
+    Returns:
+        tuple: ((17, 3) float32 keypoints, validity bitmask)
+    """
+    if kpt_data is None or len(kpt_data) == 0:
+        return empty_keypoints(), 0
+
+    kpts = np.ascontiguousarray(kpt_data[best_person_index(kpt_data)], dtype=np.float32)
+    return kpts, validity_mask(kpts, confidence_threshold)
+
+
+class KeypointView(Mapping):
+    """
+    Read-only name -> (x, y) view over a keypoint array.
+
+    Lets callers written against the old dict of tuples keep working while the
+    engine only produces the (17, 3) array and bitmask. Tuples are built on
+    access, so code that never looks at a keypoint never pays for it.
+    """
+
+    __slots__ = ("array", "mask")
+
+    def __init__(self, array: Optional[np.ndarray] = None, mask: int = 0):
+        self.array = array if array is not None else empty_keypoints()
+        self.mask = mask
+
+    def __getitem__(self, name: str) -> Tuple[float, float]:
+        idx = KEYPOINT_INDEX.get(name)
+        if idx is None or not (self.mask >> idx) & 1:
+            raise KeyError(name)
+        return float(self.array[idx, 0]), float(self.array[idx, 1])
+
+    def __contains__(self, name) -> bool:
+        idx = KEYPOINT_INDEX.get(name)
+        return idx is not None and bool((self.mask >> idx) & 1)
+
+    def __iter__(self) -> Iterator[str]:
+        mask = self.mask
+        for idx, name in enumerate(KEYPOINT_NAMES):
+            if (mask >> idx) & 1:
+                yield name
+
+    def __len__(self) -> int:
+        return bin(self.mask).count("1")
+
+    def __repr__(self) -> str:
+        return f"KeypointView({dict(self)!r})"
@@ -0,0 +1,162 @@
+import itertools
+from typing import List, Tuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from core.keypoints import KeypointView, validity_mask
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of two sets of xyxy boxes, shaped (len(a), len(b))"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    a = a[:, np.newaxis, :]
+    b = b[np.newaxis, :, :]
+    width = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    height = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = width * height
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return intersection / np.maximum(area_a + area_b - intersection, 1e-9)
+
+
+class Track:
+    """One person followed across frames"""
+
+    __slots__ = ("track_id", "box", "velocity", "keypoints", "mask", "score",
+                 "hits", "last_seen")
+
+    def __init__(self, track_id: int, box: np.ndarray, keypoints: np.ndarray, mask: int,
+                 score: float, timestamp: float):
+        self.track_id = track_id
+        self.box = box.astype(np.float64)
+        self.velocity = np.zeros(4)  # Box edges' pixels per second
+        self.keypoints = keypoints
+        self.mask = mask
+        self.score = score
+        self.hits = 1
+        self.last_seen = timestamp
+
+    def predict(self, timestamp: float) -> np.ndarray:
+        """Box extrapolated to ``timestamp`` at constant velocity"""
+        return self.box + self.velocity * (timestamp - self.last_seen)
+
+    def update(self, box: np.ndarray, keypoints: np.ndarray, mask: int, score: float, timestamp: float):
+        dt = timestamp - self.last_seen
+        if dt > 0:
+            self.velocity = 0.7 * self.velocity + 0.3 * (box - self.box) / dt
+        self.box = box.astype(np.float64)
+        self.keypoints = keypoints
+        self.mask = mask
+        self.score = score
+        self.hits += 1
+        self.last_seen = timestamp
+
+    @property
+    def positions(self) -> KeypointView:
+        return KeypointView(self.keypoints, self.mask)
+
+    def __repr__(self) -> str:
+        return f"Track(id={self.track_id}, box={self.box.round(1).tolist()}, hits={self.hits})"
+
+
+class PersonTracker:
+    """
+    ID-stable multi-person tracker, associating detections to tracks by box IoU.
+
+    Follows ByteTrack: confident detections are matched to the predicted track
+    boxes first, then the remaining tracks get a second chance against the
+    low-confidence detections, which keeps IDs through partial occlusion. Only
+    confident detections start new tracks, and tracks not seen for
+    ``max_age`` seconds are dropped. Both rounds are a single Hungarian
+    assignment over a vectorized IoU matrix.
+    """
+
+    def __init__(self, high_threshold: float = 0.5, low_threshold: float = 0.1,
+                 match_iou: float = 0.3, max_age: float = 1.0, min_hits: int = 2):
+        """
+        Args:
+            high_threshold: Detection score for first-round matching and new tracks
+            low_threshold: Detections below this are ignored entirely
+            match_iou: Minimum IoU between a predicted track box and a detection
+            max_age: Seconds a track survives without a matching detection
+            min_hits: Matched frames before a track is reported
+        """
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.match_iou = match_iou
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.tracks: List[Track] = []
+        self._ids = itertools.count(1)
+
+    def reset(self):
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def _match(self, tracks: List[Track], boxes: np.ndarray,
+               timestamp: float) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+        """Hungarian assignment; returns (matches, unmatched track indices, unmatched detection indices)"""
+        if not tracks or len(boxes) == 0:
+            return [], list(range(len(tracks))), list(range(len(boxes)))
+
+        predicted = np.stack([track.predict(timestamp) for track in tracks])
+        iou = box_iou(predicted, boxes)
+        rows, cols = linear_sum_assignment(-iou)
+        accepted = iou[rows, cols] >= self.match_iou
+        matches = list(zip(rows[accepted].tolist(), cols[accepted].tolist()))
+
+        matched_tracks = set(rows[accepted].tolist())
+        matched_dets = set(cols[accepted].tolist())
+        return (matches,
+                [i for i in range(len(tracks)) if i not in matched_tracks],
+                [j for j in range(len(boxes)) if j not in matched_dets])
+
+    def update(self, keypoints: np.ndarray, boxes: np.ndarray, scores: np.ndarray,
+               timestamp: float, confidence_threshold: float = 0.5) -> List[Track]:
+        """
+        Associate one frame's detections with the existing tracks.
+
+        Args:
+            keypoints: (people, 17, 3) keypoints from PoseEngine.detect_people
+            boxes: (people, 4) xyxy person boxes
+            scores: (people,) box confidences
+            timestamp: Capture time of the frame in seconds
+            confidence_threshold: Keypoint confidence for the validity masks
+
+        Returns:
+            list: The confirmed tracks matched in this frame
+        """
+        keep = scores >= self.low_threshold
+        keypoints, boxes, scores = keypoints[keep], boxes[keep], scores[keep]
+        high = np.flatnonzero(scores >= self.high_threshold)
+        low = np.flatnonzero(scores < self.high_threshold)
+
+        def detection(det):
+            kpts = np.ascontiguousarray(keypoints[det], dtype=np.float32)
+            return boxes[det], kpts, validity_mask(kpts, confidence_threshold), float(scores[det])
+
+        def assign(track, det):
+            track.update(*detection(det), timestamp)
+
+        matched = []
+        matches, unmatched_tracks, unmatched_high = self._match(self.tracks, boxes[high], timestamp)
+        for t, d in matches:
+            assign(self.tracks[t], high[d])
+            matched.append(self.tracks[t])
+
+        remaining = [self.tracks[t] for t in unmatched_tracks]
+        matches, _, _ = self._match(remaining, boxes[low], timestamp)
+        for t, d in matches:
+            assign(remaining[t], low[d])
+            matched.append(remaining[t])
+
+        for d in unmatched_high:
+            track = Track(next(self._ids), *detection(high[d]), timestamp)
+            self.tracks.append(track)
+            matched.append(track)
+
+        self.tracks = [track for track in self.tracks if timestamp - track.last_seen <= self.max_age]
+        return sorted((track for track in matched if track.hits >= self.min_hits),
+                      key=lambda track: track.track_id)
@@ -0,0 +1,422 @@
+import multiprocessing as mp
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core.keypoints import KeypointView
+from utils.latency import STAGES, FrameTrace, get_latency_recorder
+from utils.shared_frames import SharedFrameBuffer
+from utils.startup import StartupProfile, get_startup_profile
+
+
+def _capture_main(source, frame_size: Tuple[int, int], buffer_spec, free_slots, frames, errors,
+                  stop, dropped, trace_frames: bool, workers_ready, num_workers: int, startup):
+    """Capture process: decode camera frames straight into free shared slots"""
+    # Open the camera while the models load; it takes about as long on some drivers
+    opened_at = time.perf_counter()
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened() and source == 0:
+        for alt_source in [1, 2, -1]:
+            cap = cv2.VideoCapture(alt_source)
+            if cap.isOpened():
+                break
+    if not cap.isOpened():
+        errors.put("Could not access any camera")
+        return
+
+    width, height = frame_size
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    startup.put(("camera_open", opened_at, time.perf_counter() - opened_at))
+
+    # Frames captured while the models are still loading would only be dropped
+    while workers_ready.value < num_workers:
+        if stop.wait(0.05):
+            cap.release()
+            return
+
+    buffer = SharedFrameBuffer.attach(buffer_spec)
+    # Cameras deliver at their own rate; play video files back in real time
+    frame_interval = 0.0 if isinstance(source, int) else 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0)
+    next_frame_at = time.monotonic()
+
+    seq = 0
+    raw_frame = None
+    consecutive_failures = 0
+    try:
+        while not stop.is_set():
+            ret, frame = cap.read(raw_frame)
+            if not ret:
+                consecutive_failures += 1
+                if consecutive_failures > 10:
+                    errors.put("Camera disconnected or not providing frames")
+                    break
+                continue
+            consecutive_failures = 0
+            raw_frame = frame
+            if frame_interval:
+                next_frame_at += frame_interval
+                stop.wait(max(0.0, next_frame_at - time.monotonic()))
+            trace = FrameTrace() if trace_frames else None
+            captured_at = time.monotonic()
+
+            try:
+                slot = free_slots.get_nowait()
+            except queue.Empty:
+                # Inference is behind: reuse the slot of the oldest frame still
+                # waiting for it, so the workers always get the newest frame
+                try:
+                    slot = frames.get_nowait()[0]
+                except queue.Empty:
+                    with dropped.get_lock():
+                        dropped.value += 1
+                    continue
+                with dropped.get_lock():
+                    dropped.value += 1
+
+            target = buffer.frames[slot]
+            if frame.shape == target.shape:
+                np.copyto(target, frame)
+            else:
+                cv2.resize(frame, (width, height), dst=target)
+            seq += 1
+            if trace is not None:
+                trace.mark("capture")
+            try:
+                frames.put_nowait((slot, seq, captured_at, trace))
+            except queue.Full:
+                free_slots.put(slot)
+                with dropped.get_lock():
+                    dropped.value += 1
+    finally:
+        cap.release()
+        buffer.close()
+
+
+def _inference_main(buffer_spec, free_slots, frames, results, errors, stop, ready, ready_at, keyframe_interval,
+                    engine_factory: Optional[Callable], engine_kwargs: Dict,
+                    startup, started_at: float, worker: int):
+    """Inference worker: detect and draw the skeleton in place in the shared slot"""
+    profile = get_startup_profile()
+    profile.record("spawn", started_at, time.perf_counter() - started_at)
+    buffer = None
+    slot = None
+    try:
+        from core.keypoint_propagator import KeyframePoseEstimator
+
+        if engine_factory is None:
+            with profile.phase("engine_import"):
+                from core.pose_engine import PoseEngine
+            engine_factory = PoseEngine
+        engine = engine_factory(**engine_kwargs)
+        if hasattr(engine, "warm_up"):
+            engine.warm_up()
+        estimator = KeyframePoseEstimator(engine, keyframe_interval.value)
+        buffer = SharedFrameBuffer.attach(buffer_spec)
+        for name, start, duration in profile.phases:
+            startup.put((f"inference[{worker}].{name}", start, duration))
+        with ready.get_lock():
+            ready.value += 1
+            # The last worker to get here stamps when the pool became ready
+            ready_at.value = time.perf_counter()
+
+        while not stop.is_set():
+            try:
+                item = frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+
+            slot, seq, captured_at, trace = item
+            if trace is not None:
+                trace.mark("queue")
+            frame = buffer.frames[slot]
+            estimator.keyframe_interval = keyframe_interval.value
+            kpts, mask = estimator.detect(frame, seq)
+            engine.render(frame, kpts, in_place=True)
+            if trace is not None:
+                trace.mark("inference")
+            results.put((slot, seq, captured_at, trace, kpts, mask))
+            slot = None
+    except Exception as e:
+        errors.put(f"Pose inference failed: {e}")
+        if slot is not None:
+            free_slots.put(slot)
+    finally:
+        if buffer is not None:
+            buffer.close()
+
+
+class PipelineFrame:
+    """
+    A finished frame: RGB pixels with the skeleton drawn, and the tracker's
+    feedback for it. The pixels live in a shared slot until release() is called;
+    use it as a context manager to release automatically.
+    """
+
+    __slots__ = ("pipeline", "slot", "seq", "frame", "positions", "feedback", "trace", "_released")
+
+    def __init__(self, pipeline: "Pipeline", slot: int, seq: int, positions: KeypointView,
+                 feedback: Dict, trace: Optional[FrameTrace]):
+        self.pipeline = pipeline
+        self.slot = slot
+        self.seq = seq
+        self.frame = pipeline.buffer.frames[slot]
+        self.positions = positions
+        self.feedback = feedback
+        self.trace = trace
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.pipeline._release_slot(self.slot)
+
+    def __enter__(self) -> "PipelineFrame":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class Pipeline:
+    """
+    Camera to screen in separate stages so no stage waits on another's GIL.
+
+        capture process -> inference worker processes -> metrics thread -> UI
+
+    Frames stay in a shared memory slot from capture to display; only slot
+    indices, keypoints and traces travel through the small control queues.
+    Slots are recycled from a free list. When inference falls behind, the
+    capture process takes back the oldest frame still waiting for a worker,
+    and the metrics stage keeps only the newest finished frame for the UI.
+    Either way frames are dropped rather than queued, so latency stays bounded.
+    """
+
+    def __init__(self, source=0, frame_size: Tuple[int, int] = (640, 480), num_workers: int = 1,
+                 activity_tracker=None, engine_kwargs: Optional[Dict] = None,
+                 engine_factory: Optional[Callable] = None, keyframe_interval: int = 1,
+                 trace_frames: bool = False):
+        """
+        Args:
+            source: Camera index or video path
+            frame_size: (width, height) frames are captured at
+            num_workers: Inference processes; each loads its own model
+            activity_tracker: Tracker updated with every finished frame, in order
+            engine_kwargs: Keyword arguments for each worker's PoseEngine
+            engine_factory: Picklable callable building the engine in each worker;
+                defaults to PoseEngine
+            keyframe_interval: Initial keyframe interval of each worker's
+                KeyframePoseEstimator; see set_keyframe_interval()
+            trace_frames: Stamp per-stage latency traces on every frame
+        """
+        self.source = source
+        self.frame_size = frame_size
+        self.num_workers = num_workers
+        self.activity_tracker = activity_tracker
+        self.engine_kwargs = engine_kwargs or {}
+        self.engine_factory = engine_factory
+        self.trace_frames = trace_frames
+        self.latency_recorder = get_latency_recorder()
+        self.draw_latency_overlay = False
+
+        # Spawned processes do not inherit the GUI's threads or the parent's model
+        self._ctx = mp.get_context("spawn")
+        # In flight: two per worker (queued and running), one in the metrics
+        # stage, one ready, one on screen and one being captured
+        self.num_slots = 2 * num_workers + 4
+        width, height = frame_size
+        self.buffer: Optional[SharedFrameBuffer] = None
+        self.frame_shape = (height, width, 3)
+
+        self._free_slots = self._ctx.Queue()
+        self._frames = self._ctx.Queue(maxsize=num_workers)
+        self._results = self._ctx.Queue()
+        self._errors = self._ctx.Queue()
+        self._startup = self._ctx.Queue()
+        self._stop = self._ctx.Event()
+        self._workers_ready = self._ctx.Value('i', 0)
+        self._workers_ready_at = self._ctx.Value('d', 0.0)
+        self._capture_dropped = self._ctx.Value('L', 0)
+        self._keyframe_interval = self._ctx.Value('i', keyframe_interval)
+
+        self._processes: List = []
+        self._metrics_thread: Optional[threading.Thread] = None
+        self._ready_lock = threading.Lock()
+        self._ready: Optional[PipelineFrame] = None
+        self._last_seq = 0
+        self._error: Optional[str] = None
+        self.stale_frames = 0
+
+        # Cold start of this pipeline, timed from start()
+        self.startup_profile: Optional[StartupProfile] = None
+        self.started_at: Optional[float] = None
+        self.first_keypoint_at: Optional[float] = None
+
+    def start(self) -> "Pipeline":
+        self.started_at = time.perf_counter()
+        self.startup_profile = StartupProfile(origin=self.started_at)
+        self.buffer = SharedFrameBuffer(self.frame_shape, self.num_slots)
+        for slot in range(self.num_slots):
+            self._free_slots.put(slot)
+
+        for worker in range(self.num_workers):
+            self._processes.append(self._ctx.Process(
+                target=_inference_main, name=f"inference-{worker}", daemon=True,
+                args=(self.buffer.spec, self._free_slots, self._frames, self._results, self._errors,
+                      self._stop, self._workers_ready, self._workers_ready_at, self._keyframe_interval,
+                      self.engine_factory, self.engine_kwargs, self._startup, self.started_at, worker)))
+        self._processes.append(self._ctx.Process(
+            target=_capture_main, name="capture", daemon=True,
+            args=(self.source, self.frame_size, self.buffer.spec, self._free_slots, self._frames,
+                  self._errors, self._stop, self._capture_dropped, self.trace_frames,
+                  self._workers_ready, self.num_workers, self._startup)))
+        for process in self._processes:
+            process.start()
+
+        self._metrics_thread = threading.Thread(target=self._metrics_loop, daemon=True)
+        self._metrics_thread.start()
+        return self
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until every worker has loaded its model, or the pipeline failed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._workers_ready.value < self.num_workers:
+            self._collect_startup_phases()
+            if self.get_error() or not all(p.is_alive() for p in self._processes[:self.num_workers]):
+                return False
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        # When the last worker reported ready, not when this poll noticed; frames may already be flowing
+        with self._workers_ready.get_lock():
+            self.startup_profile.mark("workers_ready", self._workers_ready_at.value)
+        self._collect_startup_phases()
+        return True
+
+    def _collect_startup_phases(self):
+        """Record the phases the worker processes timed into this pipeline's startup profile"""
+        while True:
+            try:
+                name, start, duration = self._startup.get_nowait()
+            except queue.Empty:
+                return
+            self.startup_profile.record(name, start, duration)
+
+    @property
+    def time_to_first_keypoint(self) -> Optional[float]:
+        """Seconds from start() until the first frame with a detected person was ready"""
+        if self.started_at is None or self.first_keypoint_at is None:
+            return None
+        return self.first_keypoint_at - self.started_at
+
+    def set_keyframe_interval(self, interval: int):
+        self._keyframe_interval.value = max(1, int(interval))
+
+    def get_error(self) -> Optional[str]:
+        if self._error is None:
+            try:
+                self._error = self._errors.get_nowait()
+            except queue.Empty:
+                # A process killed outright (e.g. out of memory) has no chance to report
+                for process in self._processes:
+                    if process.exitcode:
+                        self._error = f"{process.name} process exited with code {process.exitcode}"
+                        break
+        return self._error
+
+    @property
+    def dropped_frames(self) -> int:
+        """Frames captured but never shown"""
+        return self._capture_dropped.value + self.stale_frames
+
+    def _release_slot(self, slot: int):
+        self._free_slots.put(slot)
+
+    def _metrics_loop(self):
+        """Metrics stage: update the tracker in frame order and hand the newest frame to the UI"""
+        failed = False
+        while not self._stop.is_set():
+            try:
+                slot, seq, captured_at, trace, kpts, mask = self._results.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            if seq <= self._last_seq:
+                # A faster worker already delivered a newer frame
+                self.stale_frames += 1
+                self._release_slot(slot)
+                continue
+            self._last_seq = seq
+
+            try:
+                frame = self.buffer.frames[slot]
+                positions = KeypointView(kpts, mask)
+                feedback = {}
+                if positions and self.first_keypoint_at is None:
+                    self.first_keypoint_at = time.perf_counter()
+                    self.startup_profile.mark("first_keypoint", self.first_keypoint_at)
+                    self._collect_startup_phases()
+                if self.activity_tracker is not None and positions:
+                    feedback = self.activity_tracker.update_metrics(positions, frame.shape, timestamp=captured_at)
+                if trace is not None:
+                    trace.mark("metrics")
+
+                if self.draw_latency_overlay:
+                    self.latency_recorder.draw_overlay(frame, STAGES + ("total",))
+                cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
+                if trace is not None:
+                    trace.mark("convert")
+            except Exception as e:
+                self._release_slot(slot)
+                if not failed:
+                    # Reported once; the UI stops the pipeline when it sees it
+                    failed = True
+                    self._errors.put(f"Metrics update failed: {e}")
+                continue
+
+            ready = PipelineFrame(self, slot, seq, positions, feedback, trace)
+            with self._ready_lock:
+                previous, self._ready = self._ready, ready
+            if previous is not None:
+                self.stale_frames += 1
+                previous.release()
+
+    def take(self) -> Optional[PipelineFrame]:
+        """The newest finished frame not taken yet, or None; release it once displayed"""
+        with self._ready_lock:
+            ready, self._ready = self._ready, None
+        return ready
+
+    def stop(self):
+        self._stop.set()
+        for _ in range(self.num_workers):
+            try:
+                self._frames.put_nowait(None)
+            except queue.Full:
+                pass
+        metrics_stopped = True
+        if self._metrics_thread is not None:
+            self._metrics_thread.join(timeout=5.0)
+            metrics_stopped = not self._metrics_thread.is_alive()
+            self._metrics_thread = None
+        for process in self._processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+        with self._ready_lock:
+            ready, self._ready = self._ready, None
+        if ready is not None:
+            ready.release()
+        # A metrics thread stuck mid-frame still uses the slots; the block is
+        # then left to be freed at exit rather than pulled from under it
+        if self.buffer is not None and metrics_stopped:
+            self.buffer.close()
+            self.buffer = None
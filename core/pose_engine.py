@@ -1,37 +1,47 @@
 import cv2
 import numpy as np
 import os
-import tempfile
 import pathlib
-from ultralytics import YOLO
-import supervision as sv
+import time
 from typing import Optional, Dict, List, Tuple
+from core.inference_backends import DEFAULT_IMGSZ, DEFAULT_WEIGHTS, create_backend
+from core.keypoints import (KEYPOINT_NAMES, KeypointView, best_person_index, empty_keypoints,
+                            select_best_person, validity_mask)
+from core.roi_tracker import AdaptiveImageSize, RoiTracker, crop_image_size
+from utils.startup import get_startup_profile
 
 def setup_temp_dir():
+    """Scratch directory for the engine; the process-wide temp settings are left alone"""
     temp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp')
     os.makedirs(temp_dir, exist_ok=True)
-    os.environ['TMPDIR'] = temp_dir
-    os.environ['TEMP'] = temp_dir
-    os.environ['TMP'] = temp_dir
-    tempfile.tempdir = temp_dir
     return temp_dir
 
 class PoseEngine:
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None, weights: str = DEFAULT_WEIGHTS,
+                 imgsz: int = DEFAULT_IMGSZ, roi_tracking: bool = False,
+                 latency_budget_ms: Optional[float] = None, warm_up: bool = False):
+        """
+        Args:
+            backend: Inference runtime, one of inference_backends.BACKENDS; defaults
+                to the CVFIT_BACKEND environment variable, then "torch"
+            weights: PyTorch pose weights, exported for non-torch backends
+            imgsz: Inference image size, and the upper bound when it adapts
+            roi_tracking: Run detect() on a crop around the previously tracked
+                person instead of the full frame while tracking is confident
+            latency_budget_ms: When set, detect() lowers or raises the image size
+                to keep inference latency within this budget
+            warm_up: Run warm_up() before returning
+        """
         self.temp_dir = setup_temp_dir()
+        self.startup_profile = get_startup_profile()
 
-        self.model = YOLO('yolov8n-pose.pt')
-
-        self.box_annotator = sv.BoxAnnotator(
-            color=sv.ColorPalette.DEFAULT,
-            thickness=2
-        )
-        self.keypoint_names = {
-            0: "nose", 1: "left_eye", 2: "right_eye", 3: "left_ear", 4: "right_ear",
-            5: "left_shoulder", 6: "right_shoulder", 7: "left_elbow", 8: "right_elbow",
-            9: "left_wrist", 10: "right_wrist", 11: "left_hip", 12: "right_hip",
-            13: "left_knee", 14: "right_knee", 15: "left_ankle", 16: "right_ankle"
-        }
+        self.imgsz = imgsz
+        self.backend = create_backend(backend, weights=weights, imgsz=imgsz)
+        with self.startup_profile.phase("model_load"):
+            self.model = self.backend.load()
+
+        self._box_annotator = None
+        self.keypoint_names = dict(enumerate(KEYPOINT_NAMES))
         self.skeleton = [
             [5, 7], [7, 9],  # left arm
             [6, 8], [8, 10],  # right arm
@@ -48,6 +58,34 @@ class PoseEngine:
             "face": (255, 0, 255)    # magenta
         }
         self.confidence_threshold = 0.5
+        self._preview_buffer = None
+
+        self.roi_tracker = RoiTracker() if roi_tracking else None
+        self.image_size_controller = None
+        if latency_budget_ms is not None:
+            sizes = [size for size in (320, 416, 512, 640) if size < imgsz] + [imgsz]
+            self.image_size_controller = AdaptiveImageSize(latency_budget_ms, sizes)
+        self.last_region = None
+
+        if warm_up:
+            self.warm_up()
+
+    @property
+    def box_annotator(self):
+        # supervision is slow to import and only needed for box drawing
+        if self._box_annotator is None:
+            import supervision as sv
+            self._box_annotator = sv.BoxAnnotator(color=sv.ColorPalette.DEFAULT, thickness=2)
+        return self._box_annotator
+
+    def warm_up(self):
+        """
+        Run one inference on a blank frame so the first real frame does not pay
+        for lazy initialisation (predictor setup, kernel selection, allocator
+        growth). Leaves ROI and image size tracking untouched.
+        """
+        with self.startup_profile.phase("warm_up"):
+            self.model(np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8), imgsz=self.imgsz, verbose=False)
 
     def process_frame(self, frame: np.ndarray):
         """
@@ -59,63 +97,232 @@ class PoseEngine:
         Returns:
             tuple: (processed_frame, keypoint_positions)
                 - processed_frame: The annotated frame with full body tracking visualization
-                - keypoint_positions: Dictionary of detected keypoint positions for metrics
+                - keypoint_positions: Mapping of detected keypoint positions for metrics
         """
         if frame is None:
             return None, {}
 
-        display_frame = frame.copy()
+        kpts, mask = self.detect(frame)
+        display_frame = self.render(frame, kpts, in_place=False)
+
+        return display_frame, self.keypoints_to_positions(kpts, mask)
+
+    def process_batch(self, frames: List[np.ndarray]) -> List[Tuple[Optional[np.ndarray], Dict]]:
+        """
+        Process several frames with a single model call.
+
+        Args:
+            frames: Input frames, typically one per camera stream. ``None``
+                entries are passed through without running inference.
+
+        Returns:
+            list: One (processed_frame, keypoint_positions) tuple per input
+                frame, in the same order as ``frames``.
+        """
+        outputs = []
+        for frame, (kpts, mask) in zip(frames, self.detect_batch(frames)):
+            if frame is None:
+                outputs.append((None, {}))
+                continue
+            display_frame = self.render(frame, kpts, in_place=False)
+            outputs.append((display_frame, self.keypoints_to_positions(kpts, mask)))
+
+        return outputs
+
+    def detect(self, frame: np.ndarray) -> Tuple[np.ndarray, int]:
+        """
+        Keypoints-only fast path: run inference without touching the frame's pixels.
+
+        Args:
+            frame: The input video frame
+
+        Returns:
+            tuple: (keypoints, valid_mask)
+                - keypoints: (17, 3) float32 array of (x, y, confidence) for the
+                  most confident person, all zeros if nobody was detected
+                - valid_mask: Bitmask of keypoints above the confidence threshold
+        """
+        if frame is None:
+            return empty_keypoints(), 0
+
+        if self.roi_tracker is not None or self.image_size_controller is not None:
+            return self._detect_adaptive(frame)
+
+        results = self.model(frame, imgsz=self.imgsz)[0]
+        return self._select_keypoints(results)
+
+    def _detect_adaptive(self, frame: np.ndarray) -> Tuple[np.ndarray, int]:
+        """detect() with ROI cropping and/or latency-driven image size"""
+        imgsz = self.image_size_controller.imgsz if self.image_size_controller else self.imgsz
+        region = self.roi_tracker.next_region(frame.shape) if self.roi_tracker else None
+        self.last_region = region
+
+        source = frame
+        if region is not None:
+            x1, y1, x2, y2 = region
+            source = frame[y1:y2, x1:x2]
+            imgsz = crop_image_size(region, imgsz)
+
+        start = time.perf_counter()
+        results = self.model(source, imgsz=imgsz)[0]
+        if self.image_size_controller is not None:
+            self.image_size_controller.record((time.perf_counter() - start) * 1000.0)
+
+        keypoints = results.keypoints
+        if keypoints is None or len(keypoints) == 0:
+            if self.roi_tracker is not None:
+                self.roi_tracker.update(region, None, 0.0, 0)
+            return empty_keypoints(), 0
+
+        kpt_data = keypoints.data.cpu().numpy()
+        best_idx = best_person_index(kpt_data)
+        kpts = np.ascontiguousarray(kpt_data[best_idx], dtype=np.float32)
+        box = results.boxes.xyxy[best_idx].cpu().numpy()
+        box_confidence = float(results.boxes.conf[best_idx])
+
+        if region is not None:
+            # Map crop coordinates back onto the full frame
+            detected = kpts[:, 2] > 0
+            kpts[detected, 0] += region[0]
+            kpts[detected, 1] += region[1]
+            box = box + np.array([region[0], region[1], region[0], region[1]], dtype=box.dtype)
+
+        mask = validity_mask(kpts, self.confidence_threshold)
+        if self.roi_tracker is not None:
+            self.roi_tracker.update(region, box, box_confidence, bin(mask).count("1"))
+
+        return kpts, mask
+
+    def detect_batch(self, frames: List[np.ndarray]) -> List[Tuple[np.ndarray, int]]:
+        """Batched variant of detect(); ``None`` frames yield empty keypoints"""
+        outputs = [(empty_keypoints(), 0) for _ in frames]
+        valid_indices = [i for i, frame in enumerate(frames) if frame is not None]
+        if not valid_indices:
+            return outputs
+
+        results = self.model([frames[i] for i in valid_indices], imgsz=self.imgsz)
+        for i, result in zip(valid_indices, results):
+            outputs[i] = self._select_keypoints(result)
+
+        return outputs
+
+    def detect_people(self, frame: np.ndarray, min_score: float = 0.1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Keypoints of everyone in the frame, for multi-person tracking.
 
-        results = self.model(frame)[0]
+        Args:
+            frame: The input video frame
+            min_score: Lowest person box confidence returned; kept low so the
+                tracker can use weak detections to hold on to occluded people
 
+        Returns:
+            tuple: (keypoints, boxes, scores)
+                - keypoints: (people, 17, 3) float32 array of (x, y, confidence)
+                - boxes: (people, 4) float32 xyxy person boxes
+                - scores: (people,) float32 box confidences
+        """
+        if frame is None:
+            return (np.zeros((0,) + empty_keypoints().shape, dtype=np.float32),
+                    np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32))
+
+        results = self.model(frame, imgsz=self.imgsz, conf=min_score)[0]
         keypoints = results.keypoints
+        if keypoints is None or len(keypoints) == 0:
+            return self.detect_people(None)
 
-        keypoint_positions = {}
-
-        if keypoints is not None and len(keypoints) > 0:
-            kpt_data = keypoints.data.cpu().numpy()
-            best_person_idx = 0
-            if len(kpt_data) > 1:
-                avg_confidences = [np.mean([k[2] for k in person if k[2] > 0]) for person in kpt_data]
-                best_person_idx = np.argmax(avg_confidences)
-
-            kpts = kpt_data[best_person_idx]
-            for idx, kpt in enumerate(kpts):
-                if kpt[2] > self.confidence_threshold:
-                    keypoint_name = self.keypoint_names.get(idx, f"kpt_{idx}")
-                    keypoint_positions[keypoint_name] = (float(kpt[0]), float(kpt[1]))
-            for p1_idx, p2_idx in self.skeleton:
-                if (p1_idx < len(kpts) and p2_idx < len(kpts) and
-                    kpts[p1_idx][2] > self.confidence_threshold and kpts[p2_idx][2] > self.confidence_threshold):
-
-                    x1, y1 = int(kpts[p1_idx][0]), int(kpts[p1_idx][1])
-                    x2, y2 = int(kpts[p2_idx][0]), int(kpts[p2_idx][1])
-                    if p1_idx in [5, 6, 7, 8, 9, 10] and p2_idx in [5, 6, 7, 8, 9, 10]:
-                        color = self.color_map["arms"]
-                    elif p1_idx in [11, 12, 13, 14, 15, 16] and p2_idx in [11, 12, 13, 14, 15, 16]:
-                        color = self.color_map["legs"]
-                    else:
-                        color = self.color_map["torso"]
-
-                    cv2.line(display_frame, (x1, y1), (x2, y2), color, 2)
-            for idx, kpt in enumerate(kpts):
-                if kpt[2] > self.confidence_threshold:
-                    x, y = int(kpt[0]), int(kpt[1])
-                    if idx in [0, 1, 2, 3, 4]:
-                        color = self.color_map["face"]
-                    elif idx in [5, 6, 7, 8, 9, 10]:
-                        color = self.color_map["arms"]
-                    else:
-                        color = self.color_map["legs"]
-
-                    cv2.circle(display_frame, (x, y), 6, color, -1)
-                    if idx in [9, 10, 15, 16]:
-                        label = "L" if idx in [9, 15] else "R"
-                        cv2.putText(display_frame, label, (x+5, y+5),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-
-        if keypoint_positions:
+        return (keypoints.data.cpu().numpy().astype(np.float32, copy=False),
+                results.boxes.xyxy.cpu().numpy().astype(np.float32, copy=False),
+                results.boxes.conf.cpu().numpy().astype(np.float32, copy=False))
+
+    def _select_keypoints(self, results) -> Tuple[np.ndarray, int]:
+        """Pick the most confident person from one frame's model results"""
+        keypoints = results.keypoints
+        if keypoints is None or len(keypoints) == 0:
+            return empty_keypoints(), 0
+
+        return select_best_person(keypoints.data.cpu().numpy(), self.confidence_threshold)
+
+    def keypoints_to_positions(self, kpts: np.ndarray, mask: Optional[int] = None) -> KeypointView:
+        """Wrap a keypoint array in the lazy name -> (x, y) mapping used for metrics"""
+        if mask is None:
+            mask = validity_mask(kpts, self.confidence_threshold)
+        return KeypointView(kpts, mask)
+
+    def render(self, frame: np.ndarray, kpts: Optional[np.ndarray],
+               in_place: bool = True, preview_scale: float = 1.0) -> np.ndarray:
+        """
+        Draw the skeleton for a keypoint array.
+
+        Args:
+            frame: The frame the keypoints were detected on
+            kpts: (17, 3) keypoint array from detect()
+            in_place: Draw directly on ``frame`` instead of on a copy
+            preview_scale: When below 1.0, draw on a downscaled preview buffer
+                instead of a full-resolution frame
+
+        Returns:
+            np.ndarray: The annotated frame or preview buffer
+        """
+        if preview_scale < 1.0:
+            height, width = frame.shape[:2]
+            preview_size = (max(1, int(width * preview_scale)), max(1, int(height * preview_scale)))
+            if self._preview_buffer is None or self._preview_buffer.shape[:2] != preview_size[::-1]:
+                self._preview_buffer = np.empty((preview_size[1], preview_size[0], 3), dtype=np.uint8)
+            display_frame = cv2.resize(frame, preview_size, dst=self._preview_buffer,
+                                       interpolation=cv2.INTER_AREA)
+            scale = preview_scale
+        else:
+            display_frame = frame if in_place else frame.copy()
+            scale = 1.0
+
+        if kpts is None:
+            return display_frame
+
+        for p1_idx, p2_idx in self.skeleton:
+            if (p1_idx < len(kpts) and p2_idx < len(kpts) and
+                kpts[p1_idx][2] > self.confidence_threshold and kpts[p2_idx][2] > self.confidence_threshold):
+
+                x1, y1 = int(kpts[p1_idx][0] * scale), int(kpts[p1_idx][1] * scale)
+                x2, y2 = int(kpts[p2_idx][0] * scale), int(kpts[p2_idx][1] * scale)
+                if p1_idx in [5, 6, 7, 8, 9, 10] and p2_idx in [5, 6, 7, 8, 9, 10]:
+                    color = self.color_map["arms"]
+                elif p1_idx in [11, 12, 13, 14, 15, 16] and p2_idx in [11, 12, 13, 14, 15, 16]:
+                    color = self.color_map["legs"]
+                else:
+                    color = self.color_map["torso"]
+
+                cv2.line(display_frame, (x1, y1), (x2, y2), color, 2)
+
+        any_visible = False
+        for idx, kpt in enumerate(kpts):
+            if kpt[2] > self.confidence_threshold:
+                any_visible = True
+                x, y = int(kpt[0] * scale), int(kpt[1] * scale)
+                if idx in [0, 1, 2, 3, 4]:
+                    color = self.color_map["face"]
+                elif idx in [5, 6, 7, 8, 9, 10]:
+                    color = self.color_map["arms"]
+                else:
+                    color = self.color_map["legs"]
+
+                cv2.circle(display_frame, (x, y), 6, color, -1)
+                if idx in [9, 10, 15, 16]:
+                    label = "L" if idx in [9, 15] else "R"
+                    cv2.putText(display_frame, label, (x+5, y+5),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+
+        if any_visible:
             cv2.putText(display_frame, "Full body tracking active", (10, 30),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
 
-        return display_frame, keypoint_positions
+        return display_frame
+
+    def render_tracks(self, frame: np.ndarray, tracks: List, in_place: bool = True) -> np.ndarray:
+        """Draw every tracked person's skeleton labelled with their track ID"""
+        display_frame = frame if in_place else frame.copy()
+        for track in tracks:
+            self.render(display_frame, track.keypoints)
+            x1, y1 = int(track.box[0]), int(track.box[1])
+            cv2.putText(display_frame, f"#{track.track_id}", (x1, max(20, y1 - 8)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        return display_frame
@@ -0,0 +1,247 @@
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core.activity_tracker import ActivityTracker
+from core.clock import ManualClock
+from core.keypoints import NUM_KEYPOINTS
+
+# COCO per-keypoint OKS sigmas, in KEYPOINT_NAMES order
+OKS_SIGMAS = np.array([.26, .25, .25, .35, .35, .79, .79, .72, .72, .62, .62,
+                       1.07, 1.07, .87, .87, .89, .89], dtype=np.float64) / 10.0
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def load_frames(source: str, max_frames: int = 300, stride: int = 1) -> List[np.ndarray]:
+    """
+    Load BGR frames from a video file or a directory of images.
+
+    Args:
+        source: Path to a video file or an image directory
+        max_frames: Maximum number of frames to return
+        stride: Keep every ``stride``-th frame
+
+    Returns:
+        list: The loaded frames
+    """
+    frames = []
+    if os.path.isdir(source):
+        names = sorted(n for n in os.listdir(source) if n.lower().endswith(IMAGE_EXTENSIONS))
+        for name in names[::stride][:max_frames]:
+            frame = cv2.imread(os.path.join(source, name))
+            if frame is not None:
+                frames.append(frame)
+        return frames
+
+    cap = cv2.VideoCapture(source)
+    index = 0
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index % stride == 0:
+            frames.append(frame)
+        index += 1
+    cap.release()
+    return frames
+
+
+def letterbox(frame: np.ndarray, imgsz: int) -> np.ndarray:
+    """Resize and pad a BGR frame into the (1, 3, imgsz, imgsz) float32 tensor the exported model expects"""
+    height, width = frame.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return tensor[np.newaxis]
+
+
+def quantize_onnx_model(fp32_path: str, calibration_frames: List[np.ndarray],
+                        output_path: str, imgsz: int) -> str:
+    """
+    Statically quantize an exported ONNX pose model to INT8.
+
+    Args:
+        fp32_path: Exported fp32 ONNX model
+        calibration_frames: Recorded frames used to calibrate activation ranges
+        output_path: Where to write the INT8 model
+        imgsz: Input size the model was exported with
+
+    Returns:
+        str: output_path
+    """
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    if not calibration_frames:
+        raise ValueError("At least one calibration frame is required")
+
+    import onnxruntime as ort
+    input_name = ort.InferenceSession(fp32_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self.frames = iter(calibration_frames)
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            if frame is None:
+                return None
+            return {input_name: letterbox(frame, imgsz)}
+
+    quantize_static(fp32_path, output_path, FrameReader(),
+                    quant_format=QuantFormat.QDQ,
+                    per_channel=True,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8)
+    return output_path
+
+
+def keypoint_errors(reference: np.ndarray, ref_mask: int, candidate: np.ndarray, cand_mask: int,
+                    pck_alpha: float = 0.1) -> Optional[Dict[str, float]]:
+    """
+    Compare one frame's candidate keypoints against the reference model's.
+
+    Args:
+        reference: (17, 3) keypoints from the fp32 model
+        ref_mask: Validity bitmask of the reference keypoints
+        candidate: (17, 3) keypoints from the quantized model
+        cand_mask: Validity bitmask of the candidate keypoints
+        pck_alpha: PCK threshold as a fraction of the reference bounding box size
+
+    Returns:
+        dict: pck, oks and mean pixel error for the frame, or None when the
+            reference found no usable keypoints
+    """
+    bits = np.arange(NUM_KEYPOINTS)
+    ref_valid = ((ref_mask >> bits) & 1).astype(bool)
+    cand_valid = ((cand_mask >> bits) & 1).astype(bool)
+    if ref_valid.sum() < 2:
+        return None
+
+    ref_xy = reference[ref_valid, :2].astype(np.float64)
+    width, height = np.ptp(ref_xy[:, 0]), np.ptp(ref_xy[:, 1])
+    box_size = max(width, height, 1.0)
+    area = max(width * height, 1.0)
+
+    dist = np.linalg.norm(candidate[:, :2].astype(np.float64) - reference[:, :2], axis=1)
+    matched = ref_valid & cand_valid
+
+    pck = np.count_nonzero(matched & (dist < pck_alpha * box_size)) / ref_valid.sum()
+    similarity = np.exp(-dist ** 2 / (2 * area * (2 * OKS_SIGMAS) ** 2))
+    oks = np.where(matched, similarity, 0.0)[ref_valid].mean()
+    pixel_error = float(dist[matched].mean()) if matched.any() else float('nan')
+
+    return {"pck": float(pck), "oks": float(oks), "pixel_error": pixel_error}
+
+
+def replay_trackers(keypoint_streams: List[List], frame_shape: Tuple[int, ...], fps: float) -> List[Dict]:
+    """
+    Feed keypoint streams through one ActivityTracker each, timed at ``fps``.
+
+    Frames are timestamped from their index rather than the wall clock, so
+    the replay runs at CPU speed and every tracker sees identical timing.
+
+    Returns:
+        list: One end_session() summary per stream
+    """
+    clock = ManualClock()
+    trackers = [ActivityTracker(clock=clock) for _ in keypoint_streams]
+    for tracker in trackers:
+        tracker.start_session()
+
+    for frame_index, frame_positions in enumerate(zip(*keypoint_streams), start=1):
+        clock.set(frame_index / fps)
+        for tracker, positions in zip(trackers, frame_positions):
+            tracker.update_metrics(positions, frame_shape)
+
+    return [tracker.end_session() for tracker in trackers]
+
+
+def evaluate_quantized(reference_engine, candidate_engine, frames: Iterable[np.ndarray],
+                       fps: float = 30.0, pck_alpha: float = 0.1) -> Dict[str, float]:
+    """
+    Accuracy regression report for a quantized model against the fp32 one.
+
+    Args:
+        reference_engine: PoseEngine running the fp32 model
+        candidate_engine: PoseEngine running the quantized model
+        frames: Recorded evaluation frames, in order
+        fps: Frame rate the frames were recorded at, used for tracker replay
+        pck_alpha: PCK threshold as a fraction of the person's bounding box size
+
+    Returns:
+        dict: Keypoint error (PCK, OKS, pixel error), detection agreement and
+            the step count and cadence drift seen by ActivityTracker
+    """
+    frame_errors = []
+    reference_stream, candidate_stream = [], []
+    detection_matches = 0
+    frame_shape = None
+    num_frames = 0
+
+    for frame in frames:
+        frame_shape = frame.shape
+        num_frames += 1
+        ref_kpts, ref_mask = reference_engine.detect(frame)
+        cand_kpts, cand_mask = candidate_engine.detect(frame)
+
+        detection_matches += int(bool(ref_mask) == bool(cand_mask))
+        errors = keypoint_errors(ref_kpts, ref_mask, cand_kpts, cand_mask, pck_alpha)
+        if errors is not None:
+            frame_errors.append(errors)
+
+        reference_stream.append(reference_engine.keypoints_to_positions(ref_kpts, ref_mask))
+        candidate_stream.append(candidate_engine.keypoints_to_positions(cand_kpts, cand_mask))
+
+    if num_frames == 0:
+        return {}
+
+    reference_session, candidate_session = replay_trackers(
+        [reference_stream, candidate_stream], frame_shape, fps)
+    reference_steps = reference_session["steps_count"]
+    candidate_steps = candidate_session["steps_count"]
+    reference_cadence = reference_session["average_metrics"].get("avg_cadence", 0.0)
+    candidate_cadence = candidate_session["average_metrics"].get("avg_cadence", 0.0)
+
+    def mean_of(key):
+        values = [e[key] for e in frame_errors if not np.isnan(e[key])]
+        return float(np.mean(values)) if values else 0.0
+
+    return {
+        "frames": num_frames,
+        "evaluated_frames": len(frame_errors),
+        "pck": mean_of("pck"),
+        "oks": mean_of("oks"),
+        "pixel_error": mean_of("pixel_error"),
+        "detection_agreement": detection_matches / num_frames,
+        "reference_steps": reference_steps,
+        "candidate_steps": candidate_steps,
+        "step_drift": (candidate_steps - reference_steps) / max(1, reference_steps),
+        "reference_cadence": float(reference_cadence),
+        "candidate_cadence": float(candidate_cadence),
+        "cadence_drift": float(candidate_cadence - reference_cadence),
+    }
+
+
+def check_regression(report: Dict[str, float], min_oks: float = 0.9, min_pck: float = 0.9,
+                     max_step_drift: float = 0.02, max_cadence_drift: float = 3.0) -> List[str]:
+    """Return the list of thresholds the quantized model fails; empty means it is acceptable"""
+    failures = []
+    if report.get("oks", 0.0) < min_oks:
+        failures.append(f"OKS {report.get('oks', 0.0):.3f} < {min_oks}")
+    if report.get("pck", 0.0) < min_pck:
+        failures.append(f"PCK {report.get('pck', 0.0):.3f} < {min_pck}")
+    if abs(report.get("step_drift", 0.0)) > max_step_drift:
+        failures.append(f"step drift {report['step_drift']:+.1%} exceeds {max_step_drift:.0%}")
+    if abs(report.get("cadence_drift", 0.0)) > max_cadence_drift:
+        failures.append(f"cadence drift {report['cadence_drift']:+.1f} spm exceeds {max_cadence_drift}")
+    return failures
@@ -0,0 +1,123 @@
+from collections import deque
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+Box = Tuple[int, int, int, int]
+
+
+class RoiTracker:
+    """
+    Chooses the image region to run pose inference on.
+
+    While the person is tracked confidently, inference only needs to see an
+    expanded crop around their previous bounding box. A full-frame search runs
+    every ``full_frame_interval`` frames, and whenever the person is lost, so
+    someone stepping into a different part of the frame is still picked up.
+    """
+
+    def __init__(self, margin: float = 0.25, full_frame_interval: int = 30,
+                 min_valid_keypoints: int = 6, min_box_confidence: float = 0.5):
+        """
+        Args:
+            margin: Fraction of the box size added on every side of the crop
+            full_frame_interval: Force a full-frame search after this many cropped frames
+            min_valid_keypoints: Keypoints needed to consider the person tracked
+            min_box_confidence: Detection confidence needed to consider the person tracked
+        """
+        self.margin = margin
+        self.full_frame_interval = full_frame_interval
+        self.min_valid_keypoints = min_valid_keypoints
+        self.min_box_confidence = min_box_confidence
+        self.last_box: Optional[Box] = None
+        self.frames_since_full = 0
+
+    def reset(self):
+        self.last_box = None
+        self.frames_since_full = 0
+
+    def next_region(self, frame_shape: Sequence[int]) -> Optional[Box]:
+        """Return the (x1, y1, x2, y2) crop to run inference on, or None for the full frame"""
+        if self.last_box is None or self.frames_since_full >= self.full_frame_interval:
+            return None
+
+        height, width = frame_shape[:2]
+        x1, y1, x2, y2 = self.last_box
+        pad_x = (x2 - x1) * self.margin
+        pad_y = (y2 - y1) * self.margin
+        region = (max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y)),
+                  min(width, int(x2 + pad_x)), min(height, int(y2 + pad_y)))
+
+        # A crop covering most of the frame saves nothing over the full search
+        if (region[2] - region[0]) * (region[3] - region[1]) > 0.8 * width * height:
+            return None
+        return region
+
+    def update(self, region: Optional[Box], box: Optional[Sequence[float]],
+               box_confidence: float, valid_keypoints: int):
+        """
+        Record the outcome of an inference call.
+
+        Args:
+            region: The crop that was used, or None for a full-frame search
+            box: Person bounding box in frame coordinates, or None if nobody was found
+            box_confidence: Detection confidence of that box
+            valid_keypoints: Number of keypoints above the confidence threshold
+        """
+        self.frames_since_full = 0 if region is None else self.frames_since_full + 1
+
+        if (box is None or box_confidence < self.min_box_confidence or
+                valid_keypoints < self.min_valid_keypoints):
+            # Lost the person: the next frame falls back to a full-frame search
+            self.last_box = None
+            return
+
+        self.last_box = tuple(int(v) for v in box)
+
+
+class AdaptiveImageSize:
+    """
+    Steps the inference image size down when measured latency exceeds the
+    budget, and back up when there is comfortable headroom.
+    """
+
+    def __init__(self, latency_budget_ms: float, sizes: Sequence[int] = (320, 416, 512, 640),
+                 window: int = 15, headroom: float = 0.6):
+        """
+        Args:
+            latency_budget_ms: Target per-frame inference latency
+            sizes: Allowed image sizes (multiples of the model stride, 32), ascending
+            window: Number of recent latencies to average before changing size
+            headroom: Step up only while latency is below this fraction of the budget
+        """
+        self.latency_budget_ms = latency_budget_ms
+        self.sizes = sorted(sizes)
+        self.headroom = headroom
+        self.level = len(self.sizes) - 1
+        self.samples = deque(maxlen=window)
+
+    @property
+    def imgsz(self) -> int:
+        return self.sizes[self.level]
+
+    def record(self, latency_ms: float) -> int:
+        """Add one latency measurement and return the image size to use next"""
+        self.samples.append(latency_ms)
+        if len(self.samples) < self.samples.maxlen:
+            return self.imgsz
+
+        average = float(np.mean(self.samples))
+        if average > self.latency_budget_ms and self.level > 0:
+            self.level -= 1
+            self.samples.clear()
+        elif average < self.latency_budget_ms * self.headroom and self.level < len(self.sizes) - 1:
+            self.level += 1
+            self.samples.clear()
+
+        return self.imgsz
+
+
+def crop_image_size(region: Box, max_imgsz: int, stride: int = 32) -> int:
+    """Smallest stride multiple covering the crop, so small crops are not upscaled"""
+    longest = max(region[2] - region[0], region[3] - region[1])
+    return int(min(max_imgsz, max(stride, -(-longest // stride) * stride)))
@@ -0,0 +1,154 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.signal import butter, sosfilt, sosfilt_zi
+
+from core.keypoints import KEYPOINT_INDEX
+
+# Vertical signals the detector follows, in priority order: ankles are the
+# most direct view of foot strike, knees and then wrists are fallbacks
+SOURCES = (
+    ("ankle", ("left_ankle", "right_ankle")),
+    ("knee", ("left_knee", "right_knee")),
+    ("wrist", ("left_wrist", "right_wrist")),
+)
+CHANNEL_NAMES = tuple(name for _, names in SOURCES for name in names)
+CHANNEL_INDEX = np.array([KEYPOINT_INDEX[name] for name in CHANNEL_NAMES])
+
+
+class StepDetector:
+    """
+    Streaming step detector on filtered keypoint heights.
+
+    Each ankle, knee and wrist height is band-passed by a causal Butterworth
+    filter whose state persists between frames, so every frame costs the same
+    few multiply-adds however long the session runs. A step is a local maximum
+    of the filtered signal (the limb at its lowest point in the image) that
+    stands out from the channel's running RMS, taken from the highest-priority
+    visible body part and separated from the previous step by a refractory
+    period in seconds.
+    """
+
+    def __init__(self, low_hz: float = 0.7, high_hz: float = 4.0, order: int = 2,
+                 refractory: float = 0.25, min_amplitude: float = 3.0,
+                 peak_ratio: float = 0.8, warmup: int = 8, max_gap: float = 0.5,
+                 sample_rate: float = 30.0):
+        """
+        Args:
+            low_hz: Lower band edge; removes drift as the runner moves on the belt
+            high_hz: Upper band edge; removes detection jitter
+            order: Butterworth order of each band edge
+            refractory: Minimum time between two steps in seconds (0.25 s is 240 spm)
+            min_amplitude: Smallest filtered peak height in pixels counted as a step
+            peak_ratio: Peak height required relative to the channel's running RMS
+            warmup: Frames a channel must be followed before its peaks count
+            max_gap: A channel missing for longer than this (seconds) restarts its filter
+            sample_rate: Initial frame rate the filter is designed for; it is
+                redesigned if the measured frame rate moves away from it
+        """
+        self.low_hz = low_hz
+        self.high_hz = high_hz
+        self.order = order
+        self.refractory = refractory
+        self.min_amplitude = min_amplitude
+        self.peak_ratio = peak_ratio
+        self.warmup = warmup
+        self.max_gap = max_gap
+        self.rms_decay = 0.97
+
+        self._design(sample_rate)
+        self.reset()
+
+    def _design(self, sample_rate: float):
+        self.sample_rate = sample_rate
+        nyquist = sample_rate / 2.0
+        high = min(self.high_hz, 0.9 * nyquist)
+        self.sos = butter(self.order, [self.low_hz, high], btype='bandpass', fs=sample_rate, output='sos')
+        self._zi = sosfilt_zi(self.sos)  # (sections, 2) steady-state response to a unit step
+
+    def reset(self):
+        """Forget all filter state, e.g. after a gap in the stream"""
+        channels = len(CHANNEL_NAMES)
+        self.state = np.zeros((self.sos.shape[0], channels, 2))
+        self.filtered = np.zeros((channels, 2))  # Last two filtered values per channel
+        self.mean_square = np.zeros(channels)
+        self.samples = np.zeros(channels, dtype=np.int64)
+        self.last_seen = np.full(channels, -np.inf)
+        self.last_timestamp: Optional[float] = None
+        self.frame_interval: Optional[float] = None
+        self.last_step_time = -np.inf
+
+    def _track_frame_rate(self, timestamp: float):
+        """Follow the stream's frame rate and redesign the filter if it drifts"""
+        if self.last_timestamp is not None:
+            dt = timestamp - self.last_timestamp
+            if dt > 0:
+                self.frame_interval = dt if self.frame_interval is None else 0.9 * self.frame_interval + 0.1 * dt
+                measured = 1.0 / self.frame_interval
+                if abs(measured - self.sample_rate) > 0.25 * self.sample_rate and self.samples.max() >= self.warmup:
+                    self._design(measured)
+                    self.reset()
+                    self.frame_interval = 1.0 / measured
+
+    def update(self, positions: np.ndarray, valid: np.ndarray, timestamp: float) -> Optional[Tuple[float, str]]:
+        """
+        Feed one frame of keypoints.
+
+        Args:
+            positions: (17, 2) keypoint positions
+            valid: (17,) visibility of each keypoint
+            timestamp: Capture time of the frame in seconds
+
+        Returns:
+            tuple: (step time, source body part) if a step completed, else None
+        """
+        self._track_frame_rate(timestamp)
+        previous_timestamp = self.last_timestamp
+        self.last_timestamp = timestamp
+
+        heights = positions[CHANNEL_INDEX, 1].astype(np.float64)
+        visible = valid[CHANNEL_INDEX].astype(bool)
+
+        # Channels that are new or were gone too long start from their current
+        # height, so the filter does not ring on the first sample
+        restart = visible & ((self.samples == 0) | (timestamp - self.last_seen > self.max_gap))
+        if restart.any():
+            self.state[:, restart, :] = self._zi[:, np.newaxis, :] * heights[restart, np.newaxis]
+            self.filtered[restart] = 0.0
+            self.mean_square[restart] = 0.0
+            self.samples[restart] = 0
+
+        out, state = sosfilt(self.sos, heights[:, np.newaxis], axis=-1, zi=self.state)
+        self.state = np.where(visible[np.newaxis, :, np.newaxis], state, self.state)
+        value = out[:, 0]
+
+        # Whether each channel has been followed long enough, judged before
+        # this frame is counted so peaks and source selection agree
+        warmed = visible & (self.samples >= self.warmup)
+
+        older, newer = self.filtered[:, 0], self.filtered[:, 1]
+        is_peak = (warmed &
+                   (newer > older) & (newer >= value) &
+                   (newer > self.min_amplitude) &
+                   (newer * newer > self.peak_ratio ** 2 * self.mean_square))
+
+        self.filtered = np.where(visible[:, np.newaxis], np.stack([newer, value], axis=1), self.filtered)
+        self.mean_square = np.where(
+            visible, self.rms_decay * self.mean_square + (1 - self.rms_decay) * value * value, self.mean_square)
+        self.samples += visible
+        self.last_seen = np.where(visible, timestamp, self.last_seen)
+
+        # Only the best body part currently in view may report a step
+        for group, (source, _) in enumerate(SOURCES):
+            pair = slice(2 * group, 2 * group + 2)
+            if not warmed[pair].any():
+                continue
+            if not is_peak[pair].any():
+                return None
+            # The peak was the previous frame
+            step_time = previous_timestamp if previous_timestamp is not None else timestamp
+            if step_time - self.last_step_time < self.refractory:
+                return None
+            self.last_step_time = step_time
+            return step_time, source
+        return None
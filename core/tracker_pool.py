@@ -0,0 +1,81 @@
+from typing import Callable, Dict, Iterable, Optional
+
+from core.activity_tracker import ActivityTracker
+from core.clock import Clock, SystemClock
+
+
+class ActivityTrackerPool:
+    """
+    One ActivityTracker per tracked person, keyed by track ID.
+
+    A tracker and its session start the first time an ID is seen. A tracker
+    whose person has not been seen for ``idle_timeout`` seconds has its session
+    ended and handed to ``on_session_end``, then it is evicted from the pool.
+    """
+
+    def __init__(self, clock: Optional[Clock] = None, idle_timeout: float = 5.0,
+                 on_session_end: Optional[Callable[[int, Dict], None]] = None):
+        """
+        Args:
+            clock: Time source shared by every tracker; defaults to the system clock
+            idle_timeout: Seconds without an update before a person's session ends
+            on_session_end: Called with (track_id, session summary) on eviction
+        """
+        self.clock = clock or SystemClock()
+        self.idle_timeout = idle_timeout
+        self.on_session_end = on_session_end
+        self.trackers: Dict[int, ActivityTracker] = {}
+        self.last_seen: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.trackers)
+
+    def __contains__(self, track_id: int) -> bool:
+        return track_id in self.trackers
+
+    def get(self, track_id: int) -> Optional[ActivityTracker]:
+        return self.trackers.get(track_id)
+
+    def update(self, tracks: Iterable, frame_size, timestamp: Optional[float] = None) -> Dict[int, Dict]:
+        """
+        Update every tracked person's metrics for one frame.
+
+        Args:
+            tracks: Tracks matched in this frame, from PersonTracker.update
+            frame_size: Shape of the frame the keypoints came from
+            timestamp: Capture time of the frame; defaults to the clock's current time
+
+        Returns:
+            dict: track_id -> update_metrics() feedback
+        """
+        now = timestamp if timestamp is not None else self.clock.now()
+        feedback = {}
+        for track in tracks:
+            tracker = self.trackers.get(track.track_id)
+            if tracker is None:
+                tracker = ActivityTracker(clock=self.clock)
+                tracker.start_session(now)
+                self.trackers[track.track_id] = tracker
+            self.last_seen[track.track_id] = now
+            feedback[track.track_id] = tracker.update_metrics(track.positions, frame_size, timestamp=now)
+
+        self.evict_idle(now)
+        return feedback
+
+    def evict_idle(self, now: Optional[float] = None) -> Dict[int, Dict]:
+        """End and drop the sessions of people not seen for ``idle_timeout`` seconds"""
+        now = now if now is not None else self.clock.now()
+        idle = [track_id for track_id, seen in self.last_seen.items() if now - seen > self.idle_timeout]
+        return {track_id: self._end(track_id, self.last_seen[track_id]) for track_id in idle}
+
+    def end_all(self) -> Dict[int, Dict]:
+        """End every session, e.g. when the class finishes"""
+        return {track_id: self._end(track_id, seen) for track_id, seen in list(self.last_seen.items())}
+
+    def _end(self, track_id: int, end_time: float) -> Dict:
+        tracker = self.trackers.pop(track_id)
+        del self.last_seen[track_id]
+        summary = tracker.end_session(end_time)
+        if self.on_session_end is not None:
+            self.on_session_end(track_id, summary)
+        return summary
@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 
+import multiprocessing
 import sys
 from gui.app import main
 
 if __name__ == "__main__":
+    # Frozen builds re-run this script for the pipeline's worker processes
+    multiprocessing.freeze_support()
     try:
         main()
     except Exception as e:
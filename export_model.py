@@ -0,0 +1,18 @@
+import argparse
+
+from core.inference_backends import BACKENDS, DEFAULT_IMGSZ, DEFAULT_WEIGHTS, create_backend
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the pose model for a CPU inference backend")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='onnx')
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--imgsz', type=int, default=DEFAULT_IMGSZ)
+    parser.add_argument('--force', action='store_true', help="Re-export even if a cached model exists")
+    args = parser.parse_args()
+
+    backend = create_backend(args.backend, weights=args.weights, imgsz=args.imgsz)
+    path = backend.prepare(force=args.force)
+    print(f"Model for the '{backend.name}' backend is at {path}")
+
+if __name__ == '__main__':
+    main()
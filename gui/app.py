@@ -16,10 +16,12 @@ import matplotlib.pyplot as plt
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.pose_engine import PoseEngine
-from utils.video_capture import VideoCapture
+from core.inference_backends import create_backend
+from core.pipeline import Pipeline
 from core.activity_tracker import ActivityTracker
 from services.analytics_service import AnalyticsService
+from services.session_store import SessionStore
+from utils.latency import get_latency_recorder
 
 class CVFitGUI:
     def __init__(self, root):
@@ -27,16 +29,20 @@ class CVFitGUI:
         self.root.title("CVFit - Fitness Tracking")
         self.root.geometry("1720x1200")
 
-        self.pose_engine = None
         self.activity_tracker = None
         self.analytics_service = None
-        self.video_capture = None
+        self.session_store = None
+        self.store_session_id = None
+        self.pipeline = None
 
         self.processing = False
         self.frame_skip = 0
         self.frame_count = 0
         self.last_update_time = time.time()
         self.fps = 0
+        self.latency_recorder = get_latency_recorder()
+        self._frame_scheduled_at = None
+        self._startup_reported = False
 
         self.current_speed = 0.0
         self.current_distance = 0.0
@@ -60,16 +66,36 @@ class CVFitGUI:
     def _load_components(self):
         """Load heavy components in background"""
         try:
-            self.root.after(0, lambda: self.status_label.config(text="Loading pose detection model..."))
-            self.pose_engine = PoseEngine()
+            # The pose model itself is loaded by the pipeline's inference workers
             self.activity_tracker = ActivityTracker()
-            self.analytics_service = AnalyticsService()
+            self.session_store = SessionStore()
+            self.analytics_service = AnalyticsService(store=self.session_store)
             self.root.after(0, lambda: self.status_label.config(text="Ready to start tracking"))
+            self._prepare_model_cache()
         except Exception as e:
             self.root.after(0, lambda: self.status_label.config(text=f"Error loading components: {str(e)}"))
             self.root.after(0, lambda: messagebox.showerror("Initialization Error",
                                                           f"Failed to initialize components: {str(e)}"))
 
+    def _prepare_model_cache(self):
+        """Build the converted model now, so the first Start Tracking only has to load it"""
+        try:
+            backend = create_backend()
+            if not backend.is_cached():
+                backend.prepare()
+        except Exception as e:
+            # The inference workers try again, and report the error, when tracking starts
+            print(f"Could not prepare the model cache: {e}")
+
+    def _report_startup(self):
+        """Show and print how long this start took to reach the first detected person"""
+        self._startup_reported = True
+        profile = self.pipeline.startup_profile
+        print(f"Cold start, seconds since Start Tracking:\n{profile.format()}")
+        if os.environ.get('CVFIT_STARTUP_REPORT'):
+            profile.dump(os.environ['CVFIT_STARTUP_REPORT'])
+        self.status_label.config(text=f"First pose detected after {self.pipeline.time_to_first_keypoint:.1f}s")
+
     def create_placeholder_image(self):
         """Create a placeholder image for when no camera feed is available"""
         width, height = 1200, 720
@@ -155,16 +181,21 @@ class CVFitGUI:
         perf_frame = ttk.Frame(self.settings_frame)
         perf_frame.pack(fill=tk.X, pady=5)
 
-        ttk.Label(perf_frame, text="Frame Skip:").pack(side=tk.LEFT, padx=5)
+        ttk.Label(perf_frame, text="Keyframe Interval:").pack(side=tk.LEFT, padx=5)
 
-        self.skip_var = IntVar(value=0)
-        skip_scale = Scale(perf_frame, from_=0, to=5, orient=tk.HORIZONTAL,
-                         variable=self.skip_var, length=150)
-        skip_scale.pack(side=tk.LEFT, padx=5)
+        # Inference runs every N frames; optical flow fills in the frames between
+        self.keyframe_var = IntVar(value=1)
+        keyframe_scale = Scale(perf_frame, from_=1, to=6, orient=tk.HORIZONTAL,
+                             variable=self.keyframe_var, length=150)
+        keyframe_scale.pack(side=tk.LEFT, padx=5)
 
         self.fps_label = ttk.Label(perf_frame, text="FPS: 0")
         self.fps_label.pack(side=tk.RIGHT, padx=15)
 
+        self.latency_overlay_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(perf_frame, text="Latency overlay",
+                        variable=self.latency_overlay_var).pack(side=tk.RIGHT, padx=5)
+
         self.controls_frame = ttk.Frame(self.main_frame)
         self.controls_frame.pack(fill=tk.X, pady=10)
 
@@ -200,13 +231,13 @@ class CVFitGUI:
 
     def update_resolution(self, event=None):
         """Update video resolution settings"""
-        if self.video_capture:
-            width, height = map(int, self.resolution_var.get().split('x'))
-            self.video_capture.set_frame_dimensions(width, height)
+        if self.pipeline:
+            # The shared frame buffers are sized when the pipeline starts
+            self.status_label.config(text="New resolution applies to the next session")
 
     def start_tracking(self):
         """Start video tracking with improved error handling"""
-        if self.pose_engine is None:
+        if self.activity_tracker is None:
             messagebox.showinfo("Please Wait", "Components are still loading. Please try again in a moment.")
             return
 
@@ -222,22 +253,26 @@ class CVFitGUI:
         threading.Thread(target=self._initialize_tracking, daemon=True).start()
 
     def _initialize_tracking(self):
-        """Initialize video capture in a separate thread"""
+        """Start the capture and inference processes in a separate thread"""
         try:
             width, height = map(int, self.resolution_var.get().split('x'))
 
             camera_idx = self.camera_source.get()
 
-            self.video_capture = VideoCapture(camera_idx)
-            self.video_capture.set_frame_dimensions(width, height)
-            self.video_capture.start()
-
-            time.sleep(0.5)
+            # Start the session before frames can reach the metrics stage
+            self.activity_tracker.start_session()
+            self.pipeline = Pipeline(camera_idx, frame_size=(width, height),
+                                     activity_tracker=self.activity_tracker,
+                                     engine_kwargs={"roi_tracking": True},
+                                     keyframe_interval=self.keyframe_var.get(),
+                                     trace_frames=True)
+            self.root.after(0, lambda: self.status_label.config(text="Loading pose detection model..."))
+            self.pipeline.start()
 
-            if self.video_capture.is_opened():
+            if self.pipeline.wait_ready(timeout=120):
                 self.root.after(0, self._enable_tracking)
             else:
-                error = self.video_capture.get_error() or "Could not access camera"
+                error = self.pipeline.get_error() or "Pose detection workers failed to start"
                 self.root.after(0, lambda: messagebox.showerror("Camera Error", error))
                 self.root.after(0, self._reset_ui)
         except Exception as e:
@@ -258,9 +293,12 @@ class CVFitGUI:
         self.current_calories = 0.0
         self.metrics_history = []
         self.last_metrics_update = time.time()
+        self.latency_recorder.reset()
+        self._startup_reported = False
+        if self.session_store:
+            self.store_session_id = self.session_store.begin_session()
 
         if self.activity_tracker:
-            self.activity_tracker.start_session()
             self.status_label.config(text="Tracking active - Move your arms to count steps")
 
         self.update_frame()
@@ -270,36 +308,35 @@ class CVFitGUI:
         """Reset UI after errors"""
         self.progress.stop()
         self.status_label.config(text="Ready to start tracking")
-        if self.video_capture:
-            self.video_capture.release()
-            self.video_capture = None
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
 
         self._show_placeholder()
 
     def stop_tracking(self):
         """Stop video tracking with proper cleanup and save session data"""
-        if self.processing and self.session_start_time:
+        was_processing = self.processing
+        self.processing = False
+        # Stop the metrics thread before ending the tracker's session under it
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
+
+        if was_processing and self.session_start_time:
             self.total_sessions += 1
             self.total_distance += self.current_distance
 
             duration = (datetime.now() - self.session_start_time).total_seconds()
+            session_data = {}
             if duration > 0:
-                session_data = {
-                    "date": datetime.now(),
-                    "duration": duration,
-                    "distance": self.current_distance,
-                    "calories": self.current_calories,
-                    "average_metrics": {
-                        "avg_speed": self.current_speed,
-                        "avg_cadence": 160.0,
-                        "avg_stride_length": 1.2
-                    }
-                }
+                session_data = self.activity_tracker.end_session()
 
                 if self.analytics_service:
                     try:
-                        if hasattr(self.analytics_service, 'add_session'):
-                            self.analytics_service.add_session(session_data)
+                        if session_data:
+                            self.analytics_service.add_workout_session(session_data, self.store_session_id)
+                            self.store_session_id = None
 
                         distance_str = f"{self.current_distance:.1f} meters"
                         if self.current_distance >= 1000:
@@ -317,10 +354,17 @@ class CVFitGUI:
                     except Exception as e:
                         print(f"Error saving session data: {str(e)}")
 
-        self.processing = False
-        if self.video_capture:
-            self.video_capture.release()
-            self.video_capture = None
+            if self.session_store and self.store_session_id:
+                # Nothing went to the analytics service; still close the stored session
+                self.session_store.end_session(self.store_session_id, session_data)
+                self.store_session_id = None
+
+        latency_report = os.environ.get("CVFIT_LATENCY_REPORT")
+        if latency_report:
+            try:
+                self.latency_recorder.dump(latency_report)
+            except OSError as e:
+                print(f"Error writing latency report: {str(e)}")
 
         self.start_button.configure(state=tk.NORMAL)
         self.stop_button.configure(state=tk.DISABLED)
@@ -334,51 +378,53 @@ class CVFitGUI:
         if not self.processing:
             return
 
+        if self._frame_scheduled_at is not None:
+            # How late Tk ran this callback compared to the requested delay
+            scheduled_at, delay = self._frame_scheduled_at
+            lag_ms = (time.perf_counter() - scheduled_at) * 1000.0 - delay
+            self.latency_recorder.record("tk_schedule", max(0.0, lag_ms))
+            self._frame_scheduled_at = None
+
         try:
-            if self.video_capture:
-                error = self.video_capture.get_error()
+            if self.pipeline:
+                error = self.pipeline.get_error()
                 if error:
                     self.status_label.config(text=f"Camera error: {error}")
                     self.stop_tracking()
                     messagebox.showerror("Camera Error", error)
                     return
 
-                self.frame_count += 1
-                skip = self.skip_var.get()
-
-                if skip > 0 and self.frame_count % (skip + 1) != 0:
-                    frame = self.video_capture.read()
-                    self.root.after(5, self.update_frame)
-                    return
-
-                frame = self.video_capture.read()
-                if frame is not None:
-                    current_time = time.time()
-                    time_diff = current_time - self.last_update_time
-                    if time_diff > 0.5:
-                        self.fps = int(1.0 / ((time_diff) / max(1, self.frame_count)))
-                        self.fps_label.config(text=f"FPS: {self.fps}")
-                        self.last_update_time = current_time
-                        self.frame_count = 0
-
-                    processed_frame, hand_positions = self.pose_engine.process_frame(frame)
-
-                    if processed_frame is not None:
-                        if self.activity_tracker and hand_positions:
-                            frame_shape = processed_frame.shape
-                            feedback = self.activity_tracker.update_metrics(hand_positions, frame_shape)
-
-                            if feedback:
-                                feedback_text = next(iter(feedback.values()))
-                                self.status_label.config(text=feedback_text)
-
-                        frame_rgb = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-                        img = Image.fromarray(frame_rgb)
-                        imgtk = ImageTk.PhotoImage(image=img)
+                self.pipeline.set_keyframe_interval(self.keyframe_var.get())
+                self.pipeline.draw_latency_overlay = self.latency_overlay_var.get()
+
+                # Inference and metrics already ran off this thread; only blit the result
+                ready = self.pipeline.take()
+                if ready is not None:
+                    with ready:
+                        self.frame_count += 1
+                        current_time = time.time()
+                        time_diff = current_time - self.last_update_time
+                        if time_diff > 0.5:
+                            self.fps = int(1.0 / ((time_diff) / max(1, self.frame_count)))
+                            self.fps_label.config(text=f"FPS: {self.fps}")
+                            self.last_update_time = current_time
+                            self.frame_count = 0
+
+                        if ready.feedback:
+                            feedback_text = next(iter(ready.feedback.values()))
+                            self.status_label.config(text=feedback_text)
+
+                        imgtk = ImageTk.PhotoImage(image=Image.fromarray(ready.frame))
                         self.video_label.imgtk = imgtk
                         self.video_label.configure(image=imgtk)
+                        if ready.trace is not None:
+                            ready.trace.mark("display")
+                            self.latency_recorder.record_trace(ready.trace)
+                        if not self._startup_reported and self.pipeline.time_to_first_keypoint is not None:
+                            self._report_startup()
 
                 delay = 5 if self.fps > 20 else 10
+                self._frame_scheduled_at = (time.perf_counter(), delay)
                 self.root.after(delay, self.update_frame)
             else:
                 self.stop_tracking()
@@ -558,8 +604,8 @@ class CVFitGUI:
         if self.activity_tracker and self.activity_tracker.current_session:
             session_data = self.activity_tracker.current_session
 
-            if len(self.activity_tracker.running_metrics) > 0:
-                latest_metrics = self.activity_tracker.running_metrics[-1]
+            latest_metrics = self.activity_tracker.latest_metrics
+            if latest_metrics:
                 if latest_metrics.get("speed", 0) > 0.01:
                     self.current_speed = latest_metrics.get("speed", 0.0)
                     self.current_distance = session_data["total_distance"]
@@ -594,6 +640,18 @@ class CVFitGUI:
             'time': duration,
             'calories': self.current_calories
         })
+        if self.session_store and self.store_session_id:
+            latest_metrics = self.activity_tracker.latest_metrics if self.activity_tracker else {}
+            self.session_store.append_frame(self.store_session_id, {
+                "time_s": duration,
+                "steps_count": self.current_steps,
+                "speed": self.current_speed,
+                "cadence": latest_metrics.get("cadence", 0.0),
+                "stride_length": latest_metrics.get("stride_length", 0.0),
+                "vertical_oscillation": latest_metrics.get("vertical_oscillation", 0.0),
+                "total_distance": self.current_distance,
+                "calories_burned": self.current_calories,
+            })
 
         self.speed_display.config(text=f"{self.current_speed:.1f}")
 
@@ -769,6 +827,9 @@ def main():
     root = tk.Tk()
     app = CVFitGUI(root)
     root.mainloop()
+    if app.session_store:
+        # Write out anything still queued before the writer thread dies with us
+        app.session_store.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,46 @@
+import argparse
+import sys
+
+from core.inference_backends import DEFAULT_IMGSZ, DEFAULT_WEIGHTS, OnnxInt8Backend
+from core.pose_engine import PoseEngine
+from core.quantization import check_regression, evaluate_quantized, load_frames, quantize_onnx_model
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and validate an INT8 pose model")
+    parser.add_argument('--calibration', required=True,
+                        help="Video file or image directory of recorded frames for calibration")
+    parser.add_argument('--evaluation', help="Held-out recording for the accuracy check (defaults to the calibration source)")
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--imgsz', type=int, default=DEFAULT_IMGSZ)
+    parser.add_argument('--calibration-frames', type=int, default=200)
+    parser.add_argument('--evaluation-frames', type=int, default=600)
+    parser.add_argument('--fps', type=float, default=30.0, help="Frame rate of the evaluation recording")
+    parser.add_argument('--skip-quantize', action='store_true', help="Only evaluate an existing INT8 model")
+    args = parser.parse_args()
+
+    int8_backend = OnnxInt8Backend(weights=args.weights, imgsz=args.imgsz)
+
+    if not args.skip_quantize:
+        fp32_path = int8_backend.fp32_backend().prepare()
+        stride = 5  # Spread calibration samples over the recording
+        calibration_frames = load_frames(args.calibration, args.calibration_frames, stride)
+        print(f"Calibrating on {len(calibration_frames)} frames...")
+        quantize_onnx_model(fp32_path, calibration_frames, int8_backend.model_path(), args.imgsz)
+        print(f"INT8 model written to {int8_backend.model_path()}")
+
+    evaluation_frames = load_frames(args.evaluation or args.calibration, args.evaluation_frames)
+    reference = PoseEngine(backend='onnx', weights=args.weights, imgsz=args.imgsz)
+    candidate = PoseEngine(backend='onnx-int8', weights=args.weights, imgsz=args.imgsz)
+    report = evaluate_quantized(reference, candidate, evaluation_frames, fps=args.fps)
+
+    for key, value in report.items():
+        print(f"{key:>20}: {value:.4f}" if isinstance(value, float) else f"{key:>20}: {value}")
+
+    failures = check_regression(report)
+    if failures:
+        print("INT8 model rejected: " + "; ".join(failures))
+        sys.exit(1)
+    print("INT8 model accepted")
+
+if __name__ == '__main__':
+    main()
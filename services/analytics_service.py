@@ -1,27 +1,74 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+import time
 import numpy as np
 from datetime import datetime, timedelta
 
+from .progress_index import ProgressIndex
+from .session_store import SessionStore
+
 class AnalyticsService:
-    def __init__(self):
+    def __init__(self, store: Optional[SessionStore] = None, user_id: str = "default",
+                 index: Optional[ProgressIndex] = None):
+        """
+        Args:
+            store: Persistent session store; without one, sessions are kept
+                in memory for the life of the service
+            user_id: Whose sessions this service records and analyses
+            index: Rollups to answer progress queries from, e.g. one shared
+                by the services of many users
+        """
+        self.store = store
+        self.user_id = user_id
         self.workout_history = []
+        self.index = index or ProgressIndex()
+        if store is not None and self.index.session_count(user_id) == 0:
+            # One streaming pass over stored history; every later session is added incrementally
+            for session in store.iter_sessions(user_id):
+                self.index.add(user_id, session)
         self.performance_thresholds = {
             "novice": {"speed": 1.8, "cadence": 140},
             "intermediate": {"speed": 2.5, "cadence": 160},
             "advanced": {"speed": 3.2, "cadence": 180}
         }
 
-    def add_workout_session(self, session_data: Dict) -> None:
-        session_data["timestamp"] = datetime.now()
-        self.workout_history.append(session_data)
+    def add_workout_session(self, session_data: Dict, session_id: Optional[str] = None) -> None:
+        """
+        Record a finished session.
+
+        Args:
+            session_data: ActivityTracker.end_session() summary
+            session_id: The store session begun for it, if per-frame metrics
+                were recorded under one
+        """
+        started_at = None
+        if self.store is not None and session_id is not None:
+            started_at = self.store.end_session(session_id, session_data)
+        if started_at is None:
+            started_at = time.time() - session_data.get("duration", 0.0)
+        # Dated by its start, as the store keeps it, so rollups rebuilt from the store agree
+        session_data["timestamp"] = datetime.fromtimestamp(started_at)
+        self.index.add(self.user_id, session_data)
+        if self.store is None:
+            self.workout_history.append(session_data)
+        elif session_id is None:
+            self.store.save_session(session_data, self.user_id, started_at=started_at)
+
+    def _recent_metrics(self, count: int) -> List[Tuple[float, float]]:
+        """(avg_speed, avg_cadence) of the last `count` sessions, oldest first"""
+        if count <= self.index.recent_window:
+            return self.index.recent(self.user_id, count)
+        if self.store is None:
+            recent = self.workout_history[-count:]
+        else:
+            recent = list(self.store.iter_sessions(self.user_id, newest_first=True, limit=count))[::-1]
+        return [(s["average_metrics"]["avg_speed"], s["average_metrics"]["avg_cadence"]) for s in recent]
 
     def get_performance_level(self, recent_sessions: int = 5) -> str:
-        if not self.workout_history:
+        recent_data = self._recent_metrics(recent_sessions)
+        if not recent_data:
             return "novice"
 
-        recent_data = self.workout_history[-recent_sessions:]
-        avg_speed = np.mean([s["average_metrics"]["avg_speed"] for s in recent_data])
-        avg_cadence = np.mean([s["average_metrics"]["avg_cadence"] for s in recent_data])
+        avg_speed, avg_cadence = np.mean(recent_data, axis=0)
 
         if avg_speed >= self.performance_thresholds["advanced"]["speed"] and \
            avg_cadence >= self.performance_thresholds["advanced"]["cadence"]:
@@ -32,7 +79,7 @@ class AnalyticsService:
         return "novice"
 
     def generate_recommendations(self) -> Dict[str, str]:
-        if not self.workout_history:
+        if not self.index.session_count(self.user_id):
             return {
                 "workout": "Start with a 10-minute light jog to establish baseline",
                 "intensity": "low",
@@ -40,8 +87,7 @@ class AnalyticsService:
             }
 
         performance_level = self.get_performance_level()
-        last_session = self.workout_history[-1]
-        
+
         recommendations = {
             "novice": {
                 "workout": "20-minute steady-state run",
@@ -62,31 +108,24 @@ class AnalyticsService:
 
         return recommendations[performance_level]
 
-    def get_progress_metrics(self, days: int = 30) -> Dict:
-        cutoff_date = datetime.now() - timedelta(days=days)
-        relevant_sessions = [s for s in self.workout_history 
-                           if s["timestamp"] > cutoff_date]
-
-        if not relevant_sessions:
+    def get_progress_metrics(self, days: int = 30, now: Optional[datetime] = None) -> Dict:
+        """Totals and speed trend from the day `days` ago through today, read from the rollups"""
+        now = now or datetime.now()
+        rollup = self.index.since(self.user_id, now - timedelta(days=days), now)
+        if rollup.count == 0:
             return {}
 
-        speeds = [s["average_metrics"]["avg_speed"] for s in relevant_sessions]
-        distances = [s["total_distance"] for s in relevant_sessions]
-        durations = [s["duration"] for s in relevant_sessions]
-
         return {
-            "avg_speed_trend": np.polyfit(range(len(speeds)), speeds, 1)[0],
-            "total_distance": sum(distances),
-            "total_duration": sum(durations),
-            "sessions_count": len(relevant_sessions),
-            "improvement_rate": self._calculate_improvement_rate(relevant_sessions)
+            "avg_speed_trend": rollup.speed_trend,
+            "total_distance": rollup.total_distance,
+            "total_duration": rollup.total_duration,
+            "sessions_count": rollup.count,
+            "improvement_rate": rollup.improvement_rate
         }
 
-    def _calculate_improvement_rate(self, sessions: List[Dict]) -> float:
-        if len(sessions) < 2:
-            return 0.0
-
-        first_speed = sessions[0]["average_metrics"]["avg_speed"]
-        last_speed = sessions[-1]["average_metrics"]["avg_speed"]
-        
-        return (last_speed - first_speed) / first_speed * 100
\ No newline at end of file
+    def get_rollups(self, granularity: str = "week", days: int = 90) -> List[Dict]:
+        """Per-day, -week or -month progress over the last `days` days, oldest first"""
+        today = datetime.now().date()
+        return [dict(rollup.as_dict(), start=start)
+                for start, rollup in self.index.series(self.user_id, granularity,
+                                                       today - timedelta(days=days), today)]
@@ -0,0 +1,152 @@
+import asyncio
+import json
+from typing import Any, Callable, Dict, Optional, Set, Tuple, Union
+
+Payload = Union[str, bytes]
+
+# Queued after a subscription's last update
+_END = object()
+
+
+def _to_builtin(value):
+    # NumPy arrays and scalars
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_json(update: Dict) -> str:
+    return json.dumps(update, separators=(",", ":"), default=_to_builtin)
+
+
+class Subscription:
+    """
+    One client's view of the broadcast: a bounded queue of encoded updates.
+
+    When the client falls behind, the oldest queued update is dropped to make
+    room, so a slow reader only ever misses frames and never holds up the
+    producer or the other clients.
+
+    For delta formats, the keyframe the deltas refer to is queued ahead of
+    them when this client has not had it yet, and is kept when older
+    updates are dropped.
+    """
+
+    def __init__(self, broadcaster: "Broadcaster", wire_format: str, maxsize: int):
+        self.broadcaster = broadcaster
+        self.wire_format = wire_format
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        # Why the stream ended, once end() was called
+        self.closed_reason: Optional[str] = None
+        # The keyframe last queued for this client
+        self._keyframe: Optional[Payload] = None
+
+    def put(self, payload: Payload, keyframe: Optional[Payload] = None):
+        """
+        Args:
+            payload: Encoded update
+            keyframe: The keyframe `payload` is decoded against, if any
+        """
+        if keyframe is not None and keyframe is not self._keyframe:
+            self._keyframe = keyframe
+            if payload is not keyframe:
+                self._put(keyframe)
+        self._put(payload)
+
+    def _put(self, payload):
+        if self.queue.full():
+            queued = [self.queue.get_nowait() for _ in range(self.queue.qsize())]
+            # Drop the oldest update, unless it is the keyframe the rest depend on
+            drop = 1 if queued[0] is self._keyframe and len(queued) > 1 else 0
+            if queued.pop(drop) is self._keyframe:
+                self._keyframe = None
+            self.dropped += 1
+            for queued_payload in queued:
+                self.queue.put_nowait(queued_payload)
+        self.queue.put_nowait(payload)
+
+    def end(self, reason: str):
+        """Finish the stream; readers get the updates still queued, then nothing more"""
+        self.closed_reason = reason
+        self.put(_END)
+
+    async def get(self) -> Optional[Payload]:
+        """The next update, or None once the stream has ended"""
+        payload = await self.queue.get()
+        if payload is _END:
+            self.queue.put_nowait(_END)
+            return None
+        return payload
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Payload:
+        payload = await self.get()
+        if payload is None:
+            raise StopAsyncIteration
+        return payload
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class Broadcaster:
+    """
+    Publishes each update once to every subscriber.
+
+    Updates are encoded once per wire format in use, not once per client; the
+    same encoded payload object is queued for every subscriber of that format.
+
+    A stateful delta encoder exposes the payload its deltas currently refer
+    to as its ``keyframe`` attribute, so that subscribers who never got it
+    receive it first.
+    """
+
+    def __init__(self, queue_size: int = 4):
+        """
+        Args:
+            queue_size: Updates buffered per client before the oldest is dropped
+        """
+        self.queue_size = queue_size
+        self.encoders: Dict[str, Callable[[Any], Payload]] = {"json": encode_json}
+        self.subscribers: Set[Subscription] = set()
+
+    def register_format(self, name: str, encoder: Callable[[Any], Payload]):
+        self.encoders[name] = encoder
+
+    def subscribe(self, wire_format: str = "json", queue_size: Optional[int] = None) -> Subscription:
+        if wire_format not in self.encoders:
+            raise ValueError(f"Unknown wire format {wire_format!r}; choose from {sorted(self.encoders)}")
+        subscription = Subscription(self, wire_format, queue_size or self.queue_size)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def end(self, reason: str):
+        """End every subscription, e.g. because the source failed"""
+        for subscription in list(self.subscribers):
+            subscription.end(reason)
+        self.subscribers.clear()
+
+    def __len__(self) -> int:
+        return len(self.subscribers)
+
+    def publish(self, update: Any) -> int:
+        """
+        Queue an update for every subscriber; never waits on a client.
+
+        Returns:
+            int: Number of subscribers the update was queued for
+        """
+        encoded: Dict[str, Tuple[Payload, Optional[Payload]]] = {}
+        for subscription in list(self.subscribers):
+            entry = encoded.get(subscription.wire_format)
+            if entry is None:
+                encoder = self.encoders[subscription.wire_format]
+                entry = encoded[subscription.wire_format] = (encoder(update), getattr(encoder, "keyframe", None))
+            subscription.put(*entry)
+        return len(self.subscribers)
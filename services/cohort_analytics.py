@@ -0,0 +1,231 @@
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from .recommendation_service import RecommendationService
+
+LEVELS = ("novice", "intermediate", "advanced")
+
+# RecommendationService intensity per level: low, medium, high
+_LEVEL_SPEED = np.array([1.5, 2.5, 3.5])
+_LEVEL_DURATION = np.array([600.0, 1200.0, 1800.0])
+
+
+def _timestamp(value) -> float:
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+def _segment_sums(values: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Sum of values[start[i]:end[i]] for every i, from one cumulative sum"""
+    cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    return cumulative[end] - cumulative[start]
+
+
+class SessionBatch:
+    """
+    Many users' session summaries as flat NumPy columns.
+
+    Rows are sorted by user, then time; user i's sessions are rows
+    offsets[i]:offsets[i + 1].
+    """
+
+    def __init__(self, user_ids: Sequence[str], user_index: np.ndarray, timestamps: np.ndarray,
+                 speed: np.ndarray, cadence: np.ndarray, distance: np.ndarray, duration: np.ndarray):
+        """
+        Args:
+            user_ids: Distinct users, in output order
+            user_index: Position in user_ids of each session's user
+            timestamps: Session times as Unix seconds
+            speed, cadence, distance, duration: avg_speed, avg_cadence,
+                total_distance and duration of each session
+        """
+        order = np.lexsort((timestamps, user_index))
+        self.user_ids = list(user_ids)
+        self.user_index = np.asarray(user_index, dtype=np.int64)[order]
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)[order]
+        self.speed = np.asarray(speed, dtype=np.float64)[order]
+        self.cadence = np.asarray(cadence, dtype=np.float64)[order]
+        self.distance = np.asarray(distance, dtype=np.float64)[order]
+        self.duration = np.asarray(duration, dtype=np.float64)[order]
+        counts = np.bincount(self.user_index, minlength=len(self.user_ids))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    @classmethod
+    def from_histories(cls, histories: Mapping[str, Sequence[Dict]]) -> "SessionBatch":
+        """Pack {user_id: [AnalyticsService-style session dicts]}; each needs a "timestamp" """
+        user_ids = list(histories)
+        rows = [(i, _timestamp(s["timestamp"]), s["average_metrics"]["avg_speed"],
+                 s["average_metrics"]["avg_cadence"], s["total_distance"], s["duration"])
+                for i, user_id in enumerate(user_ids) for s in histories[user_id]]
+        columns = np.array(rows, dtype=np.float64).reshape(-1, 6).T
+        return cls(user_ids, columns[0].astype(np.int64), *columns[1:])
+
+    @classmethod
+    def from_store(cls, store, user_ids: Optional[Sequence[str]] = None,
+                   since: Optional[float] = None) -> "SessionBatch":
+        """Stream every stored session (or those of `user_ids`) from a SessionStore"""
+        positions = {user_id: i for i, user_id in enumerate(user_ids or ())}
+        rows = []
+        for session in store.iter_sessions(since=since):
+            position = positions.get(session["user_id"])
+            if position is None:
+                if user_ids is not None:
+                    continue
+                position = positions[session["user_id"]] = len(positions)
+            averages = session["average_metrics"]
+            rows.append((position, session["timestamp"].timestamp(), averages["avg_speed"],
+                         averages["avg_cadence"], session["total_distance"], session["duration"]))
+        columns = np.array(rows, dtype=np.float64).reshape(-1, 6).T
+        return cls(list(positions), columns[0].astype(np.int64), *columns[1:])
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+
+class CohortAnalytics:
+    """
+    AnalyticsService and RecommendationService for a whole cohort at once.
+
+    Every method works on all members of a SessionBatch together, with
+    segment sums over the flat session columns in place of per-user loops.
+    Results match the single-user services member by member.
+    """
+
+    def __init__(self):
+        self.performance_thresholds = {
+            "novice": {"speed": 1.8, "cadence": 140},
+            "intermediate": {"speed": 2.5, "cadence": 160},
+            "advanced": {"speed": 3.2, "cadence": 180}
+        }
+        self.recommendations = RecommendationService()
+
+    def performance_levels(self, batch: SessionBatch, recent_sessions: int = 5) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Index into LEVELS for each member, as
+                AnalyticsService.get_performance_level
+        """
+        end = batch.offsets[1:]
+        start = np.maximum(batch.offsets[:-1], end - recent_sessions)
+        count = end - start
+        with np.errstate(invalid="ignore", divide="ignore"):
+            speed = _segment_sums(batch.speed, start, end) / count
+            cadence = _segment_sums(batch.cadence, start, end) / count
+
+        levels = np.zeros(len(batch), dtype=np.int8)
+        for level, name in ((1, "intermediate"), (2, "advanced")):
+            thresholds = self.performance_thresholds[name]
+            levels[(count > 0) & (speed >= thresholds["speed"]) & (cadence >= thresholds["cadence"])] = level
+        return levels
+
+    def progress_metrics(self, batch: SessionBatch, days: int = 30,
+                         now: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """
+        Same window as AnalyticsService.get_progress_metrics: whole days from
+        the day `days` ago through today, in local time.
+
+        Returns:
+            dict: One array per AnalyticsService.get_progress_metrics key;
+                members without sessions in the window have sessions_count 0
+        """
+        now = now or datetime.now()
+        first_day = datetime.combine((now - timedelta(days=days)).date(), time.min)
+        after_today = datetime.combine(now.date() + timedelta(days=1), time.min)
+        in_window = (batch.timestamps >= _timestamp(first_day)) & (batch.timestamps < _timestamp(after_today))
+        # Sessions are time-sorted per member, so each window is a contiguous run
+        # ending before the member's sessions dated after today
+        later = _segment_sums(batch.timestamps >= _timestamp(after_today), batch.offsets[:-1], batch.offsets[1:])
+        end = batch.offsets[1:] - later.astype(np.int64)
+        n = _segment_sums(in_window, batch.offsets[:-1], batch.offsets[1:]).astype(np.int64)
+        start = end - n
+
+        # x is the session's position within its member's window
+        x = np.arange(len(batch.timestamps)) - np.repeat(start, np.diff(batch.offsets))
+        weights = np.where(in_window, batch.speed, 0.0)
+        sum_y = _segment_sums(weights, start, end)
+        sum_xy = _segment_sums(weights * x, start, end)
+        sum_x = n * (n - 1) / 2.0
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6.0
+
+        denominator = n * sum_xx - sum_x * sum_x
+        with np.errstate(invalid="ignore", divide="ignore"):
+            trend = np.where(denominator > 0, (n * sum_xy - sum_x * sum_y) / denominator, 0.0)
+            has_pair = n >= 2
+            # The trailing 0 keeps the lookups valid for members with no sessions
+            padded = np.append(batch.speed, 0.0)
+            first = np.where(has_pair, padded[start], 0.0)
+            last = np.where(has_pair, padded[end - 1], 0.0)
+            improvement = np.where(has_pair & (first != 0), (last - first) / first * 100, 0.0)
+
+        return {
+            "avg_speed_trend": trend,
+            "total_distance": _segment_sums(np.where(in_window, batch.distance, 0.0), start, end),
+            "total_duration": _segment_sums(np.where(in_window, batch.duration, 0.0), start, end),
+            "sessions_count": n,
+            "improvement_rate": improvement,
+        }
+
+    def workout_plans(self, levels: np.ndarray, available_time, completion_rate=None) -> Dict[str, np.ndarray]:
+        """
+        Vectorized RecommendationService.generate_workout_plan.
+
+        Args:
+            levels: Index into LEVELS per member
+            available_time: Seconds per member, or one value for all
+            completion_rate: Previous completion rate per member; NaN (or
+                None for everyone) means no previous metrics
+
+        Returns:
+            dict: Per-member arrays: main_duration, target_speed (NaN for a
+                quick run), quick_run, jog_duration and cool_down_duration
+        """
+        levels = np.asarray(levels, dtype=np.int64)
+        available = np.broadcast_to(np.asarray(available_time, dtype=np.float64), levels.shape)
+        scale = np.ones(levels.shape)
+        if completion_rate is not None:
+            rate = np.broadcast_to(np.asarray(completion_rate, dtype=np.float64), levels.shape)
+            # NaN compares false both ways and keeps the base intensity
+            scale = np.select([rate > 0.8, rate < 0.6], [1.1, 0.9], 1.0)
+        speed = _LEVEL_SPEED[levels] * scale
+        workout_time = np.minimum(_LEVEL_DURATION[levels] * scale, available - 600)
+        quick = workout_time <= 0
+        advanced = levels == LEVELS.index("advanced")
+
+        return {
+            "main_duration": np.where(quick, available, workout_time),
+            "target_speed": np.where(quick, np.nan, speed),
+            "quick_run": quick,
+            "jog_duration": np.where(advanced, 300, 180),
+            "cool_down_duration": np.where(advanced, 300, 180),
+        }
+
+    def workout_plan(self, plans: Dict[str, np.ndarray], levels: np.ndarray, member: int) -> Dict:
+        """One member's plan, in RecommendationService.generate_workout_plan form"""
+        fitness_level = LEVELS[int(levels[member])]
+        if plans["quick_run"][member]:
+            main_workout = [{"name": "Quick Run", "duration": plans["main_duration"][member].item()}]
+        else:
+            main_workout = [{"name": "Sustained Run", "duration": plans["main_duration"][member].item(),
+                             "target_speed": plans["target_speed"][member].item()}]
+        warm_up = self.recommendations.get_stretching_routine("pre_run", fitness_level)
+        return {
+            "warm_up": list(warm_up) + [{"name": "Light Jog", "duration": int(plans["jog_duration"][member])}],
+            "main_workout": main_workout,
+            "cool_down": [{"name": "Walking Cool Down", "duration": int(plans["cool_down_duration"][member])}],
+            "stretching": self.recommendations.get_stretching_routine("post_run", fitness_level),
+        }
+
+    def summarize(self, batch: SessionBatch, available_time, days: int = 30,
+                  now: Optional[datetime] = None) -> List[Dict]:
+        """Level, progress and plan per member, as dicts keyed like the single-user services"""
+        levels = self.performance_levels(batch)
+        progress = self.progress_metrics(batch, days, now)
+        plans = self.workout_plans(levels, available_time)
+        return [{
+            "user_id": user_id,
+            "performance_level": LEVELS[levels[i]],
+            "progress": {key: values[i].item() for key, values in progress.items()}
+            if progress["sessions_count"][i] else {},
+            "workout_plan": self.workout_plan(plans, levels, i),
+        } for i, user_id in enumerate(batch.user_ids)]
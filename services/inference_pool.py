@@ -0,0 +1,99 @@
+import asyncio
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from core.pose_engine import PoseEngine
+
+
+def default_engine_factory() -> "PoseEngine":
+    # Imported here so serving code can be loaded without the model stack
+    from core.pose_engine import PoseEngine
+    return PoseEngine()
+
+
+class InferencePool:
+    """
+    A fixed set of pose engines shared by every stream in the process.
+
+    Each engine is driven by one executor thread at a time (a model is not
+    safe to call concurrently), so `workers` engines give up to `workers`
+    inferences in flight. Models release the GIL while they run, so the
+    event loop keeps serving clients meanwhile.
+    """
+
+    def __init__(self, engine_factory: Optional[Callable[[], "PoseEngine"]] = None,
+                 workers: int = 1, warm_up_shape=(480, 640, 3)):
+        """
+        Args:
+            engine_factory: Builds one engine; defaults to PoseEngine()
+            workers: Engines, and inference threads, in the pool
+            warm_up_shape: Frame shape of the dummy inference run on each
+                engine as it loads, or None to skip warm-up; engines with a
+                warm_up() method warm themselves instead
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.engine_factory = engine_factory or default_engine_factory
+        self.workers = workers
+        self.warm_up_shape = warm_up_shape
+        self.engines: List["PoseEngine"] = []
+        self.load_seconds: Optional[float] = None
+        self.inferences = 0
+
+        self._idle: queue.Queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pose-inference")
+        self._lock: Optional[asyncio.Lock] = None  # Created on the serving event loop
+
+    @property
+    def ready(self) -> bool:
+        return len(self.engines) == self.workers
+
+    def _load_engine(self) -> "PoseEngine":
+        engine = self.engine_factory()
+        if self.warm_up_shape is None:
+            return engine
+        # The first call pays for kernel selection and allocator growth; do it before a client does
+        if hasattr(engine, "warm_up"):
+            engine.warm_up()
+        else:
+            engine.detect(np.zeros(self.warm_up_shape, dtype=np.uint8))
+        return engine
+
+    async def start(self):
+        """Load and warm every engine, in parallel, once"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.ready:
+                return
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            missing = self.workers - len(self.engines)
+            engines = await asyncio.gather(*(loop.run_in_executor(self._executor, self._load_engine)
+                                             for _ in range(missing)))
+            for engine in engines:
+                self.engines.append(engine)
+                self._idle.put(engine)
+            self.load_seconds = time.perf_counter() - started
+
+    def _call(self, method: str, args):
+        engine = self._idle.get()
+        try:
+            return getattr(engine, method)(*args)
+        finally:
+            self._idle.put(engine)
+
+    async def run(self, method: str, *args):
+        """Call `method` on a free engine in the pool's threads, e.g. run("detect", frame)"""
+        if not self.ready:
+            await self.start()
+        self.inferences += 1
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, method, args)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,386 @@
+"""
+Frame ingestion from thin clients.
+
+Kiosks push camera frames to the server, which decodes them, runs pose
+detection in batches across clients, and streams each client its own
+metrics back.
+
+Frames arrive as JPEG (or PNG) images, or as raw BGR24 with the frame size
+given at connect time. Over a websocket each binary message is one frame.
+An HTTP upload is a stream of frames, each preceded by its byte length as a
+little-endian u32, so it can be sent with chunked transfer encoding.
+
+Load is bounded at every stage:
+    admission   at most `max_clients` connected clients
+    rate        a token bucket per client (frames per second, with a burst)
+    in flight   each client has one frame being processed and keeps only its
+                newest waiting frame; older ones are dropped
+    decode      a fixed pool of decode threads
+    inference   a shared queue of at most `max_queued` frames feeding
+                detect_batch(); when it is full, frames are shed
+"""
+import asyncio
+import logging
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core.activity_tracker import ActivityTracker
+from core.keypoints import KeypointView
+from utils.latency import get_latency_recorder
+from .broadcaster import Broadcaster
+from .inference_pool import InferencePool
+from .pose_service import build_update
+from .wire_format import BinaryEncoder
+
+ENCODINGS = ("jpeg", "raw")
+_LENGTH = struct.Struct("<I")
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionError(Exception):
+    """A client was refused: the server is full or the client is already connected"""
+
+
+class FrameError(ValueError):
+    """A pushed frame could not be used"""
+
+
+class TokenBucket:
+    """Allows `rate` events per second on average, with bursts of up to `burst`"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "clock")
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def delay(self) -> float:
+        """Seconds until a token is available"""
+        self._refill()
+        return max(0.0, (1.0 - self.tokens) / self.rate)
+
+
+def decode_frame(payload: bytes, encoding: str, frame_size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """Decode one pushed frame to a BGR array; raw frames need frame_size as (width, height)"""
+    if encoding == "raw":
+        width, height = frame_size
+        if len(payload) != width * height * 3:
+            raise FrameError(f"Raw frame is {len(payload)} bytes, expected {width}x{height}x3")
+        return np.frombuffer(payload, dtype=np.uint8).reshape(height, width, 3)
+    frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise FrameError("Could not decode image")
+    return frame
+
+
+async def iter_length_prefixed(chunks: AsyncIterator[bytes], max_frame_bytes: int) -> AsyncIterator[bytes]:
+    """Split an upload stream of u32-length-prefixed frames, whatever its chunking"""
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= _LENGTH.size:
+            (length,) = _LENGTH.unpack_from(buffer)
+            if length > max_frame_bytes:
+                raise FrameError(f"Frame of {length} bytes exceeds the {max_frame_bytes} byte limit")
+            end = _LENGTH.size + length
+            if len(buffer) < end:
+                break
+            yield bytes(buffer[_LENGTH.size:end])
+            del buffer[:end]
+    if buffer:
+        raise FrameError("Upload ended inside a frame")
+
+
+class MicroBatcher:
+    """
+    Gathers single frames from all clients into detect_batch() calls.
+
+    One batching loop per inference worker; each takes up to `batch_size`
+    queued frames, waiting at most `max_wait` seconds for a batch to fill.
+    """
+
+    def __init__(self, inference: InferencePool, batch_size: int = 8, max_wait: float = 0.005,
+                 max_queued: int = 64):
+        self.inference = inference
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_queued = max_queued
+        self.batches = 0
+        self.frames = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.inference.workers)]
+
+    def saturated(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    async def detect(self, frame: np.ndarray) -> Tuple[np.ndarray, int]:
+        """Keypoints and validity mask for one frame; raises asyncio.QueueFull when saturated"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((frame, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                # Poll rather than wait_for(get()), which can lose an item on timeout
+                await asyncio.sleep(min(remaining, 0.001))
+
+            try:
+                results = await self.inference.run("detect_batch", [frame for frame, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.frames += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+
+class IngestClient:
+    """One connected kiosk: its rate limit, newest-frame slot, tracker and update stream"""
+
+    def __init__(self, service: "IngestService", client_id: str, encoding: str,
+                 frame_size: Optional[Tuple[int, int]]):
+        self.service = service
+        self.client_id = client_id
+        self.encoding = encoding
+        self.frame_size = frame_size
+        self.bucket = TokenBucket(service.rate, service.burst)
+        self.activity_tracker = ActivityTracker()
+        self.broadcaster = Broadcaster()
+        self.broadcaster.register_format("binary", BinaryEncoder())
+        self.frame_seq = 0
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.rate_limited = 0
+        self.shed = 0
+        self.errors = 0
+        self._pending: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _start(self):
+        self.activity_tracker.start_session()
+        self._pending = asyncio.Queue(maxsize=1)
+        self._worker = asyncio.create_task(self._process_pending())
+
+    def offer(self, payload: bytes) -> bool:
+        """
+        Queue a frame without waiting, as for a live websocket feed.
+
+        Returns:
+            bool: False if the frame was refused by the rate limit
+        """
+        self.frames_received += 1
+        if not self.bucket.try_acquire():
+            self.rate_limited += 1
+            return False
+        if self._pending.full():
+            # Keep only the newest frame while the previous one is processed
+            self._pending.get_nowait()
+            self.frames_dropped += 1
+        self._pending.put_nowait((payload, time.monotonic()))
+        return True
+
+    async def push(self, payload: bytes) -> Optional[Dict]:
+        """Process a frame and wait for its update, pacing the caller to the rate limit"""
+        self.frames_received += 1
+        delay = self.bucket.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.bucket.try_acquire()
+        return await self._process(payload, time.monotonic())
+
+    async def _process_pending(self):
+        while True:
+            payload, received_at = await self._pending.get()
+            await self._process(payload, received_at)
+
+    async def _process(self, payload: bytes, received_at: float) -> Optional[Dict]:
+        service = self.service
+        if service.batcher.saturated():
+            self.shed += 1
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            frame = await loop.run_in_executor(service.decode_executor, decode_frame, payload,
+                                               self.encoding, self.frame_size)
+        except FrameError:
+            self.errors += 1
+            return None
+        except Exception as e:
+            logger.warning("Could not decode a frame from %s: %s", self.client_id, e)
+            self.errors += 1
+            return None
+        decoded_at = time.monotonic()
+        try:
+            kpts, mask = await service.batcher.detect(frame)
+        except asyncio.QueueFull:
+            self.shed += 1
+            return None
+        except Exception as e:
+            # One failed batch costs this frame only; the client keeps streaming
+            logger.warning("Pose inference failed for %s: %s", self.client_id, e)
+            self.errors += 1
+            return None
+        now = time.monotonic()
+        service.latency_recorder.record("decode", (decoded_at - received_at) * 1000.0)
+        service.latency_recorder.record("inference", (now - decoded_at) * 1000.0)
+
+        positions = KeypointView(kpts, mask)
+        feedback = self.activity_tracker.update_metrics(positions, frame.shape, timestamp=received_at)
+        self.frame_seq += 1
+        update = build_update(self.activity_tracker, self.frame_seq, kpts, positions, feedback)
+        self.broadcaster.publish(update)
+        return update
+
+    def _end_session(self) -> Dict:
+        """Stop processing and end the session without awaiting, so it also works in a cancelled task"""
+        if self._worker is not None:
+            # The worker only touches the tracker between awaits, and wakes up cancelled
+            self._worker.cancel()
+        return self.activity_tracker.end_session()
+
+    async def _close(self):
+        if self._worker is not None:
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    def stats(self) -> Dict:
+        return {
+            "frames_received": self.frames_received,
+            "frames_processed": self.frame_seq,
+            "frames_dropped": self.frames_dropped,
+            "rate_limited": self.rate_limited,
+            "shed": self.shed,
+            "errors": self.errors,
+        }
+
+
+class IngestService:
+    """Admits pushing clients and runs their frames through a shared InferencePool"""
+
+    def __init__(self, inference: InferencePool, max_clients: int = 32, rate: float = 15.0,
+                 burst: float = 30.0, decode_workers: int = 2, max_frame_bytes: int = 4 << 20,
+                 batch_size: int = 8, max_wait: float = 0.005, max_queued: int = 64,
+                 on_session_end: Optional[Callable[[str, Dict], None]] = None):
+        """
+        Args:
+            inference: Engines shared with every other stream
+            max_clients: Clients connected at once; more are refused
+            rate: Frames per second accepted from each client
+            burst: Frames a client may send at once after being idle
+            decode_workers: Threads decoding pushed images
+            max_frame_bytes: Largest accepted encoded frame
+            batch_size: Frames per detect_batch() call
+            max_wait: Seconds to wait for a batch to fill
+            max_queued: Frames waiting for inference before new ones are shed
+            on_session_end: Called with (client_id, session summary) on disconnect
+        """
+        self.inference = inference
+        self.max_clients = max_clients
+        self.rate = rate
+        self.burst = burst
+        self.max_frame_bytes = max_frame_bytes
+        self.on_session_end = on_session_end
+        self.batcher = MicroBatcher(inference, batch_size, max_wait, max_queued)
+        self.decode_executor = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="ingest-decode")
+        self.latency_recorder = get_latency_recorder()
+        self.clients: Dict[str, IngestClient] = {}
+        self.refused = 0
+
+    @asynccontextmanager
+    async def connect(self, client_id: str, encoding: str = "jpeg",
+                      frame_size: Optional[Tuple[int, int]] = None):
+        """
+        Admit a client for the duration of the block.
+
+        Raises:
+            AdmissionError: The server is full or client_id is connected
+            FrameError: Unknown encoding, or raw without a frame size
+        """
+        if encoding not in ENCODINGS:
+            raise FrameError(f"Unknown encoding {encoding!r}; choose from {list(ENCODINGS)}")
+        if encoding == "raw" and not frame_size:
+            raise FrameError("Raw frames need width and height")
+        if client_id in self.clients:
+            self.refused += 1
+            raise AdmissionError(f"Client {client_id!r} is already connected")
+        if len(self.clients) >= self.max_clients:
+            self.refused += 1
+            raise AdmissionError("Server is at capacity")
+
+        await self.inference.start()
+        client = self.clients[client_id] = IngestClient(self, client_id, encoding, frame_size)
+        client._start()
+        try:
+            yield client
+        finally:
+            # Saved before awaiting anything: a disconnect can cancel this task
+            try:
+                summary = client._end_session()
+                if summary and self.on_session_end is not None:
+                    self.on_session_end(client_id, summary)
+            finally:
+                del self.clients[client_id]
+            await client._close()
+
+    def stats(self) -> Dict:
+        return {
+            "clients": len(self.clients),
+            "max_clients": self.max_clients,
+            "refused": self.refused,
+            "batches": self.batcher.batches,
+            "mean_batch_size": self.batcher.frames / self.batcher.batches if self.batcher.batches else 0.0,
+            "per_client": {client_id: client.stats() for client_id, client in self.clients.items()},
+        }
+
+    async def stop(self):
+        await self.batcher.stop()
+        self.decode_executor.shutdown(wait=False)
@@ -1,69 +1,299 @@
-from fastapi import FastAPI, WebSocket
-from typing import Dict, Optional
+from fastapi import WebSocket, WebSocketDisconnect
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Optional, Union
 import asyncio
-import json
+import logging
+import time
 
-from ..core.pose_engine import PoseEngine
-from ..core.motion_analyzer import MotionAnalyzer
-from ..core.activity_tracker import ActivityTracker
-from ..utils.video_capture import VideoCapture
-from ..utils.pose_utils import PoseUtils
+import numpy as np
+
+from core.activity_tracker import ActivityTracker
+from core.keypoints import KeypointView
+from utils.latency import get_latency_recorder
+from utils.video_capture import VideoCapture
+from utils.pose_utils import PoseUtils
+from utils.startup import get_startup_profile
+from .broadcaster import Broadcaster, Subscription
+from .inference_pool import InferencePool
+from .wire_format import BinaryEncoder
+
+if TYPE_CHECKING:
+    from core.pose_engine import PoseEngine
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureError(RuntimeError):
+    """The camera or video source could not be opened"""
+
+
+def build_update(activity_tracker: ActivityTracker, seq: int, kpts: np.ndarray, positions,
+                 feedback: Dict) -> Dict:
+    """The per-frame update streamed to clients, as consumed by the broadcaster's wire formats"""
+    session = activity_tracker.current_session or {}
+    return {
+        "seq": seq,
+        "keypoints": np.round(kpts, 1),
+        "metrics": activity_tracker.latest_metrics,
+        "feedback": feedback,
+        "steps_count": session.get("steps_count", 0),
+        "total_distance": session.get("total_distance", 0.0),
+        "movement_type": _movement_type(positions),
+        "stability": _stability(activity_tracker),
+    }
+
+
+async def send_updates(websocket: WebSocket, subscription: Subscription):
+    """Forward a subscription's encoded updates to a websocket until cancelled"""
+    async for payload in subscription:
+        if isinstance(payload, bytes):
+            await websocket.send_bytes(payload)
+        else:
+            await websocket.send_text(payload)
+
+
+def _release_borrowed(borrowing: Future):
+    if not borrowing.cancelled() and borrowing.exception() is None and borrowing.result() is not None:
+        borrowing.result().release()
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+def _movement_type(positions) -> str:
+    if not all(name in positions for name in ("left_hip", "left_knee", "left_ankle")):
+        return "unknown"
+    return PoseUtils.detect_movement_type({
+        "hips": [np.array(positions["left_hip"])],
+        "knees": [np.array(positions["left_knee"])],
+        "ankles": [np.array(positions["left_ankle"])],
+    })
+
+
+def _stability(activity_tracker: ActivityTracker) -> float:
+    hips = activity_tracker.history.recent("left_hip", 15)
+    # Normalize to metres so the score's thresholds apply
+    return PoseUtils.calculate_stability_score(list(hips * activity_tracker.pixel_to_meter_ratio))
 
 class PoseService:
-    def __init__(self):
-        self.pose_engine = PoseEngine()
-        self.motion_analyzer = MotionAnalyzer()
+    """
+    Streams live pose metrics to any number of websocket clients.
+
+    Nothing blocking runs on the event loop: camera reads wait in a capture
+    thread, and inference runs on the threads of an InferencePool, which
+    several services (one per camera) can share.
+    Frames reach the processing loop through a one-slot asyncio queue that
+    always holds the newest frame. One loop computes each frame's results
+    once and publishes them to the broadcaster, which encodes them once per
+    wire format and queues them for each client with drop-oldest semantics,
+    so a slow viewer never stalls inference or the other viewers.
+    """
+
+    def __init__(self, pose_engine: Optional["PoseEngine"] = None, camera_source: Union[int, str] = 0,
+                 inference: Optional[InferencePool] = None):
+        """
+        Args:
+            pose_engine: Engine for a private single-worker pool; ignored
+                when `inference` is given
+            camera_source: Camera index or video path/URL
+            inference: Shared pool of engines to run detection on
+        """
+        if inference is None:
+            inference = InferencePool((lambda: pose_engine) if pose_engine is not None else None,
+                                      warm_up_shape=None if pose_engine is not None else (480, 640, 3))
+        self.inference = inference
+        self.camera_source = camera_source
         self.activity_tracker = ActivityTracker()
         self.video_capture = None
-        self.active_connections = set()
+        self.broadcaster = Broadcaster()
+        self.broadcaster.register_format("binary", BinaryEncoder())
         self.processing = False
+        # Started over REST: keep running after the last viewer leaves
+        self.pinned = False
+        self.frame_seq = 0
+        self.frames_dropped = 0
+        # Why the last session stopped on its own, if it did
+        self.error: Optional[str] = None
+        self.latency_recorder = get_latency_recorder()
 
-    async def start_tracking(self, websocket: WebSocket):
+        self._capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pose-capture")
+        self._frames: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._lock: Optional[asyncio.Lock] = None  # Created on the serving event loop
+        self._stopping: Optional[asyncio.Task] = None
+
+    async def start_tracking(self, websocket: WebSocket, wire_format: str = "json"):
+        """
+        Stream updates to one client until it disconnects.
+
+        Args:
+            websocket: The client connection
+            wire_format: "json" text frames, or "binary" frames as described in
+                services/wire_format.py
+        """
         await websocket.accept()
-        self.active_connections.add(websocket)
-        
-        if not self.video_capture:
-            self.video_capture = VideoCapture().start()
+        subscription = self.broadcaster.subscribe(wire_format)
+        tasks = []
+        try:
+            await self._ensure_started()
+            # Updates are pushed by the sender; the receiver only notices the client leaving
+            sender = asyncio.create_task(send_updates(websocket, subscription))
+            tasks = [sender, asyncio.create_task(_wait_for_disconnect(websocket))]
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            if sender.done() and subscription.closed_reason:
+                # The session failed; 1011: internal error
+                await websocket.close(code=1011, reason=subscription.closed_reason[:120])
+        except CaptureError as e:
+            await websocket.close(code=1011, reason=str(e))
+        finally:
+            for task in tasks:
+                task.cancel()
+            subscription.close()
+            if len(self.broadcaster) == 0 and not self.pinned:
+                # The server may cancel this handler once the client is gone;
+                # the session still has to shut down
+                await asyncio.shield(self.stop())
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def start(self, pinned: bool = False):
+        """Start capturing without a viewer; pinned sessions run until stop()"""
+        self.pinned = self.pinned or pinned
+        await self._ensure_started()
+
+    async def _ensure_started(self):
+        if self._stopping is not None:
+            # Let a failed session finish shutting down before starting another
+            await self._stopping
+        async with self._get_lock():
+            if self.processing:
+                return
+            self.error = None
+            loop = asyncio.get_running_loop()
+            # Loading the model takes seconds; other connections keep being served meanwhile
+            await self.inference.start()
+            self.video_capture = await loop.run_in_executor(
+                self._capture_executor, lambda: VideoCapture(self.camera_source).start())
+            if self.video_capture.get_error():
+                error = self.video_capture.get_error()
+                self.video_capture.release()
+                self.video_capture = None
+                raise CaptureError(error)
+
             self.activity_tracker.start_session()
+            self._frames = asyncio.Queue(maxsize=1)
             self.processing = True
-            
+            self._tasks = [asyncio.create_task(self._capture_frames()),
+                           asyncio.create_task(self._process_frames())]
+
+    async def _capture_frames(self):
+        """Move camera frames onto the event loop, replacing any frame not yet processed"""
         try:
-            await self._process_frames(websocket)
-        finally:
-            self.active_connections.remove(websocket)
-            if not self.active_connections:
-                self._cleanup()
-
-    async def _process_frames(self, websocket: WebSocket):
-        last_time = asyncio.get_event_loop().time()
-        
-        while self.processing and self.video_capture.is_opened():
-            frame = self.video_capture.read()
-            if frame is None:
-                continue
-
-            current_time = asyncio.get_event_loop().time()
-            time_delta = current_time - last_time
-            last_time = current_time
-
-            landmarks = self.pose_engine.process_frame(frame)
-            if landmarks is not None:
-                keypoints = self.pose_engine.extract_keypoints(landmarks)
-                motion_data = self.motion_analyzer.analyze_motion(keypoints)
-                metrics = self.activity_tracker.update_metrics(motion_data, time_delta)
-
-                await websocket.send_json({
-                    "metrics": metrics,
-                    "movement_type": PoseUtils.detect_movement_type(keypoints),
-                    "stability": PoseUtils.calculate_stability_score(landmarks)
-                })
-
-            await asyncio.sleep(0.033)  # ~30 FPS
+            while self.processing and self.video_capture.is_opened():
+                # Blocks in the capture thread until the camera delivers a new frame;
+                # the frame stays in its ring slot, uncopied, until inference is done
+                borrowing = self._capture_executor.submit(self.video_capture.borrow, 0.5)
+                try:
+                    lease = await asyncio.wrap_future(borrowing)
+                except asyncio.CancelledError:
+                    # The borrow completes in the capture thread anyway; give that frame back
+                    borrowing.add_done_callback(_release_borrowed)
+                    raise
+                if lease is None:
+                    continue
+                if self._frames.full():
+                    self._frames.get_nowait()[0].release()
+                    self.frames_dropped += 1
+                self._frames.put_nowait((lease, time.monotonic()))
+        except Exception as e:
+            self._fail(f"Camera read failed: {e}", e)
+            return
+        if self.processing:
+            self._fail(self.video_capture.get_error() or "Camera closed")
+
+    async def _process_frames(self):
+        try:
+            while self.processing:
+                lease, captured_at = await self._frames.get()
+                started = time.monotonic()
+                with lease:
+                    kpts, mask = await self.inference.run("detect", lease.frame)
+                    frame_shape = lease.frame.shape
+                self.latency_recorder.record("queue", (started - captured_at) * 1000.0)
+                self.latency_recorder.record("inference", (time.monotonic() - started) * 1000.0)
+                positions = KeypointView(kpts, mask)
+                if positions:
+                    get_startup_profile().mark("first_keypoint")
+                feedback = self.activity_tracker.update_metrics(positions, frame_shape, timestamp=captured_at)
+
+                self.frame_seq += 1
+                self.broadcaster.publish(build_update(self.activity_tracker, self.frame_seq, kpts, positions,
+                                                      feedback))
+        except Exception as e:
+            self._fail(f"Pose inference failed: {e}", e)
+
+    def _fail(self, message: str, exc: Optional[BaseException] = None):
+        """End the session after a capture or inference error and tell every viewer why"""
+        if not self.processing:
+            return
+        logger.error("Camera %s session stopped: %s", self.camera_source, message, exc_info=exc)
+        self.error = message
+        self.processing = False
+        self.broadcaster.end(message)
+        # stop() cancels and awaits the calling task, so it has to run as a task of its own
+        self._stopping = asyncio.create_task(self.stop())
+
+    def summary(self) -> Dict:
+        """Live totals of the running session, without ending it"""
+        session = self.activity_tracker.current_session
+        if not session:
+            return {}
+        return {
+            "duration": self.activity_tracker.clock.now() - self.activity_tracker.session_start,
+            "total_distance": session["total_distance"],
+            "calories_burned": session["calories_burned"],
+            "steps_count": session["steps_count"],
+            "max_speed": session["max_speed"],
+            "metrics": self.activity_tracker.latest_metrics,
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "processing": self.processing,
+            "frames": self.frame_seq,
+            "frames_dropped": self.frames_dropped,
+            "subscribers": len(self.broadcaster),
+            "updates_dropped": sum(s.dropped for s in self.broadcaster.subscribers),
+            "error": self.error,
+        }
+
+    async def stop(self) -> Dict:
+        async with self._get_lock():
+            self.pinned = False
+            # A stop cancelled part-way leaves the camera open for the next one to release
+            if not self.processing and self.video_capture is None:
+                return {}
+            self.processing = False
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+            return self._cleanup()
 
     def _cleanup(self):
+        while self._frames is not None and not self._frames.empty():
+            self._frames.get_nowait()[0].release()
         if self.video_capture:
             self.video_capture.release()
             self.video_capture = None
         self.processing = False
         session_data = self.activity_tracker.end_session()
-        return session_data
\ No newline at end of file
+        return session_data
@@ -0,0 +1,237 @@
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+GRANULARITIES = ("day", "week", "month")
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    """First day of the day, ISO week (Monday) or calendar month containing `day`"""
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity {granularity!r}; choose from {GRANULARITIES}")
+
+
+def next_bucket(start: date, granularity: str) -> date:
+    if granularity == "day":
+        return start + timedelta(days=1)
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+class Rollup:
+    """
+    Mergeable aggregate over a set of sessions.
+
+    Besides sums and counts it keeps the least-squares sufficient statistics
+    of speed against the session's ordinal in the user's history, so the
+    speed trend over any union of buckets comes from adding their sums.
+    """
+
+    __slots__ = ("count", "total_distance", "total_duration", "sum_speed", "sum_cadence",
+                 "sum_x", "sum_xx", "sum_xy", "first", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.total_distance = 0.0
+        self.total_duration = 0.0
+        self.sum_speed = 0.0
+        self.sum_cadence = 0.0
+        self.sum_x = 0.0
+        self.sum_xx = 0.0
+        self.sum_xy = 0.0
+        # (ordinal, avg_speed) of the earliest and latest session
+        self.first: Optional[Tuple[int, float]] = None
+        self.last: Optional[Tuple[int, float]] = None
+
+    def add(self, ordinal: int, session: Dict):
+        averages = session.get("average_metrics") or {}
+        speed = float(averages.get("avg_speed", 0.0))
+        self.count += 1
+        self.total_distance += float(session.get("total_distance", 0.0))
+        self.total_duration += float(session.get("duration", 0.0))
+        self.sum_speed += speed
+        self.sum_cadence += float(averages.get("avg_cadence", 0.0))
+        self.sum_x += ordinal
+        self.sum_xx += ordinal * ordinal
+        self.sum_xy += ordinal * speed
+        if self.first is None or ordinal < self.first[0]:
+            self.first = (ordinal, speed)
+        if self.last is None or ordinal > self.last[0]:
+            self.last = (ordinal, speed)
+
+    def merge(self, other: "Rollup"):
+        self.count += other.count
+        self.total_distance += other.total_distance
+        self.total_duration += other.total_duration
+        self.sum_speed += other.sum_speed
+        self.sum_cadence += other.sum_cadence
+        self.sum_x += other.sum_x
+        self.sum_xx += other.sum_xx
+        self.sum_xy += other.sum_xy
+        if other.first is not None and (self.first is None or other.first[0] < self.first[0]):
+            self.first = other.first
+        if other.last is not None and (self.last is None or other.last[0] > self.last[0]):
+            self.last = other.last
+
+    @property
+    def speed_trend(self) -> float:
+        """Least-squares slope of avg_speed per session"""
+        denominator = self.count * self.sum_xx - self.sum_x * self.sum_x
+        if denominator <= 0:
+            return 0.0
+        return (self.count * self.sum_xy - self.sum_x * self.sum_speed) / denominator
+
+    @property
+    def improvement_rate(self) -> float:
+        """Percent change in avg_speed from the first session to the last"""
+        if self.count < 2 or not self.first[1]:
+            return 0.0
+        return (self.last[1] - self.first[1]) / self.first[1] * 100
+
+    def as_dict(self) -> Dict:
+        return {
+            "sessions_count": self.count,
+            "total_distance": self.total_distance,
+            "total_duration": self.total_duration,
+            "avg_speed": self.sum_speed / self.count if self.count else 0.0,
+            "avg_cadence": self.sum_cadence / self.count if self.count else 0.0,
+            "avg_speed_trend": self.speed_trend,
+            "improvement_rate": self.improvement_rate,
+        }
+
+
+class _UserIndex:
+    __slots__ = ("sessions", "buckets", "recent")
+
+    def __init__(self, recent_window: int):
+        self.sessions = 0
+        self.buckets: Dict[str, Dict[date, Rollup]] = {g: {} for g in GRANULARITIES}
+        # (avg_speed, avg_cadence) of the latest sessions, for performance levels
+        self.recent: Deque[Tuple[float, float]] = deque(maxlen=recent_window)
+
+
+class ProgressIndex:
+    """
+    Daily, weekly and monthly rollups of each user's sessions.
+
+    add() updates one bucket per granularity. A date-range query merges the
+    whole months inside the range, then whole weeks and single days at its
+    edges. Its cost depends on the length of the range, not on how many
+    sessions it holds. Ranges have day resolution.
+    """
+
+    def __init__(self, recent_window: int = 20):
+        """
+        Args:
+            recent_window: Latest sessions kept per user for recent() queries
+        """
+        self.recent_window = recent_window
+        self.users: Dict[str, _UserIndex] = {}
+
+    def _user(self, user_id: str) -> _UserIndex:
+        index = self.users.get(user_id)
+        if index is None:
+            index = self.users[user_id] = _UserIndex(self.recent_window)
+        return index
+
+    def add(self, user_id: str, session: Dict, when: Optional[datetime] = None):
+        """
+        Fold one session into the user's rollups.
+
+        Args:
+            user_id: Whose session it is
+            session: Summary in ActivityTracker.end_session() form
+            when: Session time; defaults to session["timestamp"]. Sessions
+                should be added in time order, as ordinals follow insertion
+        """
+        when = when or session["timestamp"]
+        index = self._user(user_id)
+        ordinal = index.sessions
+        index.sessions += 1
+        for granularity, buckets in index.buckets.items():
+            start = bucket_start(when.date(), granularity)
+            rollup = buckets.get(start)
+            if rollup is None:
+                rollup = buckets[start] = Rollup()
+            rollup.add(ordinal, session)
+        averages = session.get("average_metrics") or {}
+        index.recent.append((float(averages.get("avg_speed", 0.0)), float(averages.get("avg_cadence", 0.0))))
+
+    def session_count(self, user_id: str) -> int:
+        index = self.users.get(user_id)
+        return index.sessions if index else 0
+
+    def recent(self, user_id: str, count: int) -> List[Tuple[float, float]]:
+        """(avg_speed, avg_cadence) of the user's last `count` sessions, oldest first"""
+        index = self.users.get(user_id)
+        if index is None or count <= 0:
+            return []
+        return list(index.recent)[-count:]
+
+    def query(self, user_id: str, start: date, end: date) -> Rollup:
+        """Aggregate of the user's sessions from `start` to `end`, both inclusive"""
+        total = Rollup()
+        index = self.users.get(user_id)
+        if index is None:
+            return total
+        for granularity, bucket in self._cover(start, end):
+            rollup = index.buckets[granularity].get(bucket)
+            if rollup is not None:
+                total.merge(rollup)
+        return total
+
+    def since(self, user_id: str, cutoff: datetime, now: Optional[datetime] = None) -> Rollup:
+        """Aggregate from the day of `cutoff` through today"""
+        now = now or datetime.now()
+        return self.query(user_id, cutoff.date(), now.date())
+
+    def series(self, user_id: str, granularity: str, start: date, end: date) -> Iterator[Tuple[date, Rollup]]:
+        """Non-empty buckets of one granularity overlapping `start`..`end`, in order"""
+        index = self.users.get(user_id)
+        if index is None:
+            return
+        buckets = index.buckets[granularity]
+        bucket = bucket_start(start, granularity)
+        while bucket <= end:
+            rollup = buckets.get(bucket)
+            if rollup is not None:
+                yield bucket, rollup
+            bucket = next_bucket(bucket, granularity)
+
+    @staticmethod
+    def _cover(start: date, end: date, granularities=("month", "week")) -> Iterator[Tuple[str, date]]:
+        """Buckets tiling `start`..`end`: the whole coarsest buckets inside it, the edges recursively finer"""
+        if start > end:
+            return
+        if not granularities:
+            day = start
+            while day <= end:
+                yield "day", day
+                day += timedelta(days=1)
+            return
+
+        granularity, finer = granularities[0], granularities[1:]
+        first = bucket_start(start, granularity)
+        if first < start:
+            first = next_bucket(first, granularity)
+        bucket = first
+        whole = []
+        while next_bucket(bucket, granularity) - timedelta(days=1) <= end:
+            whole.append(bucket)
+            bucket = next_bucket(bucket, granularity)
+        if not whole:
+            yield from ProgressIndex._cover(start, end, finer)
+            return
+
+        yield from ProgressIndex._cover(start, first - timedelta(days=1), finer)
+        for bucket_day in whole:
+            yield granularity, bucket_day
+        yield from ProgressIndex._cover(next_bucket(whole[-1], granularity), end, finer)
@@ -82,7 +82,8 @@ class RecommendationService:
         return base_intensity
 
     def _generate_warm_up(self, fitness_level: str) -> List[Dict]:
-        warm_up = self.get_stretching_routine("pre_run", fitness_level)
+        # Copy: for novices this is the shared base routine itself
+        warm_up = list(self.get_stretching_routine("pre_run", fitness_level))
         warm_up.append({
             "name": "Light Jog",
             "duration": 300 if fitness_level == "advanced" else 180
@@ -0,0 +1,214 @@
+"""
+Headless CVFit server.
+
+Serves pose streams and session control over HTTP for any number of
+viewers, with no display attached:
+
+    uvicorn services.server:app --host 0.0.0.0 --port 8000
+
+Environment:
+    CVFIT_CAMERAS            Comma-separated camera indexes or video URLs,
+                             addressed by position (default "0")
+    CVFIT_INFERENCE_WORKERS  Pose engines shared by all cameras (default 1)
+    CVFIT_WARMUP             "0" skips the warm-up inference at startup
+    CVFIT_INGEST_MAX_CLIENTS Clients pushing frames at once (default 32)
+    CVFIT_INGEST_RATE        Frames per second accepted per client (default 15)
+    CVFIT_BACKEND, CVFIT_DATA_DIR as for the rest of CVFit
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Union
+
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+
+from utils.latency import get_latency_recorder
+from utils.startup import get_startup_profile
+from .analytics_service import AnalyticsService
+from .inference_pool import InferencePool
+from .ingest import AdmissionError, FrameError, IngestService, iter_length_prefixed
+from .pose_service import CaptureError, PoseService, send_updates
+from .session_store import SessionStore
+
+
+def _camera_sources(value: str) -> List[Union[int, str]]:
+    return [int(source) if source.strip().lstrip('-').isdigit() else source.strip()
+            for source in value.split(',') if source.strip()]
+
+
+def create_app(inference: Optional[InferencePool] = None,
+               cameras: Optional[List[Union[int, str]]] = None,
+               store: Optional[SessionStore] = None,
+               ingest: Optional[IngestService] = None) -> FastAPI:
+    """
+    Args:
+        inference: Engine pool; defaults to CVFIT_INFERENCE_WORKERS PoseEngines
+        cameras: Capture sources; defaults to CVFIT_CAMERAS
+        store: Where finished sessions are saved; defaults to a SessionStore
+            in the data directory, opened at startup
+        ingest: Frame ingestion for pushing clients; defaults to one on
+            `inference` configured from CVFIT_INGEST_*
+    """
+    if inference is None:
+        warm_up = os.environ.get('CVFIT_WARMUP', '1') != '0'
+        inference = InferencePool(workers=int(os.environ.get('CVFIT_INFERENCE_WORKERS', '1')),
+                                  warm_up_shape=(480, 640, 3) if warm_up else None)
+    if cameras is None:
+        cameras = _camera_sources(os.environ.get('CVFIT_CAMERAS', '0'))
+    if ingest is None:
+        ingest = IngestService(inference,
+                               max_clients=int(os.environ.get('CVFIT_INGEST_MAX_CLIENTS', '32')),
+                               rate=float(os.environ.get('CVFIT_INGEST_RATE', '15')))
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Load and warm the models before the first request, not during it
+        await inference.start()
+        get_startup_profile().mark("ready")
+        session_store = store or SessionStore()
+        app.state.analytics = AnalyticsService(store=session_store)
+
+        def save_client_session(client_id: str, summary: Dict):
+            # Each pushing client keeps its own history; the rollup index is shared
+            AnalyticsService(store=session_store, user_id=client_id,
+                             index=app.state.analytics.index).add_workout_session(summary)
+
+        ingest.on_session_end = save_client_session
+        try:
+            yield
+        finally:
+            for service in services.values():
+                await service.stop()
+            await ingest.stop()
+            inference.shutdown()
+            if store is None:
+                session_store.close()
+
+    app = FastAPI(title="CVFit", lifespan=lifespan)
+    services: Dict[int, PoseService] = {
+        camera: PoseService(camera_source=source, inference=inference)
+        for camera, source in enumerate(cameras)
+    }
+    app.state.inference = inference
+    app.state.services = services
+    app.state.ingest = ingest
+
+    def get_service(camera: int) -> PoseService:
+        service = services.get(camera)
+        if service is None:
+            raise HTTPException(status_code=404, detail=f"Unknown camera {camera}")
+        return service
+
+    @app.websocket("/ws/pose/{camera}")
+    async def pose_stream(websocket: WebSocket, camera: int, format: str = "json"):
+        service = services.get(camera)
+        if service is None or format not in service.broadcaster.encoders:
+            await websocket.close(code=1008)
+            return
+        await service.start_tracking(websocket, wire_format=format)
+
+    @app.post("/sessions/{camera}/start")
+    async def start_session(camera: int) -> Dict:
+        service = get_service(camera)
+        try:
+            await service.start(pinned=True)
+        except CaptureError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        return {"camera": camera, "processing": service.processing}
+
+    @app.post("/sessions/{camera}/stop")
+    async def stop_session(camera: int) -> Dict:
+        summary = await get_service(camera).stop()
+        if not summary:
+            raise HTTPException(status_code=409, detail="No session is running")
+        app.state.analytics.add_workout_session(summary)
+        return summary
+
+    @app.get("/sessions/{camera}/summary")
+    async def session_summary(camera: int) -> Dict:
+        summary = get_service(camera).summary()
+        if not summary:
+            raise HTTPException(status_code=404, detail="No session is running")
+        return summary
+
+    def _frame_size(width: Optional[int], height: Optional[int]):
+        return (width, height) if width and height else None
+
+    @app.websocket("/ws/ingest/{client_id}")
+    async def ingest_stream(websocket: WebSocket, client_id: str, encoding: str = "jpeg",
+                            format: str = "json", width: Optional[int] = None,
+                            height: Optional[int] = None):
+        await websocket.accept()
+        try:
+            async with ingest.connect(client_id, encoding, _frame_size(width, height)) as client:
+                subscription = client.broadcaster.subscribe(format)
+                sender = asyncio.create_task(send_updates(websocket, subscription))
+                try:
+                    while True:
+                        message = await websocket.receive()
+                        if message["type"] == "websocket.disconnect":
+                            break
+                        payload = message.get("bytes")
+                        if payload is None:
+                            continue
+                        if len(payload) > ingest.max_frame_bytes:
+                            await websocket.close(code=1009)
+                            break
+                        client.offer(payload)
+                finally:
+                    sender.cancel()
+                    subscription.close()
+        except AdmissionError as e:
+            # 1013: try again later
+            await websocket.close(code=1013, reason=str(e))
+        except ValueError as e:
+            # Unknown encoding or wire format
+            await websocket.close(code=1008, reason=str(e))
+        except WebSocketDisconnect:
+            pass
+
+    @app.post("/ingest/{client_id}/frames")
+    async def ingest_upload(request: Request, client_id: str, encoding: str = "jpeg",
+                            width: Optional[int] = None, height: Optional[int] = None) -> Dict:
+        """Process an upload of u32-length-prefixed frames, paced to the client's rate limit"""
+        try:
+            async with ingest.connect(client_id, encoding, _frame_size(width, height)) as client:
+                last = None
+                async for payload in iter_length_prefixed(request.stream(), ingest.max_frame_bytes):
+                    last = await client.push(payload) or last
+                stats = client.stats()
+        except AdmissionError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except FrameError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if last is not None:
+            last = {key: value for key, value in last.items() if key != "keypoints"}
+        return {"client_id": client_id, **stats, "last_update": last}
+
+    @app.get("/health")
+    async def health() -> Dict:
+        return {
+            "status": "ok" if inference.ready else "starting",
+            "inference_workers": inference.workers,
+            "model_load_seconds": inference.load_seconds,
+        }
+
+    @app.get("/metrics")
+    async def metrics() -> Dict:
+        return {
+            "inference": {"workers": inference.workers, "inferences": inference.inferences},
+            "cameras": {camera: service.stats() for camera, service in services.items()},
+            "ingest": ingest.stats(),
+            "latency_ms": get_latency_recorder().snapshot(),
+            "startup": get_startup_profile().report(),
+        }
+
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", "8000")))
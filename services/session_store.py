@@ -0,0 +1,289 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+# Per-frame metric columns and their on-disk dtypes
+FRAME_COLUMNS = {
+    "time_s": "<f8",
+    "steps_count": "<i4",
+    "speed": "<f4",
+    "cadence": "<f4",
+    "stride_length": "<f4",
+    "vertical_oscillation": "<f4",
+    "total_distance": "<f4",
+    "calories_burned": "<f4",
+}
+
+SUMMARY_METRICS = ("avg_speed", "avg_cadence", "avg_stride_length", "avg_vertical_oscillation")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL DEFAULT 0,
+    total_distance REAL NOT NULL DEFAULT 0,
+    calories_burned REAL NOT NULL DEFAULT 0,
+    steps_count INTEGER NOT NULL DEFAULT 0,
+    max_speed REAL NOT NULL DEFAULT 0,
+    avg_speed REAL NOT NULL DEFAULT 0,
+    avg_cadence REAL NOT NULL DEFAULT 0,
+    avg_stride_length REAL NOT NULL DEFAULT 0,
+    avg_vertical_oscillation REAL NOT NULL DEFAULT 0,
+    frames INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_by_user_time ON sessions (user_id, started_at);
+"""
+
+# Queued by flush() so the writer commits what it has gathered without waiting
+_FLUSH = ("flush", None)
+
+
+def get_data_dir() -> str:
+    """Directory for persistent data (the container's /app/data volume), overridable with CVFIT_DATA_DIR"""
+    data_dir = os.environ.get('CVFIT_DATA_DIR')
+    if not data_dir:
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+
+class SessionStore:
+    """
+    Durable storage for workout sessions.
+
+    Session summaries live in one SQLite table indexed by user and start time,
+    so history queries stream through a cursor instead of loading everything.
+    Per-frame metrics are append-only column files, one raw little-endian
+    array per metric under ``frames/<session_id>/``. A session's series can be
+    memory-mapped column by column without reading the rest.
+
+    All writes go through a queue to one background writer thread that
+    commits in batches. Callers on the capture or metrics path only ever pay
+    for a queue put.
+    """
+
+    def __init__(self, data_dir: Optional[str] = None, flush_interval: float = 0.5,
+                 batch_size: int = 512):
+        """
+        Args:
+            data_dir: Storage root; defaults to get_data_dir()
+            flush_interval: Longest time (seconds) a write waits in the queue
+            batch_size: Queued writes applied per commit
+        """
+        self.data_dir = data_dir or get_data_dir()
+        self.frames_dir = os.path.join(self.data_dir, 'frames')
+        os.makedirs(self.frames_dir, exist_ok=True)
+        self.db_path = os.path.join(self.data_dir, 'sessions.db')
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+        self._queue: queue.Queue = queue.Queue()
+        # Start times of sessions begun but not yet ended
+        self._open_sessions: Dict[str, float] = {}
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="session-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=30.0)
+        db.row_factory = sqlite3.Row
+        return db
+
+    # Writes (queued)
+
+    def begin_session(self, user_id: str = "default", started_at: Optional[float] = None) -> str:
+        """Create a session and return its id; the summary is filled in by end_session()"""
+        session_id = uuid.uuid4().hex
+        started_at = started_at if started_at is not None else time.time()
+        self._open_sessions[session_id] = started_at
+        self._queue.put(("begin", (session_id, user_id, started_at)))
+        return session_id
+
+    def append_frame(self, session_id: str, row: Dict[str, float]):
+        """Queue one frame's metrics; missing columns are stored as 0"""
+        self._queue.put(("frame", (session_id, row)))
+
+    def end_session(self, session_id: str, summary: Dict) -> Optional[float]:
+        """
+        Store a session's ActivityTracker.end_session() summary.
+
+        Returns:
+            float: The session's stored start time, or None if it was not
+                begun through this store
+        """
+        self._queue.put(("end", (session_id, summary)))
+        return self._open_sessions.pop(session_id, None)
+
+    def save_session(self, summary: Dict, user_id: str = "default",
+                     started_at: Optional[float] = None) -> str:
+        """Store a finished session that has no per-frame series"""
+        session_id = self.begin_session(user_id, started_at)
+        self.end_session(session_id, summary)
+        return session_id
+
+    def flush(self):
+        """Block until every queued write is on disk"""
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._writer.join()
+
+    def _write_loop(self):
+        db = self._connect()
+        running = True
+        while running:
+            item = self._queue.get()
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            # Gather whatever else arrives shortly, up to a full batch or a flush
+            while item is not None and item is not _FLUSH and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            running = batch[-1] is not None
+            try:
+                self._apply(db, [entry for entry in batch if entry is not None and entry is not _FLUSH])
+            except Exception as e:
+                print(f"Error writing session data: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        db.close()
+
+    def _apply(self, db: sqlite3.Connection, batch: List):
+        frames: Dict[str, List[Dict]] = {}
+        with db:
+            for kind, payload in batch:
+                if kind == "begin":
+                    db.execute("INSERT INTO sessions (session_id, user_id, started_at) VALUES (?, ?, ?)", payload)
+                elif kind == "frame":
+                    session_id, row = payload
+                    frames.setdefault(session_id, []).append(row)
+                elif kind == "end":
+                    session_id, summary = payload
+                    if session_id in frames:
+                        # Keep the frame count consistent with what is on disk
+                        self._append_columns(session_id, frames.pop(session_id), db)
+                    averages = summary.get("average_metrics") or {}
+                    db.execute(
+                        "UPDATE sessions SET duration = ?, total_distance = ?, calories_burned = ?, "
+                        "steps_count = ?, max_speed = ?, avg_speed = ?, avg_cadence = ?, "
+                        "avg_stride_length = ?, avg_vertical_oscillation = ? WHERE session_id = ?",
+                        (float(summary.get("duration", 0.0)), float(summary.get("total_distance", 0.0)),
+                         float(summary.get("calories_burned", 0.0)), int(summary.get("steps_count", 0)),
+                         float(summary.get("max_speed", 0.0)),
+                         *(float(averages.get(key, 0.0)) for key in SUMMARY_METRICS), session_id))
+            for session_id, rows in frames.items():
+                self._append_columns(session_id, rows, db)
+
+    def _append_columns(self, session_id: str, rows: List[Dict], db: sqlite3.Connection):
+        session_dir = os.path.join(self.frames_dir, session_id)
+        os.makedirs(session_dir, exist_ok=True)
+        for column, dtype in FRAME_COLUMNS.items():
+            values = np.fromiter((row.get(column, 0) or 0 for row in rows), dtype=dtype, count=len(rows))
+            with open(os.path.join(session_dir, f"{column}.bin"), 'ab') as f:
+                f.write(values.tobytes())
+        db.execute("UPDATE sessions SET frames = frames + ? WHERE session_id = ?", (len(rows), session_id))
+
+    # Reads
+
+    def iter_sessions(self, user_id: Optional[str] = None, since: Optional[float] = None,
+                      until: Optional[float] = None, newest_first: bool = False,
+                      limit: Optional[int] = None, batch_size: int = 1000) -> Iterator[Dict]:
+        """
+        Stream session summaries in start order, a batch of rows at a time.
+
+        Args:
+            user_id: Only this user's sessions
+            since: Only sessions started at or after this Unix time
+            until: Only sessions started before this Unix time
+            newest_first: Reverse the order
+            limit: At most this many sessions
+
+        Yields:
+            dict: Summary in ActivityTracker.end_session() form plus
+                session_id, user_id, timestamp (datetime) and frames
+        """
+        self.flush()
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if since is not None:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("started_at < ?")
+            params.append(until)
+        sql = "SELECT * FROM sessions"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY started_at {'DESC' if newest_first else 'ASC'}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        db = self._connect()
+        try:
+            cursor = db.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._row_to_summary(row)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _row_to_summary(row: sqlite3.Row) -> Dict:
+        return {
+            "session_id": row["session_id"],
+            "user_id": row["user_id"],
+            "timestamp": datetime.fromtimestamp(row["started_at"]),
+            "duration": row["duration"],
+            "total_distance": row["total_distance"],
+            "calories_burned": row["calories_burned"],
+            "steps_count": row["steps_count"],
+            "max_speed": row["max_speed"],
+            "average_metrics": {key: row[key] for key in SUMMARY_METRICS},
+            "frames": row["frames"],
+        }
+
+    def load_frames(self, session_id: str, columns: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """Memory-map a session's per-frame columns (all of them by default)"""
+        self.flush()
+        session_dir = os.path.join(self.frames_dir, session_id)
+        series = {}
+        for column in (columns or FRAME_COLUMNS):
+            path = os.path.join(session_dir, f"{column}.bin")
+            dtype = np.dtype(FRAME_COLUMNS[column])
+            if not os.path.exists(path) or os.path.getsize(path) < dtype.itemsize:
+                series[column] = np.zeros(0, dtype=dtype)
+            else:
+                series[column] = np.memmap(path, dtype=dtype, mode='r')
+        return series
+
+    def __enter__(self) -> "SessionStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
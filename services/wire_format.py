@@ -0,0 +1,159 @@
+"""
+Compact binary encoding of streamed pose updates.
+
+Each frame is one little-endian message:
+
+    header      version u8, flags u8, seq u32, reference seq u32, steps u32
+    metrics     float32 x len(METRIC_FIELDS)
+    keypoints   presence bitmask u32, then float16 (x, y, confidence) for
+                every keypoint whose bit is set
+    movement    u8 index into MOVEMENT_TYPES
+    feedback    u16 length, then UTF-8 JSON of the feedback dict
+
+Keyframes (flag KEYFRAME) carry all 17 keypoints. The frames between carry
+only the keypoints that moved more than the tolerance since the keyframe
+named by ``reference seq``. They are deltas against the keyframe rather than
+the previous frame, so a client that dropped frames can still decode the
+next one, as long as it has the keyframe. Keypoint values are always
+absolute, so errors never accumulate. The encoder's ``keyframe`` attribute
+lets the Broadcaster resend the keyframe to clients that joined late or
+dropped it.
+"""
+import json
+import struct
+from typing import Dict, Optional
+
+import numpy as np
+
+from core.keypoints import NUM_KEYPOINTS
+
+VERSION = 1
+KEYFRAME = 0x01
+
+METRIC_FIELDS = ("speed", "cadence", "stride_length", "vertical_oscillation",
+                 "total_distance", "stability")
+MOVEMENT_TYPES = ("unknown", "walking", "running")
+
+_HEADER = struct.Struct("<BBIII")
+_METRICS = struct.Struct(f"<{len(METRIC_FIELDS)}f")
+_MASK = struct.Struct("<I")
+_TRAILER = struct.Struct("<BH")
+_BITS = np.arange(NUM_KEYPOINTS)
+_BIT_WEIGHTS = np.left_shift(1, _BITS)
+
+
+def _metric(update: Dict, name: str) -> float:
+    value = update.get("metrics", {}).get(name)
+    if value is None:
+        value = update.get(name, 0.0)
+    return float(value or 0.0)
+
+
+class BinaryEncoder:
+    """
+    Stateful encoder for one stream of updates; call it with each update dict.
+
+    The update's "keypoints" may be a (17, 3) array or nested lists.
+    """
+
+    def __init__(self, keyframe_interval: int = 30, tolerance: float = 0.5):
+        """
+        Args:
+            keyframe_interval: Send every keypoint at least this often
+            tolerance: Pixels a keypoint may move (and 0.02 its confidence
+                change) before a delta frame resends it
+        """
+        self.keyframe_interval = keyframe_interval
+        self.tolerance = tolerance
+        self._thresholds = np.array([tolerance, tolerance, 0.02], dtype=np.float32)
+        self._reference: Optional[np.ndarray] = None
+        self._reference_seq = 0
+        self._since_keyframe = 0
+        # Encoded form of the keyframe the latest deltas refer to
+        self.keyframe: Optional[bytes] = None
+
+    def __call__(self, update: Dict) -> bytes:
+        seq = int(update.get("seq", 0))
+        kpts = np.asarray(update.get("keypoints", ()), dtype=np.float32).reshape(-1, 3)
+        if len(kpts) != NUM_KEYPOINTS:
+            kpts = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
+
+        keyframe = self._reference is None or self._since_keyframe + 1 >= self.keyframe_interval
+        if keyframe:
+            changed = np.ones(NUM_KEYPOINTS, dtype=bool)
+            self._reference = kpts.copy()
+            self._reference_seq = seq
+            self._since_keyframe = 0
+        else:
+            diff = np.abs(kpts - self._reference)
+            changed = (diff > self._thresholds).any(axis=1)
+            self._since_keyframe += 1
+
+        mask = int(_BIT_WEIGHTS[changed].sum())
+        movement = update.get("movement_type", "unknown")
+        feedback = json.dumps(update.get("feedback") or {}, separators=(",", ":")).encode("utf-8")
+
+        payload = b"".join((
+            _HEADER.pack(VERSION, KEYFRAME if keyframe else 0, seq, self._reference_seq,
+                         int(update.get("steps_count", 0))),
+            _METRICS.pack(*(_metric(update, name) for name in METRIC_FIELDS)),
+            _MASK.pack(mask),
+            kpts[changed].astype("<f2").tobytes(),
+            _TRAILER.pack(MOVEMENT_TYPES.index(movement) if movement in MOVEMENT_TYPES else 0, len(feedback)),
+            feedback,
+        ))
+        if keyframe:
+            self.keyframe = payload
+        return payload
+
+
+class BinaryDecoder:
+    """Client-side decoder; keeps the last keyframe to resolve delta frames"""
+
+    def __init__(self):
+        self._reference: Optional[np.ndarray] = None
+        self._reference_seq: Optional[int] = None
+
+    def decode(self, payload: bytes) -> Optional[Dict]:
+        """
+        Returns:
+            dict: The update, with "keypoints" as a (17, 3) float32 array, or
+                None for a delta frame whose keyframe was never received
+        """
+        version, flags, seq, reference_seq, steps = _HEADER.unpack_from(payload, 0)
+        if version != VERSION:
+            raise ValueError(f"Unsupported wire format version {version}")
+        offset = _HEADER.size
+        metrics = dict(zip(METRIC_FIELDS, _METRICS.unpack_from(payload, offset)))
+        offset += _METRICS.size
+        (mask,) = _MASK.unpack_from(payload, offset)
+        offset += _MASK.size
+
+        changed = ((mask >> _BITS) & 1).astype(bool)
+        count = int(changed.sum())
+        values = np.frombuffer(payload, dtype="<f2", count=count * 3, offset=offset).reshape(count, 3)
+        offset += values.nbytes
+
+        if flags & KEYFRAME:
+            kpts = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
+            self._reference_seq = seq
+        elif reference_seq != self._reference_seq:
+            return None
+        else:
+            kpts = self._reference.copy()
+        kpts[changed] = values
+        if flags & KEYFRAME:
+            self._reference = kpts.copy()
+
+        movement, feedback_length = _TRAILER.unpack_from(payload, offset)
+        offset += _TRAILER.size
+        feedback = json.loads(payload[offset:offset + feedback_length].decode("utf-8"))
+
+        return {
+            "seq": seq,
+            "keypoints": kpts,
+            "metrics": metrics,
+            "steps_count": steps,
+            "movement_type": MOVEMENT_TYPES[movement],
+            "feedback": feedback,
+        }
@@ -0,0 +1,80 @@
+import csv
+import json
+import math
+
+import cv2
+import numpy as np
+import pytest
+import analyze_videos
+from core.keypoints import KEYPOINT_INDEX, NUM_KEYPOINTS, KeypointView
+
+FPS = 30.0
+FRAMES = 150
+STEP_HZ = 2.8
+
+class TreadmillEngine:
+    """Stand-in for PoseEngine: a runner whose legs alternate at STEP_HZ, one pose per video frame."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def detect(self, frame):
+        phase = 2 * math.pi * (STEP_HZ / 2) * self.calls / FPS
+        self.calls += 1
+        swing = 40 * math.sin(phase)
+        points = {
+            "left_ankle": (300 + swing, 420 - abs(swing) * 0.5),
+            "right_ankle": (340 - swing, 420 - abs(swing) * 0.5 - 10 * math.cos(phase)),
+            "left_knee": (305 + swing * 0.5, 340 + 10 * math.sin(phase)),
+            "right_knee": (335 - swing * 0.5, 340 - 10 * math.sin(phase)),
+            "left_hip": (310, 260 + 4 * math.sin(2 * phase)),
+            "right_hip": (330, 260 + 4 * math.sin(2 * phase)),
+            "left_wrist": (280 - swing * 0.6, 240 + 15 * math.sin(phase)),
+            "right_wrist": (360 + swing * 0.6, 240 - 15 * math.sin(phase)),
+        }
+        kpts = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
+        for name, (x, y) in points.items():
+            kpts[KEYPOINT_INDEX[name]] = (x, y, 0.9)
+        mask = sum(1 << KEYPOINT_INDEX[name] for name in points)
+        return kpts, mask
+
+    def keypoints_to_positions(self, kpts, mask=None):
+        return KeypointView(kpts, mask)
+
+@pytest.fixture
+def video_path(tmp_path):
+    path = str(tmp_path / "treadmill.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (160, 120))
+    if not writer.isOpened():
+        pytest.skip("No MJPG encoder available")
+    for i in range(FRAMES):
+        writer.write(np.full((120, 160, 3), i % 200, dtype=np.uint8))
+    writer.release()
+    return path
+
+def test_analyze_video_writes_summary_and_frames_on_video_time(video_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(analyze_videos, "_pose_engine", TreadmillEngine())
+    output_dir = tmp_path / "analysis"
+    output_dir.mkdir()
+
+    summary = analyze_videos.analyze_video(video_path, str(output_dir))
+
+    with open(output_dir / "treadmill_summary.json") as f:
+        written = json.load(f)
+    assert written["frames"] == summary["frames"] == FRAMES
+    assert written["video_fps"] == pytest.approx(FPS)
+    assert written["steps_count"] == summary["steps_count"] > 0
+
+    with open(output_dir / "treadmill_frames.csv", newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [int(row["frame"]) for row in rows] == list(range(FRAMES))
+    times = np.array([float(row["time_s"]) for row in rows])
+    np.testing.assert_allclose(np.diff(times), 1 / FPS, atol=1e-3)
+    assert int(rows[-1]["steps_count"]) == summary["steps_count"]
+
+    # Timed by the video, not by how fast it was analyzed
+    assert summary["duration"] == pytest.approx(times[-1], abs=1e-3)
+    assert summary["duration"] == pytest.approx(FRAMES / FPS, abs=2 / FPS)
+    assert summary["realtime_factor"] > 1.0
+    steps_per_second = summary["steps_count"] / summary["duration"]
+    assert steps_per_second == pytest.approx(STEP_HZ, rel=0.35)
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import numpy as np
+from core.batch_scheduler import BatchScheduler
+from core.keypoints import NUM_KEYPOINTS, KeypointView
+
+class FakeSource:
+    """Stand-in for VideoCapture: hands out queued frames and signals listeners like the capture thread."""
+
+    def __init__(self, stream_id):
+        self.stream_id = stream_id
+        self.frames = []
+        self.listeners = []
+
+    def add_frame_listener(self, event):
+        self.listeners.append(event)
+
+    def push(self, count=1):
+        for _ in range(count):
+            self.frames.append(np.full((4, 4, 3), self.stream_id, dtype=np.uint8))
+            for event in self.listeners:
+                event.set()
+
+    def read(self, timeout=0):
+        return self.frames.pop(0) if self.frames else None
+
+class BatchEngine:
+    """Stand-in for PoseEngine: every keypoint's x is the stream id painted into the frame."""
+
+    confidence_threshold = 0.5
+
+    def __init__(self):
+        self.batches = []
+
+    def detect_batch(self, frames):
+        self.batches.append([int(frame[0, 0, 0]) for frame in frames])
+        results = []
+        for frame in frames:
+            kpts = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
+            kpts[:, 0] = frame[0, 0, 0]
+            kpts[:, 2] = 0.9
+            results.append((kpts, (1 << NUM_KEYPOINTS) - 1))
+        return results
+
+    def render(self, frame, kpts, in_place=True):
+        frame[0, 1] = 255
+        return frame
+
+    def keypoints_to_positions(self, kpts, mask=None):
+        return KeypointView(kpts, mask)
+
+def _scheduler(num_sources, **options):
+    sources = [FakeSource(i) for i in range(num_sources)]
+    scheduler = BatchScheduler(BatchEngine(), sources, **options)
+    # Running, for tests that drive _collect_batch without the worker thread
+    scheduler.stopped = False
+    return scheduler, sources
+
+def test_frames_from_all_streams_share_one_model_call():
+    scheduler, sources = _scheduler(3, batch_size=4, max_wait=0.05)
+    for source in sources:
+        source.push(2)
+
+    assert [stream for stream, _ in scheduler._collect_batch()] == [0, 1, 2, 0]
+    assert [stream for stream, _ in scheduler._collect_batch()] == [1, 2]
+
+def test_round_robin_gives_every_stream_a_fair_share():
+    scheduler, sources = _scheduler(3, batch_size=2, max_wait=0.0)
+    served = []
+    for _ in range(6):
+        for source in sources:
+            source.push()
+        served += [stream for stream, _ in scheduler._collect_batch()]
+        for source in sources:
+            source.frames.clear()
+
+    assert [served.count(stream) for stream in range(3)] == [4, 4, 4]
+
+def test_results_are_routed_to_their_own_stream():
+    scheduler, sources = _scheduler(3, batch_size=3, max_wait=0.05)
+    scheduler.start()
+    try:
+        for source in sources:
+            source.push()
+        results = {}
+        deadline = time.monotonic() + 5
+        while len(results) < 3 and time.monotonic() < deadline:
+            for stream in range(3):
+                result = scheduler.read(stream)
+                if result is not None:
+                    results[stream] = result
+            time.sleep(0.005)
+    finally:
+        scheduler.stop()
+
+    for stream, (frame, positions) in results.items():
+        assert frame[0, 0, 0] == stream and frame[0, 1, 0] == 255
+        assert positions["nose"][0] == stream
+    assert sorted(results) == [0, 1, 2]
+    assert scheduler.pose_engine.batches == [[0, 1, 2]]
+
+def test_stale_results_are_dropped_for_slow_consumers():
+    scheduler, _ = _scheduler(1)
+    for value in range(5):
+        scheduler._publish(0, np.full((4, 4, 3), value, dtype=np.uint8), {})
+
+    assert [scheduler.read(0)[0][0, 0, 0] for _ in range(2)] == [3, 4]
+    assert scheduler.read(0) is None
+
+def test_idle_scheduler_wakes_on_the_next_frame():
+    scheduler, sources = _scheduler(2, batch_size=2, max_wait=0.0)
+    threading.Timer(0.05, sources[1].push).start()
+
+    started = time.perf_counter()
+    batch = scheduler._collect_batch(idle_timeout=2.0)
+    assert [stream for stream, _ in batch] == [1]
+    assert time.perf_counter() - started < 1.0
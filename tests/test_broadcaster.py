@@ -0,0 +1,89 @@
+import asyncio
+import numpy as np
+import pytest
+from core.keypoints import NUM_KEYPOINTS
+from services.broadcaster import Broadcaster
+from services.wire_format import BinaryDecoder, BinaryEncoder
+
+def test_update_is_encoded_once_per_format():
+    calls = []
+    async def scenario():
+        broadcaster = Broadcaster()
+        broadcaster.register_format("upper", lambda update: calls.append(update) or str(update).upper())
+        clients = [broadcaster.subscribe("upper") for _ in range(5)] + [broadcaster.subscribe("json")]
+        assert broadcaster.publish({"seq": 1}) == 6
+        payloads = [await client.get() for client in clients]
+        return payloads
+    payloads = asyncio.run(scenario())
+
+    assert calls == [{"seq": 1}]
+    assert all(p is payloads[0] for p in payloads[:5])
+    assert payloads[5] == '{"seq":1}'
+
+def test_slow_client_drops_oldest_without_blocking_others():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=2)
+        slow, fast = broadcaster.subscribe(), broadcaster.subscribe()
+        received = []
+        for seq in range(1, 6):
+            broadcaster.publish({"seq": seq})
+            received.append(await fast.get())
+        return received, [await slow.get(), await slow.get()], slow.dropped
+    received, slow_payloads, dropped = asyncio.run(scenario())
+
+    assert len(received) == 5
+    assert slow_payloads == ['{"seq":4}', '{"seq":5}'] and dropped == 3
+
+def test_unknown_format_and_unsubscribe():
+    async def scenario():
+        broadcaster = Broadcaster()
+        with pytest.raises(ValueError):
+            broadcaster.subscribe("xml")
+        subscription = broadcaster.subscribe()
+        subscription.close()
+        return broadcaster.publish({"seq": 1})
+    assert asyncio.run(scenario()) == 0
+
+def test_end_delivers_queued_updates_then_stops():
+    async def scenario():
+        broadcaster = Broadcaster()
+        subscription = broadcaster.subscribe()
+        broadcaster.publish({"seq": 1})
+        broadcaster.end("camera lost")
+        received = [payload async for payload in subscription]
+        return received, subscription, await subscription.get(), len(broadcaster)
+    received, subscription, after, subscribers = asyncio.run(scenario())
+
+    assert received == ['{"seq":1}'] and after is None
+    assert subscription.closed_reason == "camera lost" and subscribers == 0
+
+def _pose_update(seq):
+    kpts = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
+    kpts[:, 0] = np.arange(NUM_KEYPOINTS) * 10 + seq
+    kpts[:, 2] = 0.9
+    return {"seq": seq, "keypoints": kpts}
+
+def test_late_and_slow_binary_clients_get_the_keyframe():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=3)
+        broadcaster.register_format("binary", BinaryEncoder(keyframe_interval=10))
+        slow = broadcaster.subscribe("binary")
+        for seq in range(1, 5):
+            broadcaster.publish(_pose_update(seq))
+        late = broadcaster.subscribe("binary")
+        for seq in range(5, 9):
+            broadcaster.publish(_pose_update(seq))
+
+        decoded = {}
+        for name, subscription in (("slow", slow), ("late", late)):
+            decoder = BinaryDecoder()
+            decoded[name] = []
+            while not subscription.queue.empty():
+                update = decoder.decode(await subscription.get())
+                decoded[name].append(update["seq"] if update is not None else None)
+        return decoded, slow.dropped
+    decoded, dropped = asyncio.run(scenario())
+
+    # Frames 2..8 are deltas against keyframe 1, which every client keeps ahead of them
+    assert decoded["slow"] == decoded["late"] == [1, 7, 8]
+    assert dropped == 5
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from services.analytics_service import AnalyticsService
+from services.cohort_analytics import LEVELS, CohortAnalytics, SessionBatch
+from services.recommendation_service import RecommendationService
+from services.session_store import SessionStore
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+def _histories(members=40, seed=2):
+    rng = np.random.default_rng(seed)
+    histories = {}
+    for m in range(members):
+        count = int(rng.integers(0, 25))
+        ages = np.sort(rng.uniform(0, 60, size=count))[::-1]
+        histories[f"member-{m}"] = [{
+            "timestamp": NOW - timedelta(days=float(age)),
+            "duration": float(rng.uniform(600, 3600)),
+            "total_distance": float(rng.uniform(1000, 10000)),
+            "average_metrics": {"avg_speed": float(rng.uniform(1.5, 4.0)),
+                                "avg_cadence": float(rng.uniform(130, 190))},
+        } for age in ages]
+    return histories
+
+def test_matches_the_single_user_services():
+    histories = _histories()
+    batch = SessionBatch.from_histories(histories)
+    cohort = CohortAnalytics()
+    levels = cohort.performance_levels(batch)
+    progress = cohort.progress_metrics(batch, days=30, now=NOW)
+    plans = cohort.workout_plans(levels, available_time=1800)
+    recommendations = RecommendationService()
+
+    for i, (user_id, sessions) in enumerate(histories.items()):
+        service = AnalyticsService(user_id=user_id)
+        for session in sessions:
+            service.index.add(user_id, session)
+        level = service.get_performance_level()
+        assert LEVELS[levels[i]] == level
+
+        expected = service.get_progress_metrics(days=30, now=NOW)
+        assert progress["sessions_count"][i] == expected.get("sessions_count", 0)
+        for key, value in expected.items():
+            assert progress[key][i] == pytest.approx(value), key
+
+        assert cohort.workout_plan(plans, levels, i) == recommendations.generate_workout_plan(level, 1800)
+
+def test_completion_rate_and_short_sessions():
+    cohort = CohortAnalytics()
+    levels = np.array([0, 1, 2, 2])
+    plans = cohort.workout_plans(levels, available_time=[1800, 1800, 1800, 300],
+                                 completion_rate=[0.9, np.nan, 0.5, 0.7])
+    recommendations = RecommendationService()
+
+    assert cohort.workout_plan(plans, levels, 0) == \
+        recommendations.generate_workout_plan("novice", 1800, {"completion_rate": 0.9})
+    assert cohort.workout_plan(plans, levels, 1) == recommendations.generate_workout_plan("intermediate", 1800)
+    assert cohort.workout_plan(plans, levels, 2) == \
+        recommendations.generate_workout_plan("advanced", 1800, {"completion_rate": 0.5})
+    assert cohort.workout_plan(plans, levels, 3)["main_workout"] == [{"name": "Quick Run", "duration": 300.0}]
+
+def test_summarize_members_without_sessions():
+    batch = SessionBatch.from_histories({"new": [], **_histories(members=3)})
+    (new, *_) = CohortAnalytics().summarize(batch, available_time=1800, now=NOW)
+    assert new["user_id"] == "new" and new["performance_level"] == "novice" and new["progress"] == {}
+    assert len(SessionBatch.from_histories({})) == 0
+
+def test_batch_from_store(tmp_path):
+    histories = _histories(members=5)
+    with SessionStore(str(tmp_path)) as store:
+        for user_id, sessions in histories.items():
+            for session in sessions:
+                store.save_session(session, user_id, started_at=session["timestamp"].timestamp())
+        batch = SessionBatch.from_store(store, user_ids=list(histories))
+
+    expected = CohortAnalytics().progress_metrics(SessionBatch.from_histories(histories), now=NOW)
+    progress = CohortAnalytics().progress_metrics(batch, now=NOW)
+    for key, values in expected.items():
+        assert progress[key] == pytest.approx(values)
+
+def test_progress_window_is_whole_days_like_the_rollups():
+    sessions = [{
+        "timestamp": when,
+        "duration": 1200.0,
+        "total_distance": 3000.0,
+        "average_metrics": {"avg_speed": speed, "avg_cadence": 160.0},
+    } for when, speed in ((datetime(2024, 5, 1, 23, 0), 2.0),  # Day before the window
+                          (datetime(2024, 5, 2, 0, 30), 2.5),  # Earlier than 30 days ago, same day
+                          (NOW, 3.0),
+                          (datetime(2024, 6, 2, 8, 0), 3.5))]  # Tomorrow
+    service = AnalyticsService(user_id="member")
+    for session in sessions:
+        service.index.add("member", session)
+
+    progress = CohortAnalytics().progress_metrics(SessionBatch.from_histories({"member": sessions}), now=NOW)
+    expected = service.get_progress_metrics(days=30, now=NOW)
+    assert expected["sessions_count"] == progress["sessions_count"][0] == 2
+    assert progress["improvement_rate"][0] == pytest.approx(expected["improvement_rate"]) == pytest.approx(20.0)
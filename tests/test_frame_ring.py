@@ -0,0 +1,45 @@
+import threading
+from utils.frame_ring import FrameRing
+
+def _write(ring, value):
+    index = ring.acquire_write()
+    ring.buffers[index].fill(value)
+    ring.publish(index)
+    return index
+
+def test_latest_frame_wins():
+    """Readers always get the newest published frame, never a stale one."""
+    ring = FrameRing((4, 4, 3), num_slots=3)
+    for value in (1, 2, 3):
+        _write(ring, value)
+
+    with ring.borrow(timeout=0) as lease:
+        assert lease.seq == 3
+        assert lease.frame[0, 0, 0] == 3
+    assert ring.borrow(after_seq=3, timeout=0) is None
+
+def test_borrowed_slots_are_not_overwritten():
+    """The writer skips slots held by readers and drops frames when none are free."""
+    ring = FrameRing((2, 2), num_slots=3)
+    _write(ring, 7)
+    first = ring.borrow(timeout=0)
+    _write(ring, 8)
+    second = ring.borrow(after_seq=first.seq, timeout=0)
+    _write(ring, 9)
+
+    # Two slots are borrowed and the third holds the latest frame: nothing is free
+    assert ring.acquire_write() is None
+    assert ring.dropped_frames == 1
+    assert first.frame[0, 0] == 7
+
+    first.release()
+    second.release()
+    assert ring.acquire_write() is not None
+
+def test_borrow_wakes_on_publish():
+    ring = FrameRing((2, 2), num_slots=3)
+    timer = threading.Timer(0.05, _write, args=(ring, 5))
+    timer.start()
+    lease = ring.borrow(timeout=2.0)
+    timer.join()
+    assert lease is not None and lease.frame[0, 0] == 5
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import struct
+import time
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from core.keypoints import NUM_KEYPOINTS
+from services.inference_pool import InferencePool
+from services.ingest import IngestService, TokenBucket, iter_length_prefixed
+from services.server import create_app
+from services.session_store import SessionStore
+from utils import startup
+
+class BatchEngine:
+    """Stand-in for PoseEngine: keypoints encode each frame's mean brightness."""
+
+    batch_sizes = []
+
+    def detect(self, frame):
+        return self.detect_batch([frame])[0]
+
+    def detect_batch(self, frames):
+        BatchEngine.batch_sizes.append(len(frames))
+        results = []
+        for frame in frames:
+            kpts = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
+            kpts[:, 0] = np.linspace(60, 100, NUM_KEYPOINTS)
+            kpts[:, 1] = np.linspace(10, 110, NUM_KEYPOINTS) + float(frame.mean()) / 10.0
+            kpts[:, 2] = 0.9
+            results.append((kpts, (1 << NUM_KEYPOINTS) - 1))
+        return results
+
+def _jpeg(value):
+    ok, data = cv2.imencode(".jpg", np.full((120, 160, 3), value, dtype=np.uint8))
+    return data.tobytes()
+
+@pytest.fixture
+def make_client(tmp_path):
+    BatchEngine.batch_sizes = []
+    clients = []
+
+    def make(**ingest_options):
+        inference = InferencePool(BatchEngine, warm_up_shape=None)
+        ingest = IngestService(inference, **ingest_options)
+        store = SessionStore(str(tmp_path / f"data{len(clients)}"))
+        client = TestClient(create_app(inference=inference, cameras=[], store=store, ingest=ingest))
+        clients.append((client.__enter__(), store))
+        return client
+
+    yield make
+    for client, store in clients:
+        client.__exit__(None, None, None)
+        store.close()
+
+def test_token_bucket():
+    now = [0.0]
+    bucket = TokenBucket(rate=10.0, burst=2.0, clock=lambda: now[0])
+    assert [bucket.try_acquire() for _ in range(3)] == [True, True, False]
+    assert bucket.delay() == pytest.approx(0.1)
+    now[0] += 0.1
+    assert bucket.try_acquire() and not bucket.try_acquire()
+
+def test_length_prefixed_frames_survive_any_chunking():
+    frames = [b"a" * 5, b"", b"xyz" * 100]
+    stream = b"".join(struct.pack("<I", len(f)) + f for f in frames)
+
+    async def chunks():
+        for i in range(0, len(stream), 7):
+            yield stream[i:i + 7]
+
+    async def collect():
+        return [frame async for frame in iter_length_prefixed(chunks(), 1 << 20)]
+
+    assert asyncio.run(collect()) == frames
+
+def test_websocket_frames_stream_back_metrics(make_client):
+    client = make_client(rate=1000.0, burst=1000.0)
+    with client.websocket_connect("/ws/ingest/kiosk-1?encoding=jpeg") as websocket:
+        seqs = []
+        for i in range(5):
+            websocket.send_bytes(_jpeg(40 + i))
+            seqs.append(websocket.receive_json()["seq"])
+        assert seqs == [1, 2, 3, 4, 5]
+        stats = client.get("/metrics").json()["ingest"]
+        assert stats["clients"] == 1 and stats["per_client"]["kiosk-1"]["frames_processed"] == 5
+
+def test_sessions_are_saved_under_each_client(tmp_path):
+    inference = InferencePool(BatchEngine, warm_up_shape=None)
+    ingest = IngestService(inference, rate=1000.0, burst=1000.0)
+    with SessionStore(str(tmp_path / "data")) as store:
+        with TestClient(create_app(inference=inference, cameras=[], store=store, ingest=ingest)) as client:
+            for kiosk, frames in (("kiosk-1", 3), ("kiosk-2", 2)):
+                with client.websocket_connect(f"/ws/ingest/{kiosk}") as websocket:
+                    for i in range(frames):
+                        websocket.send_bytes(_jpeg(40 + i))
+                        websocket.receive_json()
+            # Sessions are saved as the server notices each disconnect
+            deadline = time.monotonic() + 5
+            while client.get("/metrics").json()["ingest"]["clients"] and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            stored = {session["user_id"] for session in store.iter_sessions()}
+            assert stored == {"kiosk-1", "kiosk-2"}
+            assert len(list(store.iter_sessions("kiosk-1"))) == 1
+            analytics = client.app.state.analytics
+            assert analytics.index.session_count("kiosk-2") == 1
+            assert analytics.index.session_count("default") == 0
+
+def test_admission_and_rate_limits(make_client):
+    client = make_client(max_clients=1, rate=1.0, burst=2.0)
+    with client.websocket_connect("/ws/ingest/kiosk-1") as websocket:
+        with pytest.raises(WebSocketDisconnect) as refused:
+            with client.websocket_connect("/ws/ingest/kiosk-2") as other:
+                other.receive_bytes()
+        assert refused.value.code == 1013
+
+        for i in range(6):
+            websocket.send_bytes(_jpeg(i))
+        websocket.receive_json()
+        websocket.receive_json()
+        stats = client.get("/metrics").json()["ingest"]["per_client"]["kiosk-1"]
+        assert stats["rate_limited"] == 4 and stats["frames_processed"] == 2
+
+def test_http_upload_of_raw_frames(make_client):
+    client = make_client(rate=1000.0, burst=1000.0)
+    frames = [np.full((120, 160, 3), 10 * i, dtype=np.uint8).tobytes() for i in range(8)]
+
+    def body():
+        for frame in frames:
+            yield struct.pack("<I", len(frame)) + frame
+
+    response = client.post("/ingest/kiosk-9/frames?encoding=raw&width=160&height=120", content=body())
+    assert response.status_code == 200
+    result = response.json()
+    assert result["frames_processed"] == 8 and result["last_update"]["seq"] == 8
+
+    bad = client.post("/ingest/kiosk-9/frames?encoding=raw", content=b"")
+    assert bad.status_code == 400
+
+def test_frames_from_several_clients_share_batches():
+    BatchEngine.batch_sizes = []
+    ingest = IngestService(InferencePool(BatchEngine, warm_up_shape=None), rate=1000.0, burst=1000.0,
+                           batch_size=4, max_wait=0.02)
+
+    async def kiosk(name):
+        async with ingest.connect(name) as client:
+            return [await client.push(_jpeg(50 + i)) for i in range(3)]
+
+    async def run():
+        try:
+            return await asyncio.gather(*(kiosk(f"kiosk-{i}") for i in range(4)))
+        finally:
+            await ingest.stop()
+
+    results = asyncio.run(run())
+    assert all([u["seq"] for u in updates] == [1, 2, 3] for updates in results)
+    assert max(BatchEngine.batch_sizes) == 4 and sum(BatchEngine.batch_sizes) == 12
+
+def test_ingested_frames_do_not_mark_camera_first_keypoint(monkeypatch):
+    profile = startup.StartupProfile()
+    monkeypatch.setattr(startup, "_default_profile", profile)
+    ingest = IngestService(InferencePool(BatchEngine, warm_up_shape=None), rate=1000.0, burst=1000.0)
+
+    async def run():
+        try:
+            async with ingest.connect("kiosk-1") as client:
+                return await client.push(_jpeg(80))
+        finally:
+            await ingest.stop()
+
+    assert asyncio.run(run())["seq"] == 1
+    assert "first_keypoint" not in profile.marks
+
+class FlakyEngine(BatchEngine):
+    """Fails its first batch, like a transient CUDA error"""
+
+    failures = 1
+
+    def detect_batch(self, frames):
+        if FlakyEngine.failures:
+            FlakyEngine.failures -= 1
+            raise RuntimeError("boom")
+        return super().detect_batch(frames)
+
+def test_client_keeps_streaming_after_a_failed_batch():
+    FlakyEngine.failures = 1
+    ingest = IngestService(InferencePool(FlakyEngine, warm_up_shape=None), rate=1000.0, burst=1000.0)
+
+    async def run():
+        try:
+            async with ingest.connect("kiosk-1") as client:
+                subscription = client.broadcaster.subscribe()
+                for offered, value in enumerate((60, 70, 80), start=1):
+                    assert client.offer(_jpeg(value))
+                    deadline = time.monotonic() + 5
+                    while client.errors + client.frame_seq < offered and time.monotonic() < deadline:
+                        await asyncio.sleep(0.005)
+                updates = [await subscription.get() for _ in range(client.frame_seq)]
+                return client.stats(), updates, client._worker.done()
+        finally:
+            await ingest.stop()
+
+    stats, updates, worker_done = asyncio.run(run())
+    assert stats["errors"] == 1 and stats["frames_processed"] == 2
+    assert [json.loads(update)["seq"] for update in updates] == [1, 2]
+    assert not worker_done
@@ -0,0 +1,31 @@
+import numpy as np
+from core.keypoint_history import KeypointHistory
+from core.keypoints import KEYPOINT_INDEX, KeypointView, empty_keypoints
+
+def test_ring_wraps_and_counts_visible_frames():
+    history = KeypointHistory(window=4)
+    for i in range(6):
+        positions = {"left_ankle": (float(i), 10.0 * i)}
+        if i % 2 == 0:
+            positions["right_ankle"] = (1.0, 2.0)
+        history.append(positions, timestamp=i / 30.0)
+
+    assert history.size == 4
+    assert history.count("left_ankle") == 4
+    assert history.count("right_ankle") == 2
+    np.testing.assert_array_equal(history.recent_y("left_ankle", 3), [30.0, 40.0, 50.0])
+    assert len(history.recent("right_ankle", 5)) == 2
+
+def test_keypoint_view_fast_path_matches_dict():
+    kpts = empty_keypoints()
+    kpts[KEYPOINT_INDEX["left_hip"]] = (12.0, 34.0, 0.9)
+    view = KeypointView(kpts, 1 << KEYPOINT_INDEX["left_hip"])
+
+    from_view, from_dict = KeypointHistory(window=2), KeypointHistory(window=2)
+    from_view.append(view, 0.0)
+    from_dict.append(dict(view), 0.0)
+
+    positions, valid, timestamps = from_view.recent_frames(1)
+    np.testing.assert_array_equal(valid, from_dict.recent_frames(1)[1])
+    np.testing.assert_array_equal(positions[0, KEYPOINT_INDEX["left_hip"]], [12.0, 34.0])
+    assert from_view.count("left_hip") == 1 and from_view.count("nose") == 0
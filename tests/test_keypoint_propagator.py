@@ -0,0 +1,104 @@
+import cv2
+import numpy as np
+import pytest
+from core.keypoint_propagator import KeyframePoseEstimator
+from core.keypoints import NUM_KEYPOINTS
+
+ANCHORS = np.stack([np.linspace(80, 240, NUM_KEYPOINTS), np.linspace(60, 180, NUM_KEYPOINTS)], axis=1)
+
+class ShiftEngine:
+    """Stand-in for PoseEngine: reports the anchors moved by the scene's current shift."""
+
+    confidence_threshold = 0.5
+
+    def __init__(self):
+        self.calls = 0
+        self.shift = np.zeros(2)
+
+    def detect(self, frame):
+        self.calls += 1
+        kpts = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
+        kpts[:, :2] = ANCHORS + self.shift
+        kpts[:, 2] = 0.9
+        return kpts, (1 << NUM_KEYPOINTS) - 1
+
+def _texture(seed):
+    rng = np.random.default_rng(seed)
+    noise = rng.uniform(0, 255, size=(240, 320)).astype(np.uint8)
+    gray = cv2.GaussianBlur(noise, (7, 7), 2.0)
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+def _shifted(image, dx, dy):
+    return np.roll(image, (dy, dx), axis=(0, 1))
+
+@pytest.fixture
+def scene():
+    engine = ShiftEngine()
+    texture = _texture(0)
+
+    def frame(step, velocity=(2, 1)):
+        engine.shift = np.array([velocity[0] * step, velocity[1] * step], dtype=np.float64)
+        return _shifted(texture, velocity[0] * step, velocity[1] * step)
+
+    return engine, frame
+
+def test_inference_runs_on_keyframe_cadence(scene):
+    engine, frame = scene
+    estimator = KeyframePoseEstimator(engine, keyframe_interval=3)
+    for step in range(7):
+        estimator.detect(frame(step), seq=step + 1)
+
+    # Keyframes at frames 0, 3 and 6
+    assert engine.calls == 3
+    assert estimator.inference_count == 3 and estimator.propagated_count == 4
+
+def test_propagated_keypoints_follow_the_motion_with_decaying_confidence(scene):
+    engine, frame = scene
+    estimator = KeyframePoseEstimator(engine, keyframe_interval=4, confidence_decay=0.9)
+    estimator.detect(frame(0), seq=1)
+    for step in (1, 2, 3):
+        kpts, mask = estimator.detect(frame(step), seq=step + 1)
+        assert mask == (1 << NUM_KEYPOINTS) - 1
+        np.testing.assert_allclose(kpts[:, :2], ANCHORS + [2 * step, step], atol=0.5)
+        np.testing.assert_allclose(kpts[:, 2], 0.9 * 0.9 ** step, rtol=1e-5)
+    assert engine.calls == 1
+
+def test_lost_points_trigger_early_redetection(scene):
+    engine, frame = scene
+    estimator = KeyframePoseEstimator(engine, keyframe_interval=10)
+    estimator.detect(frame(0), seq=1)
+    estimator.detect(frame(1), seq=2)
+    assert engine.calls == 1
+
+    # A cut to an unrelated scene: flow cannot follow, so the model runs again
+    engine.shift = np.zeros(2)
+    kpts, _ = estimator.detect(_texture(1), seq=3)
+    assert engine.calls == 2
+    np.testing.assert_allclose(kpts[:, :2], ANCHORS)
+
+def test_drifting_points_are_dropped():
+    engine = ShiftEngine()
+    estimator = KeyframePoseEstimator(engine, keyframe_interval=10, min_tracked_ratio=0.0)
+    flat = np.full((240, 320, 3), 128, dtype=np.uint8)
+    textured = _texture(0)
+    # Texture only around the first half of the keypoints; the rest sit on a flat area
+    half = NUM_KEYPOINTS // 2
+    frame = flat.copy()
+    frame[:, :int(ANCHORS[half, 0]) - 10] = textured[:, :int(ANCHORS[half, 0]) - 10]
+    estimator.detect(frame, seq=1)
+    kpts, mask = estimator.detect(_shifted(frame, 2, 1), seq=2)
+
+    assert engine.calls == 1
+    assert all(mask >> i & 1 for i in range(half - 2))
+    assert kpts[:, 2].min() == 0.0
+
+def test_sequence_gap_forces_a_keyframe(scene):
+    engine, frame = scene
+    estimator = KeyframePoseEstimator(engine, keyframe_interval=10)
+    estimator.detect(frame(0), seq=1)
+    estimator.detect(frame(1), seq=2)
+    # Frames 3 and 4 went to another worker or were dropped
+    estimator.detect(frame(4), seq=5)
+    assert engine.calls == 2
+    estimator.detect(frame(5), seq=6)
+    assert engine.calls == 2
@@ -0,0 +1,40 @@
+import pytest
+import numpy as np
+from core.keypoints import KEYPOINT_INDEX, KeypointView, select_best_person, validity_mask
+
+def test_select_best_person_picks_highest_mean_confidence():
+    """The person with the highest mean confidence over detected keypoints wins."""
+    kpt_data = np.zeros((3, 17, 3), dtype=np.float32)
+    kpt_data[0, :, 2] = 0.4
+    kpt_data[1, :4, 2] = 0.9  # Few keypoints, but all of them confident
+    kpt_data[2, :, 2] = 0.6
+    kpt_data[1, :, 0] = 10.0
+
+    kpts, mask = select_best_person(kpt_data, confidence_threshold=0.5)
+
+    assert kpts.shape == (17, 3)
+    assert kpts.dtype == np.float32
+    assert kpts[0, 0] == 10.0
+    assert mask == 0b1111
+
+def test_select_best_person_empty():
+    """No detections yields zeroed keypoints and an empty mask."""
+    kpts, mask = select_best_person(np.zeros((0, 17, 3)), confidence_threshold=0.5)
+    assert kpts.shape == (17, 3)
+    assert mask == 0
+
+def test_keypoint_view_matches_dict_semantics():
+    """The lazy view behaves like the old name -> (x, y) dict."""
+    kpts = np.zeros((17, 3), dtype=np.float32)
+    kpts[KEYPOINT_INDEX["left_wrist"]] = (640, 400, 0.9)
+    kpts[KEYPOINT_INDEX["right_wrist"]] = (680, 420, 0.8)
+    kpts[KEYPOINT_INDEX["nose"]] = (1, 1, 0.2)
+
+    view = KeypointView(kpts, validity_mask(kpts, 0.5))
+
+    assert view == {"left_wrist": (640.0, 400.0), "right_wrist": (680.0, 420.0)}
+    assert "nose" not in view
+    assert len(view) == 2
+    with pytest.raises(KeyError):
+        view["nose"]
+    assert not KeypointView()
@@ -0,0 +1,23 @@
+from utils.latency import FrameTrace, LatencyHistogram, LatencyRecorder
+
+def test_histogram_percentiles_are_within_bucket_resolution():
+    """Log-bucketed percentiles land within ~10% of the exact values."""
+    histogram = LatencyHistogram()
+    for value in range(1, 101):
+        histogram.record(float(value))
+
+    assert abs(histogram.percentile(50) - 50) / 50 < 0.1
+    assert abs(histogram.percentile(99) - 99) / 99 < 0.1
+    assert histogram.summary()["count"] == 100
+
+def test_recorder_rolls_up_trace_stages():
+    trace = FrameTrace(start_ns=0)
+    trace.marks = [("capture", 2_000_000), ("inference", 32_000_000), ("display", 40_000_000)]
+
+    recorder = LatencyRecorder()
+    recorder.record_trace(trace)
+    snapshot = recorder.snapshot()
+
+    assert list(snapshot) == ["capture", "inference", "display", "total"]
+    assert snapshot["inference"]["max"] == 30.0
+    assert snapshot["total"]["max"] == 40.0
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from core.clock import ManualClock
+from core.keypoints import NUM_KEYPOINTS
+from core.person_tracker import PersonTracker, box_iou
+from core.tracker_pool import ActivityTrackerPool
+
+FPS = 30.0
+
+def people_frame(centers, scores=None):
+    """Detections for people standing at the given x centres, in the order given."""
+    boxes = np.array([[x - 40, 100, x + 40, 400] for x in centers], dtype=np.float32)
+    keypoints = np.zeros((len(centers), NUM_KEYPOINTS, 3), dtype=np.float32)
+    keypoints[:, :, 0] = np.asarray(centers, dtype=np.float32)[:, None]
+    keypoints[:, :, 1] = np.linspace(120, 390, NUM_KEYPOINTS)
+    keypoints[:, :, 2] = 0.9
+    scores = np.full(len(centers), 0.9, dtype=np.float32) if scores is None else np.asarray(scores, dtype=np.float32)
+    return keypoints, boxes, scores
+
+def test_box_iou():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+    np.testing.assert_allclose(box_iou(a, b), [[1.0, 1 / 3, 0.0]])
+
+def test_ids_stay_with_people_when_detection_order_changes():
+    tracker = PersonTracker()
+    rng = np.random.default_rng(0)
+    ids_by_lane = {}
+    for i in range(60):
+        centers = np.array([100.0, 300.0, 500.0, 700.0]) + i  # Everyone drifts right
+        order = rng.permutation(len(centers))
+        tracks = tracker.update(*people_frame(centers[order]), timestamp=i / FPS)
+        for track in tracks:
+            lane = int(round((track.box[0] + 40 - i - 100) / 200))
+            assert ids_by_lane.setdefault(lane, track.track_id) == track.track_id
+    assert sorted(ids_by_lane) == [0, 1, 2, 3]
+
+def test_low_confidence_detection_keeps_an_occluded_track():
+    tracker = PersonTracker(min_hits=1)
+    first = tracker.update(*people_frame([200.0]), timestamp=0.0)
+    weak = tracker.update(*people_frame([202.0], scores=[0.2]), timestamp=1 / FPS)
+    assert [t.track_id for t in weak] == [t.track_id for t in first]
+    # A weak detection with no track to explain it does not start a new one
+    assert tracker.update(*people_frame([600.0], scores=[0.2]), timestamp=2 / FPS) == []
+
+def test_pool_evicts_people_who_leave():
+    clock = ManualClock()
+    ended = {}
+    pool = ActivityTrackerPool(clock=clock, idle_timeout=2.0,
+                               on_session_end=lambda track_id, summary: ended.setdefault(track_id, summary))
+    tracker = PersonTracker(max_age=0.5)
+    for i in range(1, 200):
+        clock.set(i / FPS)
+        centers = [150.0, 450.0] if i < 60 else [150.0]  # The second person leaves after 2 s
+        pool.update(tracker.update(*people_frame(centers), timestamp=clock.now()), (480, 640, 3))
+
+    assert len(pool) == 1 and 1 in pool
+    assert list(ended) == [2]
+    assert ended[2]["duration"] == pytest.approx(57 / FPS)
+    assert 1 in pool.end_all() and len(pool) == 0
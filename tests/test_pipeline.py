@@ -0,0 +1,128 @@
+import time
+import cv2
+import numpy as np
+import pytest
+from core.keypoints import NUM_KEYPOINTS
+from core.pipeline import Pipeline
+from utils.startup import get_startup_profile
+
+class MarkerEngine:
+    """Stand-in for PoseEngine: fixed keypoints, and render paints a red corner."""
+
+    def detect(self, frame):
+        kpts = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
+        kpts[:, 2] = 0.9
+        return kpts, (1 << NUM_KEYPOINTS) - 1
+
+    def render(self, frame, kpts, in_place=True):
+        frame[:8, :8] = (0, 0, 255)
+        return frame
+
+class WarmingEngine(MarkerEngine):
+    def warm_up(self):
+        with get_startup_profile().phase("warm_up"):
+            time.sleep(0.01)
+
+@pytest.fixture
+def video_path(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30.0, (160, 120))
+    if not writer.isOpened():
+        pytest.skip("No MJPG encoder available")
+    for i in range(60):
+        writer.write(np.full((120, 160, 3), i * 4, dtype=np.uint8))
+    writer.release()
+    return path
+
+def test_frames_flow_through_all_stages_in_order(video_path):
+    pipeline = Pipeline(video_path, frame_size=(160, 120), num_workers=2,
+                        engine_factory=MarkerEngine, trace_frames=True).start()
+    try:
+        assert pipeline.wait_ready(timeout=30)
+        seqs = []
+        deadline = time.monotonic() + 20
+        while time.monotonic() < deadline and not pipeline.get_error():
+            ready = pipeline.take()
+            if ready is None:
+                time.sleep(0.005)
+                continue
+            with ready:
+                seqs.append(ready.seq)
+                # Rendered by the worker in shared memory, then converted to RGB
+                assert tuple(ready.frame[0, 0]) == (255, 0, 0)
+                assert len(ready.positions) == NUM_KEYPOINTS
+                stages = [stage for stage, _ in ready.trace.marks]
+                assert stages == ["capture", "queue", "inference", "metrics", "convert"]
+
+        assert seqs and seqs == sorted(set(seqs))
+        assert len(seqs) + pipeline.dropped_frames <= 60
+    finally:
+        pipeline.stop()
+
+
+def test_startup_phases_and_first_keypoint_are_reported(video_path):
+    pipeline = Pipeline(video_path, frame_size=(160, 120), engine_factory=WarmingEngine).start()
+    try:
+        assert pipeline.wait_ready(timeout=30)
+        deadline = time.monotonic() + 20
+        while pipeline.time_to_first_keypoint is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert 0 < pipeline.time_to_first_keypoint < 20
+        report = pipeline.startup_profile.report()
+        phases = {phase["name"]: phase for phase in report["phases"]}
+        # The worker warms its engine before it reports ready
+        warm_up = phases["inference[0].warm_up"]
+        assert warm_up["duration_s"] >= 0.01
+        assert warm_up["start_s"] + warm_up["duration_s"] <= report["marks"]["workers_ready"] + 1e-3
+        assert "inference[0].spawn" in phases and "camera_open" in phases
+        assert report["marks"]["workers_ready"] <= report["marks"]["first_keypoint"]
+    finally:
+        pipeline.stop()
+
+class CrashingEngine(MarkerEngine):
+    def detect(self, frame):
+        raise RuntimeError("CUDA out of memory")
+
+class BrokenEngine:
+    def __init__(self):
+        raise RuntimeError("weights not found")
+
+class FailingTracker:
+    def update_metrics(self, positions, frame_shape, timestamp=None):
+        raise ValueError("bad frame")
+
+def _wait_for_error(pipeline, timeout=20):
+    deadline = time.monotonic() + timeout
+    while pipeline.get_error() is None and time.monotonic() < deadline:
+        ready = pipeline.take()
+        if ready is not None:
+            ready.release()
+        time.sleep(0.01)
+    return pipeline.get_error()
+
+@pytest.mark.parametrize("engine_factory, tracker, message", [
+    (CrashingEngine, None, "Pose inference failed: CUDA out of memory"),
+    (BrokenEngine, None, "Pose inference failed: weights not found"),
+    (MarkerEngine, FailingTracker(), "Metrics update failed: bad frame"),
+])
+def test_stage_failures_are_reported(video_path, engine_factory, tracker, message):
+    pipeline = Pipeline(video_path, frame_size=(160, 120), engine_factory=engine_factory,
+                        activity_tracker=tracker).start()
+    try:
+        assert _wait_for_error(pipeline) == message
+    finally:
+        pipeline.stop()
+
+def test_stop_while_a_frame_is_still_held(video_path):
+    pipeline = Pipeline(video_path, frame_size=(160, 120), engine_factory=MarkerEngine).start()
+    ready = None
+    try:
+        assert pipeline.wait_ready(timeout=30)
+        deadline = time.monotonic() + 20
+        while ready is None and time.monotonic() < deadline:
+            ready = pipeline.take()
+            time.sleep(0.005)
+    finally:
+        pipeline.stop()
+    assert ready is not None and ready.frame.shape == (120, 160, 3)
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from core import pose_engine
+from core.keypoints import KEYPOINT_INDEX, NUM_KEYPOINTS
+from core.pose_engine import PoseEngine
+
+MAGENTA = (255, 0, 255)
+
+class FakeTensor:
+    """Just enough of a torch tensor for PoseEngine: .cpu().numpy() and indexing."""
+
+    def __init__(self, array):
+        self.array = np.asarray(array)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+    def __getitem__(self, index):
+        return FakeTensor(self.array[index])
+
+    def __len__(self):
+        return len(self.array)
+
+class FakeKeypoints:
+    def __init__(self, data):
+        self.data = FakeTensor(data)
+
+    def __len__(self):
+        return len(self.data)
+
+class FakeResults:
+    def __init__(self, people):
+        self.keypoints = FakeKeypoints(people)
+
+class StubYOLO:
+    """Stand-in for an ultralytics pose model: two people, the second more confident."""
+
+    def __init__(self):
+        self.calls = []
+        self.people = np.zeros((2, NUM_KEYPOINTS, 3), dtype=np.float64)
+        self.people[0, :, 2] = 0.25
+        self.people[1, :, 2] = 0.2
+        nose = KEYPOINT_INDEX["nose"]
+        self.people[1, nose] = (200.0, 100.0, 0.9)
+        self.people[1, KEYPOINT_INDEX["left_eye"]] = (210.0, 95.0, 0.8)
+
+    def __call__(self, source, **kwargs):
+        self.calls.append(kwargs)
+        if isinstance(source, list):
+            return [FakeResults(self.people) for _ in source]
+        return [FakeResults(self.people)]
+
+class StubBackend:
+    def __init__(self, model):
+        self.model = model
+
+    def load(self):
+        return self.model
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    model = StubYOLO()
+    monkeypatch.setattr(pose_engine, "create_backend", lambda *args, **kwargs: StubBackend(model))
+    monkeypatch.setattr(pose_engine, "setup_temp_dir", lambda: str(tmp_path))
+    return PoseEngine()
+
+def test_detect_returns_keypoint_array_without_drawing(engine):
+    frame = np.full((480, 640, 3), 40, dtype=np.uint8)
+    before = frame.copy()
+
+    kpts, mask = engine.detect(frame)
+
+    assert kpts.shape == (NUM_KEYPOINTS, 3) and kpts.dtype == np.float32
+    np.testing.assert_allclose(kpts[KEYPOINT_INDEX["nose"]], (200.0, 100.0, 0.9), rtol=1e-6)
+    assert mask == (1 << KEYPOINT_INDEX["nose"]) | (1 << KEYPOINT_INDEX["left_eye"])
+    np.testing.assert_array_equal(frame, before)
+    assert engine.model.calls == [{"imgsz": engine.imgsz}]
+    assert engine.keypoints_to_positions(kpts, mask)["nose"] == (200.0, 100.0)
+
+def test_render_draws_on_a_scaled_preview(engine):
+    frame = np.full((480, 640, 3), 40, dtype=np.uint8)
+    before = frame.copy()
+    kpts, _ = engine.detect(frame)
+
+    preview = engine.render(frame, kpts, preview_scale=0.5)
+
+    assert preview.shape == (240, 320, 3)
+    assert tuple(preview[50, 100]) == MAGENTA
+    np.testing.assert_array_equal(frame, before)
+    # The preview buffer is reused from frame to frame
+    assert engine.render(frame, kpts, preview_scale=0.5) is preview
+
+def test_render_in_place_or_on_a_copy(engine):
+    frame = np.full((480, 640, 3), 40, dtype=np.uint8)
+    kpts, _ = engine.detect(frame)
+
+    copy = engine.render(frame, kpts, in_place=False)
+    assert copy is not frame and tuple(copy[100, 200]) == MAGENTA
+    assert tuple(frame[100, 200]) == (40, 40, 40)
+
+    assert engine.render(frame, kpts) is frame
+    assert tuple(frame[100, 200]) == MAGENTA
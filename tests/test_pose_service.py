@@ -0,0 +1,139 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from core.keypoints import NUM_KEYPOINTS
+from services import pose_service
+from services.inference_pool import InferencePool
+from services.pose_service import PoseService
+from services.server import create_app
+from services.session_store import SessionStore
+
+class FakeLease:
+    def __init__(self, frame):
+        self.frame = frame
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+class FakeCapture:
+    """Stand-in for VideoCapture: delivers `frames` frames, then fails like a dropped camera."""
+
+    frames = 3
+    instances = []
+
+    def __init__(self, source):
+        self.delivered = 0
+        self.error = None
+        self.released = False
+        self.leases = []
+        FakeCapture.instances.append(self)
+
+    def start(self):
+        return self
+
+    def borrow(self, timeout=0):
+        if self.delivered >= FakeCapture.frames:
+            self.error = "Camera disconnected or not providing frames"
+            return None
+        self.delivered += 1
+        lease = FakeLease(np.full((120, 160, 3), self.delivered, dtype=np.uint8))
+        self.leases.append(lease)
+        return lease
+
+    def is_opened(self):
+        return self.error is None
+
+    def get_error(self):
+        return self.error
+
+    def release(self):
+        self.released = True
+
+class StandingEngine:
+    def detect(self, frame):
+        kpts = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
+        kpts[:, 0] = np.linspace(60, 100, NUM_KEYPOINTS)
+        kpts[:, 1] = np.linspace(10, 110, NUM_KEYPOINTS)
+        kpts[:, 2] = 0.9
+        return kpts, (1 << NUM_KEYPOINTS) - 1
+
+class FailingEngine:
+    def detect(self, frame):
+        raise RuntimeError("CUDA out of memory")
+
+@pytest.fixture
+def fake_capture(monkeypatch):
+    FakeCapture.instances = []
+    monkeypatch.setattr(pose_service, "VideoCapture", FakeCapture)
+    return FakeCapture
+
+async def _run_until_stopped(service):
+    subscription = service.broadcaster.subscribe()
+    await service.start()
+    updates = [update async for update in subscription]
+    # The failed session shuts itself down in the background
+    await asyncio.wait_for(service._stopping, timeout=5)
+    return updates, subscription
+
+def test_inference_error_ends_session_and_subscriptions(fake_capture):
+    fake_capture.frames = 100
+    service = PoseService(inference=InferencePool(FailingEngine, warm_up_shape=None))
+
+    async def scenario():
+        try:
+            return await _run_until_stopped(service)
+        finally:
+            service.inference.shutdown()
+    updates, subscription = asyncio.run(scenario())
+
+    assert updates == []
+    assert subscription.closed_reason == service.error == "Pose inference failed: CUDA out of memory"
+    assert not service.processing and service.video_capture is None
+    assert fake_capture.instances[0].released
+    assert all(lease.released for lease in fake_capture.instances[0].leases)
+    assert service.activity_tracker.current_session is None
+    assert service.stats()["error"] == service.error
+
+def test_camera_failure_ends_session_after_delivered_frames(fake_capture):
+    fake_capture.frames = 3
+    service = PoseService(inference=InferencePool(StandingEngine, warm_up_shape=None))
+
+    async def scenario():
+        try:
+            updates, subscription = await _run_until_stopped(service)
+            # The next viewer starts a fresh session on a new capture
+            fake_capture.frames = 1
+            again, _ = await _run_until_stopped(service)
+            return updates, subscription, again
+        finally:
+            service.inference.shutdown()
+    updates, subscription, again = asyncio.run(scenario())
+
+    assert 1 <= len(updates) <= 3
+    assert subscription.closed_reason == "Camera disconnected or not providing frames"
+    assert not service.processing and all(capture.released for capture in fake_capture.instances)
+    assert len(fake_capture.instances) == 2 and len(again) <= 1
+    # Every borrowed frame went back to the ring, processed or dropped
+    assert all(lease.released for capture in fake_capture.instances for lease in capture.leases)
+
+def test_websocket_viewers_are_closed_with_internal_error(fake_capture, tmp_path):
+    fake_capture.frames = 100
+    inference = InferencePool(FailingEngine, warm_up_shape=None)
+    with SessionStore(str(tmp_path / "data")) as store:
+        with TestClient(create_app(inference=inference, cameras=[0], store=store)) as client:
+            with client.websocket_connect("/ws/pose/0") as websocket:
+                with pytest.raises(WebSocketDisconnect) as closed:
+                    websocket.receive_json()
+            assert closed.value.code == 1011
+            assert "CUDA out of memory" in closed.value.reason
+            assert client.get("/metrics").json()["cameras"]["0"]["error"].startswith("Pose inference failed")
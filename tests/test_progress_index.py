@@ -0,0 +1,52 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from services.progress_index import ProgressIndex, bucket_start
+
+def _session(speed, distance=1000.0):
+    return {"duration": 1800.0, "total_distance": distance,
+            "average_metrics": {"avg_speed": speed, "avg_cadence": 160.0}}
+
+@pytest.fixture
+def history():
+    rng = np.random.default_rng(5)
+    start = datetime(2023, 1, 1, 7, 30)
+    days = np.sort(rng.integers(0, 700, size=900))
+    speeds = 2.0 + days / 700.0 + rng.normal(0, 0.1, size=len(days))
+    sessions = [(start + timedelta(days=int(d), minutes=i), float(s)) for i, (d, s) in enumerate(zip(days, speeds))]
+    index = ProgressIndex()
+    for when, speed in sessions:
+        index.add("alice", _session(speed), when)
+    index.add("bob", _session(9.0), start)
+    return index, sessions
+
+def test_range_queries_match_a_full_scan(history):
+    index, sessions = history
+    for first, last in [(date(2023, 1, 1), date(2024, 12, 31)), (date(2023, 3, 17), date(2023, 6, 2)),
+                        (date(2023, 2, 27), date(2023, 3, 5)), (date(2024, 2, 29), date(2024, 2, 29))]:
+        speeds = [s for when, s in sessions if first <= when.date() <= last]
+        rollup = index.query("alice", first, last)
+
+        assert rollup.count == len(speeds)
+        assert rollup.total_distance == pytest.approx(1000.0 * len(speeds))
+        if len(speeds) >= 2:
+            assert rollup.speed_trend == pytest.approx(np.polyfit(range(len(speeds)), speeds, 1)[0])
+            assert rollup.improvement_rate == pytest.approx((speeds[-1] - speeds[0]) / speeds[0] * 100)
+
+def test_range_is_covered_by_few_buckets():
+    cover = list(ProgressIndex._cover(date(2023, 1, 1), date(2024, 12, 31)))
+    assert len(cover) == 24
+    cover = list(ProgressIndex._cover(date(2023, 3, 17), date(2023, 6, 2)))
+    days = sum(1 for granularity, _ in cover if granularity == "day")
+    assert [g for g, _ in cover].count("month") == 2 and days <= 12
+
+def test_series_and_recent(history):
+    index, sessions = history
+    months = list(index.series("alice", "month", date(2023, 1, 15), date(2023, 12, 31)))
+    assert [start.month for start, _ in months] == list(range(1, 13))
+    assert sum(r.count for _, r in months) == sum(1 for when, _ in sessions if when.year == 2023)
+    assert bucket_start(date(2023, 3, 17), "week") == date(2023, 3, 13)
+
+    assert [speed for speed, _ in index.recent("alice", 3)] == [s for _, s in sessions[-3:]]
+    assert index.session_count("bob") == 1 and index.query("carol", date.min, date.max).count == 0
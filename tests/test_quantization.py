@@ -0,0 +1,37 @@
+import numpy as np
+from core.keypoints import validity_mask
+from core.quantization import check_regression, keypoint_errors
+
+def _person():
+    kpts = np.zeros((17, 3), dtype=np.float32)
+    kpts[:, 0] = np.linspace(100, 200, 17)
+    kpts[:, 1] = np.linspace(100, 400, 17)
+    kpts[:, 2] = 0.9
+    return kpts
+
+def test_keypoint_errors_identical_predictions():
+    """Identical keypoints score perfectly."""
+    kpts = _person()
+    mask = validity_mask(kpts, 0.5)
+    errors = keypoint_errors(kpts, mask, kpts.copy(), mask)
+    assert errors["pck"] == 1.0
+    assert abs(errors["oks"] - 1.0) < 1e-9
+    assert errors["pixel_error"] == 0.0
+
+def test_keypoint_errors_penalize_missing_and_shifted_keypoints():
+    """Dropped or displaced keypoints lower PCK and OKS."""
+    reference = _person()
+    candidate = reference.copy()
+    candidate[:5, 2] = 0.1  # Quantized model lost the face keypoints
+    candidate[10:, 0] += 60  # ... and the legs drifted sideways
+
+    errors = keypoint_errors(reference, validity_mask(reference, 0.5),
+                             candidate, validity_mask(candidate, 0.5))
+    assert errors["pck"] < 0.5
+    assert errors["oks"] < 0.5
+
+def test_check_regression_flags_step_drift():
+    report = {"oks": 0.95, "pck": 0.97, "step_drift": 0.1, "cadence_drift": 0.0}
+    failures = check_regression(report)
+    assert len(failures) == 1
+    assert "step drift" in failures[0]
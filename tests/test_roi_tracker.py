@@ -0,0 +1,39 @@
+from core.roi_tracker import AdaptiveImageSize, RoiTracker, crop_image_size
+
+def test_roi_tracker_crops_around_confident_person():
+    """A confidently tracked person yields an expanded crop inside the frame."""
+    tracker = RoiTracker(margin=0.25, full_frame_interval=3)
+    assert tracker.next_region((720, 1280, 3)) is None
+
+    tracker.update(None, (600, 200, 700, 600), box_confidence=0.9, valid_keypoints=15)
+    region = tracker.next_region((720, 1280, 3))
+    assert region == (575, 100, 725, 700)
+
+def test_roi_tracker_falls_back_to_full_frame():
+    """Losing the person, or the periodic schedule, forces a full-frame search."""
+    tracker = RoiTracker(full_frame_interval=2)
+    box = (600, 200, 700, 600)
+    tracker.update(None, box, 0.9, 15)
+    region = tracker.next_region((720, 1280, 3))
+    tracker.update(region, box, 0.9, 15)
+    region = tracker.next_region((720, 1280, 3))
+    tracker.update(region, box, 0.9, 15)
+    assert tracker.next_region((720, 1280, 3)) is None
+
+    tracker.update(None, box, 0.9, 15)
+    tracker.update(tracker.next_region((720, 1280, 3)), None, 0.0, 0)
+    assert tracker.next_region((720, 1280, 3)) is None
+
+def test_adaptive_image_size_tracks_budget():
+    controller = AdaptiveImageSize(latency_budget_ms=50, sizes=(320, 480, 640), window=3)
+    for _ in range(3):
+        controller.record(80)
+    assert controller.imgsz == 480
+    for _ in range(3):
+        controller.record(10)
+    assert controller.imgsz == 640
+
+def test_crop_image_size_rounds_to_stride():
+    assert crop_image_size((0, 0, 150, 600), max_imgsz=640) == 608
+    assert crop_image_size((0, 0, 100, 90), max_imgsz=640) == 128
+    assert crop_image_size((0, 0, 1000, 900), max_imgsz=416) == 416
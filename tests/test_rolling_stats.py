@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from core.rolling_stats import RunningStats
+
+def test_matches_numpy_over_the_stream():
+    values = np.random.default_rng(3).normal(2.5, 0.4, size=5000) + 1e6
+    stats = RunningStats()
+    for value in values:
+        stats.update(value)
+
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance == pytest.approx(values.var(ddof=1), rel=1e-6)
+    assert (stats.min, stats.max) == (values.min(), values.max())
+
+def test_empty_and_reset():
+    stats = RunningStats()
+    assert stats.as_dict() == {"count": 0, "mean": 0.0, "std": 0.0, "min": 0.0, "max": 0.0}
+    stats.update(4.0)
+    assert stats.variance == 0.0
+    stats.reset()
+    assert stats.count == 0 and stats.max == -np.inf
@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from core.keypoints import NUM_KEYPOINTS
+from services.inference_pool import InferencePool
+from services.server import create_app
+from services.session_store import SessionStore
+from services.wire_format import BinaryDecoder
+
+class RunnerEngine:
+    """Stand-in for PoseEngine: a full skeleton that bobs up and down."""
+
+    loaded = 0
+
+    def __init__(self):
+        RunnerEngine.loaded += 1
+        self.calls = 0
+
+    def detect(self, frame):
+        self.calls += 1
+        kpts = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
+        kpts[:, 0] = np.linspace(60, 100, NUM_KEYPOINTS)
+        kpts[:, 1] = np.linspace(10, 110, NUM_KEYPOINTS) + 5 * np.sin(self.calls / 3.0)
+        kpts[:, 2] = 0.9
+        return kpts, (1 << NUM_KEYPOINTS) - 1
+
+@pytest.fixture
+def video_path(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30.0, (160, 120))
+    if not writer.isOpened():
+        pytest.skip("No MJPG encoder available")
+    for i in range(300):
+        writer.write(np.full((120, 160, 3), i % 200, dtype=np.uint8))
+    writer.release()
+    return path
+
+@pytest.fixture
+def client(tmp_path, video_path):
+    RunnerEngine.loaded = 0
+    inference = InferencePool(RunnerEngine, workers=2, warm_up_shape=(120, 160, 3))
+    with SessionStore(str(tmp_path / "data")) as store:
+        app = create_app(inference=inference, cameras=[video_path], store=store)
+        with TestClient(app) as client:
+            yield client
+
+def test_models_are_warmed_once_at_startup(client):
+    assert RunnerEngine.loaded == 2
+    health = client.get("/health").json()
+    assert health["status"] == "ok" and health["inference_workers"] == 2
+
+def test_binary_pose_stream(client):
+    decoder = BinaryDecoder()
+    with client.websocket_connect("/ws/pose/0?format=binary") as websocket:
+        first = decoder.decode(websocket.receive_bytes())
+        second = decoder.decode(websocket.receive_bytes())
+    assert first["keypoints"].shape == (NUM_KEYPOINTS, 3)
+    assert second["seq"] > first["seq"]
+
+    metrics = client.get("/metrics").json()
+    assert metrics["cameras"]["0"]["frames"] >= 2
+    assert "inference" in metrics["latency_ms"]
+    assert {"ready", "first_keypoint"} <= set(metrics["startup"]["marks"])
+
+def test_rest_session_lifecycle(client):
+    assert client.post("/sessions/0/stop").status_code == 409
+    assert client.post("/sessions/0/start").json()["processing"]
+    assert client.get("/sessions/0/summary").status_code == 200
+
+    summary = client.post("/sessions/0/stop").json()
+    assert {"duration", "steps_count", "average_metrics"} <= set(summary)
+    assert client.get("/sessions/0/summary").status_code == 404
+    assert client.post("/sessions/7/start").status_code == 404
@@ -0,0 +1,97 @@
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from services.analytics_service import AnalyticsService
+from services.session_store import SessionStore
+
+def _summary(speed, distance=100.0, duration=60.0):
+    return {
+        "duration": duration,
+        "total_distance": distance,
+        "calories_burned": 5.0,
+        "steps_count": 80,
+        "max_speed": speed * 1.5,
+        "average_metrics": {"avg_speed": speed, "avg_cadence": 165.0,
+                            "avg_stride_length": 1.1, "avg_vertical_oscillation": 0.08},
+    }
+
+def test_sessions_and_frames_survive_reopening(tmp_path):
+    with SessionStore(str(tmp_path)) as store:
+        session_id = store.begin_session("alice", started_at=1000.0)
+        for i in range(300):
+            store.append_frame(session_id, {"time_s": i / 30.0, "speed": 2.0 + i, "steps_count": i})
+        store.end_session(session_id, _summary(2.5))
+        store.save_session(_summary(3.0), "bob", started_at=2000.0)
+
+    with SessionStore(str(tmp_path)) as store:
+        (alice,) = store.iter_sessions(user_id="alice")
+        assert alice["session_id"] == session_id
+        assert alice["frames"] == 300
+        assert alice["average_metrics"]["avg_speed"] == pytest.approx(2.5)
+
+        frames = store.load_frames(session_id, ["time_s", "speed", "steps_count"])
+        assert len(frames["speed"]) == 300
+        assert frames["speed"][-1] == pytest.approx(301.0)
+        assert frames["steps_count"].dtype == np.int32
+        assert frames["time_s"][30] == pytest.approx(1.0)
+        assert frames["speed"].dtype == np.float32
+
+def test_range_queries_stream_in_start_order(tmp_path):
+    with SessionStore(str(tmp_path), batch_size=7) as store:
+        for day in range(50):
+            store.save_session(_summary(float(day)), "alice", started_at=day * 86400.0)
+        store.save_session(_summary(99.0), "bob", started_at=10 * 86400.0)
+
+        window = list(store.iter_sessions("alice", since=10 * 86400.0, until=20 * 86400.0, batch_size=3))
+        assert [s["average_metrics"]["avg_speed"] for s in window] == [float(d) for d in range(10, 20)]
+
+        latest = list(store.iter_sessions("alice", newest_first=True, limit=2))
+        assert [s["average_metrics"]["avg_speed"] for s in latest] == [49.0, 48.0]
+
+def test_analytics_reads_history_from_the_store(tmp_path):
+    with SessionStore(str(tmp_path)) as store:
+        analytics = AnalyticsService(store=store, user_id="alice")
+        in_memory = AnalyticsService()
+        for speed in (2.0, 2.4, 2.8, 3.3, 3.4, 3.5):
+            analytics.add_workout_session(_summary(speed))
+            in_memory.add_workout_session(_summary(speed))
+            time.sleep(0.002)
+
+        assert analytics.workout_history == []
+        assert analytics.get_performance_level() == "intermediate"
+        stored, expected = analytics.get_progress_metrics(), in_memory.get_progress_metrics()
+        assert stored["sessions_count"] == 6
+        assert stored["avg_speed_trend"] == pytest.approx(np.polyfit(range(6), [2.0, 2.4, 2.8, 3.3, 3.4, 3.5], 1)[0])
+        for key in ("avg_speed_trend", "total_distance", "total_duration", "improvement_rate"):
+            assert stored[key] == pytest.approx(expected[key])
+
+def test_sessions_keep_their_day_after_a_restart(tmp_path):
+    now = datetime.now()
+    # Began before midnight, ended after it
+    started = datetime.combine(now.date(), datetime.min.time()) - timedelta(minutes=5)
+    with SessionStore(str(tmp_path)) as store:
+        live = AnalyticsService(store=store, user_id="alice")
+        session_id = store.begin_session("alice", started_at=started.timestamp())
+        live.add_workout_session(_summary(2.5, duration=(now - started).total_seconds()), session_id)
+        live.add_workout_session(_summary(3.0, duration=0.0))
+        today = live.get_progress_metrics(days=0, now=now)
+
+    with SessionStore(str(tmp_path)) as store:
+        restarted = AnalyticsService(store=store, user_id="alice")
+        assert restarted.get_progress_metrics(days=0, now=now) == today
+    assert today["sessions_count"] == 1
+
+def test_reads_flush_without_waiting_out_the_interval(tmp_path):
+    with SessionStore(str(tmp_path), flush_interval=30.0) as store:
+        session_id = store.begin_session("alice")
+        store.append_frame(session_id, {"speed": 2.0})
+        time.sleep(0.05)  # The writer is now gathering a batch
+
+        started = time.perf_counter()
+        (session,) = store.iter_sessions(user_id="alice")
+        store.end_session(session_id, _summary(2.0))
+        frames = store.load_frames(session_id, ["speed"])
+        assert time.perf_counter() - started < 5.0
+        assert session["session_id"] == session_id and len(frames["speed"]) == 1
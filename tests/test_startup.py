@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+
+from core.inference_backends import TorchBackend
+from utils.startup import StartupProfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_profile_reports_phases_in_start_order_from_origin():
+    profile = StartupProfile(origin=100.0)
+    profile.record("warm_up", 102.5, 0.25)
+    profile.record("model_load", 100.5, 2.0)
+    assert profile.mark("first_keypoint", 103.0)
+    assert not profile.mark("first_keypoint", 104.0)
+
+    report = profile.report()
+    assert [phase["name"] for phase in report["phases"]] == ["model_load", "warm_up"]
+    assert report["phases"][0] == {"name": "model_load", "start_s": 0.5, "duration_s": 2.0}
+    assert report["marks"] == {"first_keypoint": 3.0}
+    assert profile.elapsed("first_keypoint") == 3.0
+    assert "warm_up" in profile.format()
+
+def test_phase_context_manager_records_on_error(tmp_path):
+    profile = StartupProfile()
+    try:
+        with profile.phase("model_load"):
+            raise RuntimeError("no weights")
+    except RuntimeError:
+        pass
+    assert [name for name, _, _ in profile.phases] == ["model_load"]
+
+    path = str(tmp_path / "startup.json")
+    profile.dump(path)
+    with open(path) as f:
+        assert json.load(f)["phases"][0]["name"] == "model_load"
+
+def test_pose_engine_import_is_light_and_leaves_tempdir_alone():
+    script = ("import os, sys, tempfile\n"
+              "before = (os.environ.get('TMPDIR'), tempfile.gettempdir())\n"
+              "from core.pose_engine import setup_temp_dir\n"
+              "setup_temp_dir()\n"
+              "assert (os.environ.get('TMPDIR'), tempfile.gettempdir()) == before\n"
+              "assert 'supervision' not in sys.modules and 'ultralytics' not in sys.modules\n")
+    subprocess.run([sys.executable, "-c", script], cwd=ROOT, check=True)
+
+def test_torch_backend_reuses_fused_checkpoint_until_weights_change(tmp_path):
+    weights = tmp_path / "yolov8n-pose.pt"
+    weights.write_bytes(b"weights")
+    backend = TorchBackend(weights=str(weights), cache_dir=str(tmp_path / "cache"))
+    os.makedirs(backend.cache_dir)
+    assert backend.model_path() == str(tmp_path / "cache" / "yolov8n-pose-fused.pt")
+    assert not backend.is_cached()
+
+    with open(backend.model_path(), "wb") as f:
+        f.write(b"fused")
+    assert backend.is_cached()
+    assert backend.prepare() == backend.model_path()
+
+    later = os.path.getmtime(backend.model_path()) + 10
+    os.utime(weights, (later, later))
+    assert not backend.is_cached()
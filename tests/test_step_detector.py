@@ -0,0 +1,50 @@
+import math
+import numpy as np
+import pytest
+from core.keypoints import KEYPOINT_INDEX, NUM_KEYPOINTS
+from core.step_detector import StepDetector
+
+def ankle_frames(step_hz, seconds=10.0, fps=30.0, noise=0.0, seed=0):
+    """Ankles alternately striking the belt; each foot bottoms out once per stride."""
+    rng = np.random.default_rng(seed)
+    for i in range(int(seconds * fps)):
+        phase = math.pi * step_hz * i / fps
+        positions = np.zeros((NUM_KEYPOINTS, 2), dtype=np.float32)
+        positions[KEYPOINT_INDEX["left_ankle"], 1] = 400 + 20 * max(0.0, math.sin(phase)) + rng.normal(0, noise)
+        positions[KEYPOINT_INDEX["right_ankle"], 1] = 400 + 20 * max(0.0, -math.sin(phase)) + rng.normal(0, noise)
+        valid = np.zeros(NUM_KEYPOINTS, dtype=bool)
+        valid[[KEYPOINT_INDEX["left_ankle"], KEYPOINT_INDEX["right_ankle"]]] = True
+        yield positions, valid, i / fps
+
+def count_steps(detector, frames):
+    return [step for step in (detector.update(*frame) for frame in frames) if step is not None]
+
+@pytest.mark.parametrize("step_hz", [2.5, 3.0])
+def test_counts_one_step_per_foot_strike(step_hz):
+    steps = count_steps(StepDetector(), ankle_frames(step_hz, noise=0.5))
+    assert abs(len(steps) - step_hz * 10) <= 2
+    assert all(source == "ankle" for _, source in steps)
+    intervals = np.diff([t for t, _ in steps])
+    assert intervals.min() >= 0.25
+
+def test_standing_still_reports_no_steps():
+    frames = ((p, v, t) for p, v, t in ankle_frames(0.0, noise=1.0))
+    assert count_steps(StepDetector(), frames) == []
+
+def test_refractory_period_is_in_seconds():
+    # Strikes every 0.2 s are faster than the 0.35 s refractory period allows
+    steps = count_steps(StepDetector(refractory=0.35), ankle_frames(5.0, seconds=4.0))
+    assert len(steps) <= 4.0 / 0.35 + 1
+
+def first_step_frame(detector, frames):
+    for i, frame in enumerate(frames):
+        if detector.update(*frame) is not None:
+            return i
+    return None
+
+def test_peak_right_after_warmup_counts():
+    # A channel followed for exactly `warmup` frames may report the next peak
+    frame = first_step_frame(StepDetector(warmup=0), ankle_frames(2.5))
+    assert frame is not None and frame > 0
+    assert first_step_frame(StepDetector(warmup=frame), ankle_frames(2.5)) == frame
+    assert first_step_frame(StepDetector(warmup=frame + 1), ankle_frames(2.5)) > frame
@@ -0,0 +1,44 @@
+import numpy as np
+from core.keypoints import NUM_KEYPOINTS
+from services.broadcaster import encode_json
+from services.wire_format import BinaryDecoder, BinaryEncoder
+
+def update(seq, kpts):
+    return {"seq": seq, "keypoints": kpts, "metrics": {"speed": 2.5, "cadence": 170.0},
+            "steps_count": seq // 10, "total_distance": 12.5, "stability": 0.8,
+            "movement_type": "running", "feedback": {"cadence": "Try taking quicker steps"}}
+
+def keypoints(offset=0.0):
+    kpts = np.zeros((NUM_KEYPOINTS, 3), dtype=np.float32)
+    kpts[:, 0] = np.linspace(100, 300, NUM_KEYPOINTS)
+    kpts[:, 1] = np.linspace(50, 450, NUM_KEYPOINTS)
+    kpts[:, 2] = 0.9
+    kpts[15:, 1] += offset  # Only the ankles move
+    return kpts
+
+def test_round_trip_with_delta_frames():
+    encoder, decoder = BinaryEncoder(keyframe_interval=10), BinaryDecoder()
+    keyframe = encoder(update(1, keypoints()))
+    delta = encoder(update(2, keypoints(offset=8.0)))
+    assert len(delta) == len(keyframe) - (NUM_KEYPOINTS - 2) * 6
+
+    decoder.decode(keyframe)
+    decoded = decoder.decode(delta)
+    np.testing.assert_allclose(decoded["keypoints"], keypoints(offset=8.0), atol=0.25)
+    assert decoded["seq"] == 2 and decoded["steps_count"] == 0
+    assert decoded["metrics"]["cadence"] == 170.0 and decoded["metrics"]["total_distance"] == 12.5
+    assert decoded["movement_type"] == "running"
+    assert decoded["feedback"] == {"cadence": "Try taking quicker steps"}
+
+def test_delta_without_its_keyframe_is_skipped_until_next_keyframe():
+    encoder, decoder = BinaryEncoder(keyframe_interval=3), BinaryDecoder()
+    payloads = [encoder(update(seq, keypoints(offset=seq))) for seq in range(1, 6)]
+    # Joined after the first keyframe: deltas are unusable until the next one
+    assert decoder.decode(payloads[1]) is None
+    assert decoder.decode(payloads[3])["seq"] == 4
+    assert decoder.decode(payloads[4])["seq"] == 5
+
+def test_binary_is_much_smaller_than_json():
+    encoder = BinaryEncoder()
+    binary = encoder(update(1, keypoints()))
+    assert len(binary) * 4 < len(encode_json(update(1, keypoints())))
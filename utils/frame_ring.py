@@ -0,0 +1,113 @@
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class FrameLease:
+    """
+    A borrowed ring slot. The frame stays valid until release() is called;
+    use it as a context manager to release automatically.
+    """
+
+    __slots__ = ("ring", "index", "frame", "seq", "trace", "_released")
+
+    def __init__(self, ring: "FrameRing", index: int, seq: int, trace=None):
+        self.ring = ring
+        self.index = index
+        self.frame = ring.buffers[index]
+        self.seq = seq
+        self.trace = trace
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.ring.release(self.index)
+
+    def __enter__(self) -> "FrameLease":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class FrameRing:
+    """
+    Preallocated ring of frame buffers shared by one writer and any number of readers.
+
+    The writer fills a free slot in place and publishes it as the latest frame.
+    Readers borrow the latest frame and wake on a condition variable instead of
+    polling. Frames nobody borrowed before the next publish are simply reused:
+    the latest frame always wins.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], num_slots: int = 4, dtype=np.uint8):
+        if num_slots < 3:
+            raise ValueError("num_slots must be at least 3 (writing, latest and one borrowed slot)")
+
+        self.shape = tuple(shape)
+        self.buffers: List[np.ndarray] = [np.empty(shape, dtype=dtype) for _ in range(num_slots)]
+        self._borrowed = [0] * num_slots
+        self._traces: List = [None] * num_slots
+        self._writing: Optional[int] = None
+        self._latest: Optional[int] = None
+        self._seq = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.dropped_frames = 0
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the latest published frame (0 before the first)"""
+        return self._seq
+
+    def acquire_write(self) -> Optional[int]:
+        """Reserve a free slot for the writer, or None if readers hold every slot"""
+        with self._cond:
+            for index in range(len(self.buffers)):
+                if index != self._latest and self._borrowed[index] == 0:
+                    self._writing = index
+                    return index
+            self.dropped_frames += 1
+            return None
+
+    def publish(self, index: int, trace=None):
+        """Make a filled slot the latest frame and wake waiting readers"""
+        with self._cond:
+            self._traces[index] = trace
+            self._writing = None
+            self._latest = index
+            self._seq += 1
+            self._cond.notify_all()
+
+    def borrow(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[FrameLease]:
+        """
+        Borrow the latest frame once one newer than ``after_seq`` is published.
+
+        Args:
+            after_seq: Sequence number of the last frame the caller has seen
+            timeout: Seconds to wait; 0 returns immediately, None waits forever
+
+        Returns:
+            FrameLease: The borrowed frame, or None on timeout or close
+        """
+        with self._cond:
+            if timeout is None or timeout > 0:
+                self._cond.wait_for(lambda: self._closed or self._seq > after_seq, timeout)
+            if self._closed or self._seq <= after_seq or self._latest is None:
+                return None
+            index = self._latest
+            self._borrowed[index] += 1
+            return FrameLease(self, index, self._seq, self._traces[index])
+
+    def release(self, index: int):
+        with self._cond:
+            if self._borrowed[index] > 0:
+                self._borrowed[index] -= 1
+
+    def close(self):
+        """Wake every waiting reader; later borrows return None"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
@@ -0,0 +1,137 @@
+import json
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import cv2
+import numpy as np
+
+# Pipeline stages in the order a frame passes through them
+STAGES = ("capture", "queue", "inference", "metrics", "convert", "display")
+
+# Log-scale histogram: 8 buckets per doubling (~9% resolution) from 1 us up to ~2 minutes
+_BUCKETS_PER_OCTAVE = 8
+_NUM_BUCKETS = 27 * _BUCKETS_PER_OCTAVE
+
+
+class FrameTrace:
+    """
+    Per-frame timestamps, stamped as the frame moves through the pipeline.
+
+    The trace starts when the capture thread gets the frame back from the
+    camera; each ``mark(stage)`` records the time that stage finished.
+    """
+
+    __slots__ = ("start_ns", "marks")
+
+    def __init__(self, start_ns: Optional[int] = None):
+        self.start_ns = start_ns if start_ns is not None else time.perf_counter_ns()
+        self.marks: List = []
+
+    def mark(self, stage: str):
+        self.marks.append((stage, time.perf_counter_ns()))
+
+    def durations_ms(self) -> Dict[str, float]:
+        """Time spent in each marked stage, plus the end-to-end total"""
+        durations = {}
+        previous = self.start_ns
+        for stage, timestamp in self.marks:
+            durations[stage] = (timestamp - previous) / 1e6
+            previous = timestamp
+        if self.marks:
+            durations["total"] = (self.marks[-1][1] - self.start_ns) / 1e6
+        return durations
+
+
+class LatencyHistogram:
+    """Fixed-size log-bucketed histogram; recording is O(1) and allocation free"""
+
+    def __init__(self):
+        self.counts = np.zeros(_NUM_BUCKETS, dtype=np.int64)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, duration_ms: float):
+        micros = max(duration_ms * 1000.0, 1.0)
+        bucket = min(_NUM_BUCKETS - 1, int(math.log2(micros) * _BUCKETS_PER_OCTAVE))
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def percentile(self, q: float) -> float:
+        """Approximate q-th percentile in milliseconds (geometric bucket midpoint)"""
+        if self.count == 0:
+            return 0.0
+        rank = q / 100.0 * self.count
+        bucket = int(np.searchsorted(np.cumsum(self.counts), max(rank, 1)))
+        midpoint = 2 ** ((bucket + 0.5) / _BUCKETS_PER_OCTAVE) / 1000.0
+        return min(midpoint, self.max_ms)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total_ms / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max_ms,
+        }
+
+
+class LatencyRecorder:
+    """Rolls per-frame traces up into per-stage latency histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def record(self, stage: str, duration_ms: float):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram()
+            histogram.record(duration_ms)
+
+    def record_trace(self, trace: FrameTrace):
+        for stage, duration_ms in trace.durations_ms().items():
+            self.record(stage, duration_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage count, mean, p50/p95/p99 and max latency in milliseconds"""
+        with self._lock:
+            stages = [s for s in STAGES if s in self.histograms]
+            stages += [s for s in self.histograms if s not in STAGES]
+            return {stage: self.histograms[stage].summary() for stage in stages}
+
+    def dump(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def draw_overlay(self, frame: np.ndarray, stages: Optional[Iterable[str]] = None,
+                     origin=(10, 60)) -> np.ndarray:
+        """Draw a p50/p95/p99 table onto a BGR frame in place"""
+        snapshot = self.snapshot()
+        x, y = origin
+        for stage in (stages or snapshot.keys()):
+            stats = snapshot.get(stage)
+            if stats is None:
+                continue
+            text = f"{stage:<9} p50 {stats['p50']:6.1f}  p95 {stats['p95']:6.1f}  p99 {stats['p99']:6.1f} ms"
+            cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_PLAIN, 1.0, (0, 255, 255), 1)
+            y += 16
+        return frame
+
+
+_default_recorder = LatencyRecorder()
+
+
+def get_latency_recorder() -> LatencyRecorder:
+    """Process-wide recorder shared by the capture, inference and UI stages"""
+    return _default_recorder
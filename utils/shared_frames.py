@@ -0,0 +1,51 @@
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class SharedFrameBuffer:
+    """
+    Fixed set of frame slots in one shared memory block.
+
+    The creating process owns the block and unlinks it; other processes attach
+    by name through ``spec`` and see the same pixels without copying. Which
+    process may touch which slot is decided by the caller, typically by
+    passing slot indices through queues.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], num_slots: int, name: Optional[str] = None):
+        """
+        Args:
+            shape: Shape of one frame, e.g. (height, width, 3)
+            num_slots: Number of frames in the block
+            name: Existing block to attach to; None creates a new one
+        """
+        self.shape = tuple(shape)
+        self.num_slots = num_slots
+        self.owner = name is None
+        nbytes = num_slots * int(np.prod(self.shape))
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=nbytes if self.owner else 0)
+        self.frames = np.ndarray((num_slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def spec(self) -> Tuple[str, Tuple[int, ...], int]:
+        """Picklable description another process passes to attach()"""
+        return self.shm.name, self.shape, self.num_slots
+
+    @classmethod
+    def attach(cls, spec: Tuple[str, Tuple[int, ...], int]) -> "SharedFrameBuffer":
+        name, shape, num_slots = spec
+        return cls(shape, num_slots, name=name)
+
+    def close(self):
+        """Detach this process; the owner also frees the block"""
+        # The array view must go before the mapping can be closed
+        self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # Someone still holds a view of a frame; the mapping goes with it
+            pass
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Reference point for every offset; import this module as early as possible
+PROCESS_START = time.perf_counter()
+
+
+class StartupProfile:
+    """
+    Cold-start timeline: how long each startup phase took and when it ran.
+
+    Times are time.perf_counter() values, which share one clock across the
+    processes on a machine, so phases measured in worker processes can be
+    recorded here as well.
+    """
+
+    def __init__(self, origin: Optional[float] = None):
+        self.origin = PROCESS_START if origin is None else origin
+        self._lock = threading.Lock()
+        self.phases: List[Tuple[str, float, float]] = []  # (name, start, duration)
+        self.marks: Dict[str, float] = {}
+
+    def record(self, name: str, start: float, duration: float):
+        with self._lock:
+            self.phases.append((name, start, duration))
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start)
+
+    def mark(self, name: str, when: Optional[float] = None) -> bool:
+        """Note an instant; only the first mark of each name is kept"""
+        with self._lock:
+            if name in self.marks:
+                return False
+            self.marks[name] = time.perf_counter() if when is None else when
+            return True
+
+    def reset_mark(self, name: str):
+        with self._lock:
+            self.marks.pop(name, None)
+
+    def elapsed(self, name: str, since: Optional[str] = None) -> Optional[float]:
+        """Seconds from process start (or mark `since`) to mark `name`"""
+        with self._lock:
+            if name not in self.marks:
+                return None
+            reference = self.marks.get(since, self.origin) if since else self.origin
+            return self.marks[name] - reference
+
+    def report(self) -> Dict:
+        """Phases and marks as seconds from process start, in start order"""
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+            return {
+                "phases": [{"name": name, "start_s": round(start - self.origin, 4),
+                            "duration_s": round(duration, 4)} for name, start, duration in phases],
+                "marks": {name: round(when - self.origin, 4)
+                          for name, when in sorted(self.marks.items(), key=lambda item: item[1])},
+            }
+
+    def format(self) -> str:
+        report = self.report()
+        lines = [f"{phase['name']:<20} at {phase['start_s']:7.3f}s  took {phase['duration_s']:7.3f}s"
+                 for phase in report["phases"]]
+        lines += [f"{name:<20} at {when:7.3f}s" for name, when in report["marks"].items()]
+        return "\n".join(lines)
+
+    def dump(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+
+_default_profile = StartupProfile()
+
+
+def get_startup_profile() -> StartupProfile:
+    """Process-wide startup profile"""
+    return _default_profile
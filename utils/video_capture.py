@@ -2,17 +2,23 @@ import cv2
 import numpy as np
 from typing import Tuple, Optional
 import threading
-import queue
-import time
+from utils.frame_ring import FrameLease, FrameRing
+from utils.latency import FrameTrace
 
 class VideoCapture:
-    def __init__(self, source: int = 0):
+    def __init__(self, source: int = 0, num_slots: int = 4, trace_frames: bool = False):
         self.source = source
         self.cap = cv2.VideoCapture(source)
-        self.frame_queue = queue.Queue(maxsize=2)
+        self.num_slots = num_slots
+        self.trace_frames = trace_frames
+        self.frame_ring = None
+        self._ring_ready = threading.Event()
+        self.last_read_seq = 0
         self.stopped = False
         self.frame_dimensions = (640, 480)
         self.error = None
+        self._thread = None
+        self._frame_listeners = []
         
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_dimensions[0])
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_dimensions[1])
@@ -30,40 +36,115 @@ class VideoCapture:
                         break
         
         if self.cap.isOpened():
-            threading.Thread(target=self._update, daemon=True).start()
+            self._thread = threading.Thread(target=self._update, daemon=True)
+            self._thread.start()
         else:
             self.error = "Could not access any camera"
             
         return self
 
+    def add_frame_listener(self, event: threading.Event):
+        """Set `event` whenever a new frame is published, e.g. to wait on several captures at once"""
+        self._frame_listeners.append(event)
+
+    def _ensure_ring(self) -> FrameRing:
+        """(Re)allocate the frame ring when the output dimensions change"""
+        width, height = self.frame_dimensions
+        shape = (height, width, 3)
+        ring = self.frame_ring
+        if ring is None or ring.shape != shape:
+            if ring is not None:
+                ring.close()
+            ring = FrameRing(shape, self.num_slots)
+            self.last_read_seq = 0
+            self.frame_ring = ring
+            self._ring_ready.set()
+        return ring
+
     def _update(self):
         consecutive_failures = 0
-        
+        raw_frame = None
+
         while not self.stopped:
-            if not self.frame_queue.full():
-                ret, frame = self.cap.read()
-                if ret:
-                    consecutive_failures = 0
-                    frame = cv2.resize(frame, self.frame_dimensions)
-                    self.frame_queue.put(frame)
-                else:
-                    consecutive_failures += 1
-                    if consecutive_failures > 10:
-                        self.error = "Camera disconnected or not providing frames"
-                        break
-            
-            time.sleep(0.01)
+            # cap.read blocks until the camera delivers, so there is no polling
+            # delay; reusing raw_frame lets OpenCV decode into the same buffer
+            ret, frame = self.cap.read(raw_frame)
+            if not ret:
+                consecutive_failures += 1
+                if consecutive_failures > 10:
+                    self.error = "Camera disconnected or not providing frames"
+                    break
+                continue
 
-    def read(self) -> Optional[np.ndarray]:
-        try:
-            if not self.frame_queue.empty():
-                return self.frame_queue.get(block=False)
-            return None
-        except:
+            consecutive_failures = 0
+            raw_frame = frame
+            trace = FrameTrace() if self.trace_frames else None
+            ring = self._ensure_ring()
+            index = ring.acquire_write()
+            if index is None:
+                continue  # Every slot is borrowed; drop this frame
+
+            slot = ring.buffers[index]
+            if frame.shape == slot.shape:
+                np.copyto(slot, frame)
+            else:
+                cv2.resize(frame, self.frame_dimensions, dst=slot)
+            if trace is not None:
+                trace.mark("capture")
+            ring.publish(index, trace)
+            for event in self._frame_listeners:
+                event.set()
+
+        if self.frame_ring is not None:
+            self.frame_ring.close()
+
+    def borrow(self, timeout: Optional[float] = 0) -> Optional[FrameLease]:
+        """
+        Borrow the newest frame without copying it.
+
+        The frame lives in a preallocated ring slot and stays valid until the
+        lease is released (``with capture.borrow() as lease: ...``).
+
+        Args:
+            timeout: Seconds to wait for a frame newer than the last one read;
+                0 returns immediately, None waits until one arrives
+
+        Returns:
+            FrameLease: The borrowed frame, or None if no new frame is available
+        """
+        ring = self.frame_ring
+        if ring is None:
+            if timeout == 0 or not self._ring_ready.wait(timeout):
+                return None
+            ring = self.frame_ring
+        lease = ring.borrow(self.last_read_seq, timeout)
+        if lease is not None:
+            self.last_read_seq = lease.seq
+            if lease.trace is not None:
+                lease.trace.mark("queue")
+        return lease
+
+    def read(self, timeout: Optional[float] = 0) -> Optional[np.ndarray]:
+        """
+        Return a copy of the newest frame not yet read, or None.
+
+        The copy is the caller's to keep and modify. Callers that only look at
+        the frame for the length of one inference should borrow() it instead.
+        """
+        lease = self.borrow(timeout)
+        if lease is None:
             return None
+        with lease:
+            return lease.frame.copy()
 
     def release(self):
         self.stopped = True
+        if self._thread is not None and self._thread is not threading.current_thread():
+            # Releasing the capture under a blocked cap.read() can abort the process
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self.frame_ring is not None:
+            self.frame_ring.close()
         if hasattr(self, 'cap') and self.cap is not None:
             self.cap.release()
 